@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
+from combinacao_dados import carregar_dataset_completo
 
 # --- Configurações de Estilo para os Gráficos ---
 sns.set_style("whitegrid")
@@ -14,7 +15,7 @@ PROCESSED_DATA_PATH = os.path.join('data_processed', 'olist_dataset_completo.csv
 
 print(f"Carregando dataset de '{PROCESSED_DATA_PATH}'...")
 try:
-    df = pd.read_csv(PROCESSED_DATA_PATH)
+    df = carregar_dataset_completo()
     # Converter colunas de data carregadas como texto
     for col in ['order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date', 'order_delivered_customer_date']:
         df[col] = pd.to_datetime(df[col], errors='coerce')
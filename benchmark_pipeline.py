@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from gerar_dados_sinteticos import interpretar_escala
+
+# --- Benchmark do Pipeline ---
+# Roda cada etapa do projeto (gerar os dados, preparar_dados.py, engenharia_features.py,
+# main.py e o caminho de previsão do dashboard) sobre os dados sintéticos de cada escala, cada
+# uma em um processo separado, e registra o tempo, o pico de memória (RSS do maior processo,
+# pelo os.wait4) e a vazão em linhas por segundo. O relatório em JSON leva o commit do git,
+# para comparar execuções de commits diferentes com '--comparar'.
+#
+# Cada escala roda em '<pasta>/escala_<itens>', com as pastas 'database', 'data' etc. do
+# projeto; quando 'gerar_dados' está entre as etapas, a pasta é recriada do zero.
+
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+PASTA_BENCHMARK = 'benchmark'
+VERSAO_RELATORIO = 1
+MARCADOR_METRICAS = '@@benchmark '
+
+ETAPAS = ['gerar_dados', 'preparar_dados', 'engenharia_features', 'main', 'previsao_dashboard', 'previsao_lote']
+
+# Arquivo cujas linhas são contadas como "linhas processadas" de cada etapa.
+ENTRADA_ETAPA = {
+    'gerar_dados': os.path.join('database', 'olist_order_items_dataset.csv'),
+    'preparar_dados': os.path.join('database', 'olist_order_items_dataset.csv'),
+    'engenharia_features': os.path.join('data_processed', 'olist_dataset_completo.csv'),
+    'main': os.path.join('database', 'dataset_para_modelo.csv'),
+}
+
+
+def _contar_linhas(caminho):
+    """Linhas de dados de um CSV (sem o cabeçalho), lendo em blocos."""
+    if not os.path.exists(caminho):
+        return None
+    linhas = 0
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            linhas += bloco.count(b'\n')
+    return max(linhas - 1, 0)
+
+
+def _git(*argumentos):
+    try:
+        return subprocess.run(['git', *argumentos], cwd=PASTA_PROJETO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _memoria_total_mb():
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _comando(etapa, itens, args):
+    script = lambda nome: os.path.join(PASTA_PROJETO, nome)
+    if etapa == 'gerar_dados':
+        return [sys.executable, script('gerar_dados_sinteticos.py'), '--itens', str(itens),
+                '--semente', str(args.semente)]
+    if etapa == 'preparar_dados':
+        return [sys.executable, script('preparar_dados.py'), *shlex.split(args.args_preparar)]
+    if etapa == 'engenharia_features':
+        return [sys.executable, script('engenharia_features.py'), *shlex.split(args.args_features)]
+    if etapa == 'main':
+        return [sys.executable, script('main.py'), *shlex.split(args.args_main)]
+    return [sys.executable, script('benchmark_pipeline.py'), '--etapa-interna', etapa,
+            '--previsoes', str(args.previsoes)]
+
+
+def rodar_etapa(etapa, itens, pasta, args):
+    """Roda a etapa em um subprocesso na pasta da escala e mede tempo, pico de RSS e vazão."""
+    os.makedirs(os.path.join(pasta, 'logs'), exist_ok=True)
+    caminho_log = os.path.join(pasta, 'logs', f'{etapa}.log')
+    with open(caminho_log, 'w') as log:
+        inicio = time.perf_counter()
+        ambiente = dict(os.environ)
+        if args.trace:
+            # Trace por etapa do projeto (instrumentacao.py), ao lado dos logs.
+            ambiente['OLIST_TRACE'] = os.path.abspath(os.path.join(pasta, 'logs', f'{etapa}.trace.json'))
+            if os.path.exists(ambiente['OLIST_TRACE']):
+                os.remove(ambiente['OLIST_TRACE'])  # o trace acumula eventos; cada execução começa vazia
+        processo = subprocess.Popen(_comando(etapa, itens, args), cwd=pasta, stdout=log, stderr=subprocess.STDOUT,
+                                    env=ambiente)
+        _, status, uso = os.wait4(processo.pid, 0)
+        segundos = time.perf_counter() - inicio
+    processo.returncode = os.waitstatus_to_exitcode(status)
+
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    pico_mb = uso.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    extras = {}
+    with open(caminho_log, 'r', errors='replace') as log:
+        for linha in log:
+            if linha.startswith(MARCADOR_METRICAS):
+                extras = json.loads(linha[len(MARCADOR_METRICAS):])
+    linhas = extras.pop('linhas', None)
+    if linhas is None and etapa in ENTRADA_ETAPA:
+        linhas = _contar_linhas(os.path.join(pasta, ENTRADA_ETAPA[etapa]))
+    return {
+        'escala': itens,
+        'etapa': etapa,
+        'segundos': segundos,
+        'pico_rss_mb': pico_mb,
+        'linhas': linhas,
+        'linhas_por_s': linhas / segundos if linhas and segundos > 0 else None,
+        'codigo_saida': processo.returncode,
+        'log': os.path.relpath(caminho_log),
+        **extras,
+    }
+
+
+def _etapa_previsao(etapa, n_previsoes):
+    """
+    Caminho de previsão do dashboard, rodado dentro da pasta da escala. 'previsao_dashboard'
+    repete o que um clique em "Prever" faz (features ocultas com os padrões, percentual do
+    frete e predict de uma linha); 'previsao_lote' pontua o dataset inteiro em lotes.
+    """
+    from servico_previsao import carregar_modelo, carregar_perfil_servico, carregar_indice_servico, prever, prever_em_lotes
+    from tipos_compactos import ler_csv_com_tipos
+
+    # O dataset só fornece as linhas pedidas; os padrões vêm do perfil de serviço, como no dashboard.
+    df = ler_csv_com_tipos(os.path.join('database', 'dataset_para_modelo.csv'))
+    modelo = carregar_modelo()
+    inicio = time.perf_counter()
+    padroes = carregar_perfil_servico()['padroes']
+    indice_geo = carregar_indice_servico()
+    ms_perfil = 1000 * (time.perf_counter() - inicio)
+
+    if etapa == 'previsao_lote':
+        previsoes, linhas_por_s = prever_em_lotes(modelo, df, padroes, indice_geo=indice_geo)
+        return {'linhas': len(previsoes), 'segundos_predict': len(previsoes) / linhas_por_s,
+                'linhas_por_s_predict': linhas_por_s}
+
+    rng = np.random.default_rng(0)
+    latencias = []
+    for i in rng.integers(0, len(df), n_previsoes):
+        inicio = time.perf_counter()
+        usuario = df.iloc[[i]][['price', 'freight_value', 'product_weight_g', 'product_category_name_english',
+                                'review_score', 'payment_type', 'seller_state', 'customer_state',
+                                'payment_installments']]
+        prever(modelo, usuario, padroes, indice_geo)
+        latencias.append(1000 * (time.perf_counter() - inicio))
+    return {
+        'linhas': n_previsoes,
+        'carregar_perfil_ms': ms_perfil,
+        'latencia_p50_ms': float(np.percentile(latencias, 50)),
+        'latencia_p95_ms': float(np.percentile(latencias, 95)),
+        'latencia_p99_ms': float(np.percentile(latencias, 99)),
+    }
+
+
+def rodar_benchmark(args):
+    escalas = [interpretar_escala(e) for e in args.escalas.split(',')]
+    etapas = args.etapas.split(',')
+    desconhecidas = [e for e in etapas if e not in ETAPAS]
+    if desconhecidas:
+        print(f"Erro: etapas desconhecidas {desconhecidas}. Opções: {ETAPAS}")
+        exit()
+
+    relatorio = {
+        'versao': VERSAO_RELATORIO,
+        'commit': _git('rev-parse', 'HEAD'),
+        'alteracoes_locais': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'maquina': {
+            'plataforma': platform.platform(), 'python': platform.python_version(),
+            'nucleos': os.cpu_count(), 'memoria_total_mb': _memoria_total_mb(),
+        },
+        'argumentos': vars(args),
+        'resultados': [],
+    }
+    for itens in escalas:
+        pasta = os.path.join(args.pasta, f'escala_{itens}')
+        if 'gerar_dados' in etapas and os.path.isdir(pasta):
+            shutil.rmtree(pasta)
+        for subpasta in ('database', 'data', 'img'):  # estrutura de pastas esperada pelos scripts
+            os.makedirs(os.path.join(pasta, subpasta), exist_ok=True)
+        print(f"\n=== Escala: {itens:,} itens de pedido ({pasta}) ===")
+        for etapa in etapas:
+            resultado = rodar_etapa(etapa, itens, pasta, args)
+            relatorio['resultados'].append(resultado)
+            vazao = f", {resultado['linhas_por_s']:,.0f} linhas/s" if resultado['linhas_por_s'] else ''
+            print(f"  {etapa:<22} {resultado['segundos']:8.1f}s  pico {resultado['pico_rss_mb']:8.0f} MB{vazao}")
+            if resultado['codigo_saida'] != 0:
+                print(f"  Erro: a etapa '{etapa}' terminou com código {resultado['codigo_saida']}; "
+                      f"veja '{resultado['log']}'. As etapas seguintes desta escala foram puladas.")
+                break
+
+    commit = (relatorio['commit'] or 'sem_git')[:7]
+    caminho = os.path.join(args.pasta, f"benchmark_{commit}_{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(caminho + '.tmp', 'w') as f:
+        json.dump(relatorio, f, indent=4)
+    os.replace(caminho + '.tmp', caminho)
+    print(f"\nRelatório salvo em '{caminho}'.")
+    return caminho
+
+
+def comparar(caminho_base, caminho_novo, tolerancia):
+    """Compara dois relatórios etapa a etapa; devolve True se houve regressão acima da tolerância."""
+    try:
+        with open(caminho_base) as f:
+            base = json.load(f)
+        with open(caminho_novo) as f:
+            novo = json.load(f)
+    except FileNotFoundError as e:
+        print(f"Erro: relatório não encontrado: {e.filename}")
+        exit()
+
+    indice_base = {(r['escala'], r['etapa']): r for r in base['resultados']}
+    print(f"Base: {(base['commit'] or '?')[:7]} ({base['data']})  |  Novo: {(novo['commit'] or '?')[:7]} ({novo['data']})")
+    print(f"{'escala':>12} {'etapa':<22} {'tempo base':>11} {'tempo novo':>11} {'razão':>7} "
+          f"{'RSS base':>10} {'RSS novo':>10} {'razão':>7}")
+    regressao = False
+    for r in novo['resultados']:
+        b = indice_base.get((r['escala'], r['etapa']))
+        if b is None:
+            continue
+        razao_tempo = r['segundos'] / b['segundos'] if b['segundos'] else float('nan')
+        razao_rss = r['pico_rss_mb'] / b['pico_rss_mb'] if b['pico_rss_mb'] else float('nan')
+        piorou = razao_tempo > 1 + tolerancia or razao_rss > 1 + tolerancia
+        regressao |= piorou
+        print(f"{r['escala']:>12,} {r['etapa']:<22} {b['segundos']:>10.1f}s {r['segundos']:>10.1f}s "
+              f"{razao_tempo:>7.2f} {b['pico_rss_mb']:>8.0f}MB {r['pico_rss_mb']:>8.0f}MB {razao_rss:>7.2f}"
+              f"{'  <- regressão' if piorou else ''}")
+    return regressao
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline sobre dados sintéticos.")
+    parser.add_argument('--escalas', default='100k', help="Escalas em itens de pedido, separadas por vírgula (ex.: 100k,1M,10M).")
+    parser.add_argument('--etapas', default=','.join(ETAPAS), help=f"Etapas a rodar, em ordem (padrão: {','.join(ETAPAS)}).")
+    parser.add_argument('--pasta', default=PASTA_BENCHMARK, help="Pasta de trabalho e dos relatórios.")
+    parser.add_argument('--semente', type=int, default=42, help="Semente dos dados sintéticos.")
+    parser.add_argument('--args-preparar', default='', help="Argumentos extras do preparar_dados.py (ex.: '--em-lotes').")
+    parser.add_argument('--args-features', default='', help="Argumentos extras do engenharia_features.py.")
+    parser.add_argument('--args-main', default='--busca sucessiva --max-minutos 10',
+                        help="Argumentos do main.py (padrão: busca sucessiva limitada a 10 minutos).")
+    parser.add_argument('--previsoes', type=int, default=200, help="Previsões de uma linha medidas em 'previsao_dashboard'.")
+    parser.add_argument('--trace', action='store_true',
+                        help="Liga a instrumentação (OLIST_TRACE) e grava um trace por etapa em '<escala>/logs/'.")
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'), help="Compara dois relatórios em vez de rodar.")
+    parser.add_argument('--tolerancia', type=float, default=0.10,
+                        help="Na comparação, aumento relativo de tempo ou RSS considerado regressão (padrão 0.10).")
+    parser.add_argument('--etapa-interna', choices=['previsao_dashboard', 'previsao_lote'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.etapa_interna:
+        print(MARCADOR_METRICAS + json.dumps(_etapa_previsao(args.etapa_interna, args.previsoes)))
+    elif args.comparar:
+        sys.exit(1 if comparar(*args.comparar, args.tolerancia) else 0)
+    else:
+        rodar_benchmark(args)
@@ -0,0 +1,594 @@
+import contextlib
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed, parallel_config
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.pipeline import Pipeline
+
+from instrumentacao import etapa
+
+
+def _linhas(dados, indices):
+    return dados.iloc[indices] if hasattr(dados, 'iloc') else dados[indices]
+
+
+def _avaliar(estimador, lista_params, X, y, idx_treino, idx_validacao, scorer, oob):
+    """Treina uma configuração em um fold e devolve [(score na validação, tempo de treino, None)]."""
+    inicio = time.perf_counter()
+    modelo = clone(estimador).set_params(**lista_params[0])
+    modelo.fit(_linhas(X, idx_treino), _linhas(y, idx_treino))
+    tempo = time.perf_counter() - inicio
+    return [(scorer(modelo, _linhas(X, idx_validacao), _linhas(y, idx_validacao)), tempo, None)]
+
+
+# --- Cache de Folds ---
+# Quando o grid só varia parâmetros do último passo do pipeline (o modelo), a saída do
+# pré-processamento e a transformação do alvo dependem apenas do fold. Elas são calculadas
+# uma vez por fold (e por rodada, na busca sucessiva), gravadas em uma pasta temporária e
+# lidas com 'mmap' pelos workers; só o modelo é ajustado para cada configuração.
+#
+# Para florestas ('n_estimators' + 'warm_start'), as configurações que diferem só no número
+# de árvores formam um grupo: em cada fold, a menor floresta é treinada, avaliada e depois
+# cresce com 'warm_start' até a próxima, reaproveitando as árvores já treinadas. As sementes
+# das árvores novas seguem a mesma sequência, então cada floresta é idêntica à treinada do zero.
+
+class _PrevisaoNaEscalaOriginal:
+    """Aplica a inversa da transformação do alvo às previsões do modelo, como o TransformedTargetRegressor."""
+
+    def __init__(self, modelo, inversa):
+        self.modelo = modelo
+        self.inversa = inversa
+
+    def predict(self, X):
+        previsao = self.modelo.predict(X)
+        return self.inversa(previsao) if self.inversa is not None else previsao
+
+
+def _decompor(estimador, candidatos):
+    """
+    Separa o estimador em pré-processamento, modelo e transformação do alvo quando todos os
+    parâmetros do grid são do modelo final. Devolve None se o cache de folds não se aplica.
+    """
+    func = inversa = None
+    pipeline = estimador
+    prefixo = ''
+    if isinstance(estimador, TransformedTargetRegressor):
+        if estimador.transformer is not None or estimador.func is None:
+            return None
+        func, inversa = estimador.func, estimador.inverse_func
+        pipeline = estimador.regressor
+        prefixo = 'regressor__'
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) < 2:
+        return None
+
+    nome_modelo, modelo = pipeline.steps[-1]
+    prefixo += nome_modelo + '__'
+    if any(not param.startswith(prefixo) for params in candidatos for param in params):
+        return None
+    parametros_modelo = modelo.get_params()
+    crescimento = 'n_estimators' in parametros_modelo and 'warm_start' in parametros_modelo
+    return {
+        'pre': Pipeline(pipeline.steps[:-1]), 'modelo': modelo, 'prefixo': prefixo,
+        'func': func, 'inversa': inversa,
+        'eixo': prefixo + 'n_estimators' if crescimento else None,
+        # As florestas treinam e preveem em float32: gravando as matrizes já em float32 (CSC no
+        # treino, CSR na validação, se esparsas), os workers leem o mmap sem fazer cópias.
+        'float32': isinstance(modelo, (RandomForestRegressor, ExtraTreesRegressor)),
+    }
+
+
+def _float32(matriz, formato_esparso):
+    if sparse.issparse(matriz):
+        return matriz.asformat(formato_esparso).astype(np.float32)
+    return np.ascontiguousarray(matriz, dtype=np.float32)
+
+
+def _preparar_fold(decomposicao, X, y, idx_treino, idx_validacao, caminho):
+    """Transforma o alvo e ajusta o pré-processamento no treino do fold, gravando as matrizes em 'caminho'."""
+    y_treino = np.asarray(_linhas(y, idx_treino))
+    if decomposicao['func'] is not None:
+        y_treino = decomposicao['func'](y_treino)
+    with etapa('busca:preparar_fold', categoria='modelo', linhas=len(idx_treino)):
+        pre = clone(decomposicao['pre'])
+        X_treino = pre.fit_transform(_linhas(X, idx_treino), y_treino)
+        X_validacao = pre.transform(_linhas(X, idx_validacao))
+        if decomposicao['float32']:
+            X_treino = _float32(X_treino, 'csc')
+            X_validacao = _float32(X_validacao, 'csr')
+        joblib.dump((X_treino, y_treino, X_validacao, np.asarray(_linhas(y, idx_validacao))), caminho)
+    return caminho
+
+
+def _avaliar_em_cache(decomposicao, lista_params, caminho, scorer, oob):
+    """
+    Como '_avaliar', mas ajusta só o modelo sobre as matrizes já transformadas do fold.
+    'lista_params' é um grupo de configurações que diferem só no eixo de crescimento (em
+    ordem crescente): o mesmo modelo cresce com 'warm_start' de uma para a seguinte.
+    Devolve [(score, tempo acumulado, score OOB ou None)] na ordem do grupo.
+    """
+    X_treino, y_treino, X_validacao, y_validacao = joblib.load(caminho, mmap_mode='r')
+    tamanho = len(decomposicao['prefixo'])
+    modelo = clone(decomposicao['modelo']).set_params(**{p[tamanho:]: v for p, v in lista_params[0].items()})
+    com_oob = oob and modelo.get_params().get('bootstrap', False)
+    if com_oob:
+        modelo.set_params(oob_score=True)
+    if len(lista_params) > 1:
+        modelo.set_params(warm_start=True)
+
+    saidas = []
+    tempo = 0.0
+    for params in lista_params:
+        modelo.set_params(**{p[tamanho:]: v for p, v in params.items()})
+        inicio = time.perf_counter()
+        with warnings.catch_warnings(), etapa('busca:ajuste', categoria='modelo', linhas=len(y_treino), params=params):
+            # Florestas pequenas deixam algumas linhas sem estimativa OOB; o aviso não interessa aqui.
+            warnings.simplefilter('ignore', UserWarning)
+            modelo.fit(X_treino, y_treino)
+        tempo += time.perf_counter() - inicio
+        score = scorer(_PrevisaoNaEscalaOriginal(modelo, decomposicao['inversa']), X_validacao, y_validacao)
+        saidas.append((score, tempo, float(modelo.oob_score_) if com_oob else None))
+    return saidas
+
+
+def _agrupar(indices, candidatos, eixo):
+    """Agrupa as configurações que só diferem no parâmetro 'eixo', cada grupo em ordem crescente dele."""
+    if eixo is None:
+        return [[c] for c in indices]
+    grupos = {}
+    for c in indices:
+        chave = repr(sorted((p, v) for p, v in candidatos[c].items() if p != eixo))
+        grupos.setdefault(chave, []).append(c)
+    return [sorted(grupo, key=lambda c: candidatos[c][eixo]) for grupo in grupos.values()]
+
+
+# --- Núcleos e Memória ---
+# Com um orçamento de núcleos e de memória, a busca divide os núcleos entre os ajustes em
+# paralelo (workers) e o paralelismo interno do modelo ('n_jobs' das florestas ou as threads
+# OpenMP do HistGradientBoosting). Com o cache de folds, as matrizes ficam em disco e são
+# lidas com mmap por todos os workers; cada worker só precisa de memória para o próprio modelo
+# e os buffers do treino. Quantos workers cabem na memória é uma estimativa conservadora.
+
+def memoria_disponivel_mb():
+    """Memória física disponível agora, em MB (None se o sistema não informar)."""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _tamanho_mb(dados):
+    if hasattr(dados, 'memory_usage'):
+        return float(dados.memory_usage(deep=True).sum()) / 1024 ** 2
+    return getattr(dados, 'nbytes', 0) / 1024 ** 2
+
+
+def estimar_memoria_ajuste_mb(modelo, params, n_linhas, n_colunas):
+    """
+    Estimativa do pico de memória de um ajuste em MB: buffers por linha (índices, pesos, alvo),
+    mais os nós das árvores nas florestas ou a matriz discretizada (uint8) no boosting.
+    'params' são os parâmetros do modelo (sem prefixo) da maior configuração do grupo.
+    """
+    p = {**modelo.get_params(), **params}
+    mb = n_linhas * 48 / 1024 ** 2
+    if 'n_estimators' in p:
+        folha = p.get('min_samples_leaf') or 1
+        folha = math.ceil(folha * n_linhas) if isinstance(folha, float) and folha < 1 else folha
+        nos = 2 * n_linhas / max(folha, 1)
+        if p.get('max_depth') is not None:
+            nos = min(nos, 2 ** (p['max_depth'] + 1))
+        mb += p['n_estimators'] * nos * 80 / 1024 ** 2  # ~80 bytes por nó (estrutura + valor)
+    else:
+        mb += n_linhas * n_colunas / 1024 ** 2
+    return mb
+
+
+def planejar_recursos(nucleos, memoria_mb, mb_por_ajuste, mb_compartilhado=0.0, max_tarefas=None):
+    """
+    Divide 'nucleos' entre ajustes em paralelo (externo) e threads de cada ajuste (interno).
+    O externo é limitado pela memória ('memoria_mb' menos o que é compartilhado) e pelo
+    número de tarefas; os núcleos que sobram vão para o paralelismo interno.
+    """
+    externo = nucleos if max_tarefas is None else min(nucleos, max_tarefas)
+    if memoria_mb is not None:
+        externo = min(externo, int((memoria_mb - mb_compartilhado) // max(mb_por_ajuste, 1e-3)))
+    externo = max(1, externo)
+    return externo, max(1, nucleos // externo)
+
+
+def _modelo_final(estimador):
+    """Modelo final do estimador (dentro do TransformedTargetRegressor/Pipeline) e o prefixo dos seus parâmetros."""
+    prefixo = ''
+    if isinstance(estimador, TransformedTargetRegressor):
+        estimador, prefixo = estimador.regressor, 'regressor__'
+    if isinstance(estimador, Pipeline):
+        nome, estimador = estimador.steps[-1]
+        prefixo += nome + '__'
+    return estimador, prefixo
+
+
+def _com_n_jobs(estimador, n_jobs):
+    """Cópia do estimador com 'n_jobs' no modelo final (o próprio estimador se o modelo não tiver 'n_jobs')."""
+    modelo, prefixo = _modelo_final(estimador)
+    if 'n_jobs' not in modelo.get_params(deep=False):
+        return estimador
+    return clone(estimador).set_params(**{prefixo + 'n_jobs': n_jobs})
+
+
+# --- Checkpoint da Busca ---
+# Cada ajuste concluído (configuração, rodada, fold) é anexado a um arquivo JSONL assim que
+# termina, com o score, o tempo e o score OOB. Cada linha leva a assinatura da busca (estimador,
+# dados, folds, scoring e rodadas); ao reiniciar, os resultados com a mesma assinatura são
+# reaproveitados e só o trabalho que falta é feito.
+
+class _RegistroResultados:
+    """Arquivo JSONL de resultados da busca, só com acréscimos."""
+
+    def __init__(self, caminho, assinatura):
+        self.caminho = caminho
+        self.assinatura = assinatura
+        self.resultados = {}
+        if caminho is None:
+            return
+
+        outras = 0
+        if os.path.exists(caminho):
+            with open(caminho, 'r') as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        continue  # última linha cortada por uma interrupção no meio da escrita
+                    if registro.get('assinatura') != assinatura:
+                        outras += 1
+                        continue
+                    self.resultados[registro['chave']] = (registro['score'], registro['tempo'], registro['oob'])
+        if outras:
+            # Resultados de outra busca (estimador, dados ou grid mudaram) não servem mais.
+            self._reescrever()
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    @staticmethod
+    def chave(params, rodada, n_linhas, fold):
+        return repr([sorted(params.items()), rodada, n_linhas, fold])
+
+    def obter(self, chave):
+        return self.resultados.get(chave)
+
+    def gravar(self, chave, score, tempo, oob):
+        self.resultados[chave] = (score, tempo, oob)
+        if self.caminho is None:
+            return
+        registro = {'assinatura': self.assinatura, 'chave': chave, 'score': score, 'tempo': tempo, 'oob': oob}
+        with open(self.caminho, 'a') as f:
+            f.write(json.dumps(registro) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _reescrever(self):
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w') as f:
+            for chave, (score, tempo, oob) in self.resultados.items():
+                registro = {'assinatura': self.assinatura, 'chave': chave, 'score': score, 'tempo': tempo, 'oob': oob}
+                f.write(json.dumps(registro) + '\n')
+        os.replace(temporario, self.caminho)
+
+
+def _executar(posicao, funcao, *args):
+    """Executa uma tarefa da busca devolvendo também a sua posição (para resultados fora de ordem)."""
+    return posicao, funcao(*args)
+
+
+class BuscaSucessiva:
+    """
+    Busca de hiperparâmetros por 'successive halving' com orçamento.
+
+    Todas as configurações de 'param_grid' (mesma sintaxe do GridSearchCV) são avaliadas
+    primeiro com poucas linhas de treino em cada fold; a cada rodada só a melhor fração
+    '1/fator' é promovida, com 'fator' vezes mais linhas, até a rodada final com o fold
+    inteiro. A validação é sempre feita no fold de validação completo.
+
+    O orçamento é dado em número de ajustes ('max_ajustes', um ajuste = uma configuração
+    em um fold) e/ou em tempo ('max_segundos'). Quando ele acaba, a busca para e a melhor
+    configuração é escolhida na última rodada completa; uma rodada cortada pelo orçamento
+    fica em 'cv_results_' e 'rodada_parcial_' só como informação.
+    Expõe 'best_params_', 'best_score_', 'best_estimator_', 'refit_time_' e 'cv_results_' como o GridSearchCV.
+
+    Com 'cache_folds=True' (padrão), o pré-processamento é ajustado uma vez por fold e
+    rodada em vez de uma vez por configuração (veja '_decompor'); a pasta do cache é
+    esvaziada ao fim de cada rodada e removida ao fim da busca. Com o cache, florestas que
+    só diferem em 'n_estimators' crescem com 'warm_start' ('crescimento_incremental=True'),
+    e 'oob=True' registra também o score out-of-bag de cada tamanho em 'cv_results_'.
+
+    Com 'checkpoint' (caminho de um arquivo JSONL), cada ajuste concluído é gravado assim
+    que termina, e uma nova execução da mesma busca retoma de onde a anterior parou.
+
+    Com 'nucleos' e/ou 'memoria_mb', 'n_jobs' é ignorado: os núcleos são divididos entre os
+    ajustes em paralelo e o 'n_jobs' do modelo, com tantos workers quantos cabem na memória
+    (padrão: todos os núcleos e a memória disponível). O plano fica em 'plano_recursos_'.
+    """
+
+    def __init__(self, estimator, param_grid, cv=5, scoring='r2', fator=3, min_linhas=None,
+                 max_ajustes=None, max_segundos=None, n_jobs=None, random_state=42, verbose=0,
+                 cache_folds=True, crescimento_incremental=True, oob=False, checkpoint=None,
+                 nucleos=None, memoria_mb=None):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.fator = fator
+        self.min_linhas = min_linhas
+        self.max_ajustes = max_ajustes
+        self.max_segundos = max_segundos
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+        self.cache_folds = cache_folds
+        self.crescimento_incremental = crescimento_incremental
+        self.oob = oob
+        self.checkpoint = checkpoint
+        self.nucleos = nucleos
+        self.memoria_mb = memoria_mb
+
+    def _assinatura(self, X, y, splits, linhas_por_rodada):
+        """Identifica a busca: resultados de um checkpoint só valem para a mesma assinatura."""
+        partes = [
+            joblib.hash(self.estimator), joblib.hash(X), joblib.hash(y), joblib.hash(splits),
+            repr([self.scoring, linhas_por_rodada, self.random_state, self.oob]),
+        ]
+        return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:24]
+
+    def _planejar_recursos(self, X, candidatos, splits, eixo):
+        """Decide os workers da busca e o 'n_jobs' do modelo a partir do orçamento de núcleos e memória."""
+        nucleos = self.nucleos or os.cpu_count() or 1
+        memoria = self.memoria_mb if self.memoria_mb is not None else memoria_disponivel_mb()
+        modelo, prefixo = _modelo_final(self.estimator)
+        n_linhas = max(len(idx_treino) for idx_treino, _ in splits)
+        mb_por_ajuste = max(
+            estimar_memoria_ajuste_mb(modelo, {p[len(prefixo):]: v for p, v in params.items() if p.startswith(prefixo)},
+                                      n_linhas, X.shape[1])
+            for params in candidatos
+        )
+        if not self.cache_folds:
+            # Sem o cache, cada worker recebe uma cópia dos dados e transforma a sua.
+            mb_por_ajuste += 3 * _tamanho_mb(X)
+        max_tarefas = len(_agrupar(range(len(candidatos)), candidatos, eixo)) * len(splits)
+        externo, interno = planejar_recursos(nucleos, memoria, mb_por_ajuste, 2 * _tamanho_mb(X), max_tarefas)
+        self.plano_recursos_ = {
+            'nucleos': nucleos, 'memoria_mb': memoria, 'mb_por_ajuste': mb_por_ajuste,
+            'n_jobs_busca': externo, 'n_jobs_modelo': interno,
+        }
+        if self.verbose:
+            memoria_txt = f"{memoria:.0f} MB" if memoria is not None else "memória não informada"
+            print(f"Recursos: {nucleos} núcleo(s), {memoria_txt}, ~{mb_por_ajuste:.0f} MB por ajuste -> "
+                  f"{externo} ajuste(s) em paralelo x {interno} thread(s) por modelo")
+        return externo, interno
+
+    def _rodadas(self, n_candidatos, n_max):
+        """Número de linhas de treino de cada rodada (a última usa o fold inteiro)."""
+        n_rodadas = max(1, math.ceil(math.log(n_candidatos, self.fator)) + 1) if n_candidatos > 1 else 1
+        min_linhas = self.min_linhas or max(1, n_max // self.fator ** (n_rodadas - 1))
+        linhas = [min(n_max, min_linhas * self.fator ** i) for i in range(n_rodadas)]
+        linhas[-1] = n_max
+        return linhas
+
+    def _promover(self, ordenados):
+        return ordenados[:max(1, math.ceil(len(ordenados) / self.fator))]
+
+    def _orcamento_esgotado(self, ajustes, inicio):
+        if self.max_ajustes is not None and ajustes >= self.max_ajustes:
+            return True
+        return self.max_segundos is not None and time.perf_counter() - inicio >= self.max_segundos
+
+    def fit(self, X, y):
+        inicio = time.perf_counter()
+        scorer = get_scorer(self.scoring)
+        candidatos = list(ParameterGrid(self.param_grid))
+        splits = list(check_cv(self.cv, y, classifier=False).split(X, y))
+        rng = np.random.RandomState(self.random_state)
+        # Subconjuntos aninhados: cada rodada usa um prefixo maior da mesma permutação do fold.
+        # A rodada final usa o fold inteiro na ordem original, exatamente como o GridSearchCV.
+        permutacoes = [rng.permutation(idx_treino) for idx_treino, _ in splits]
+        n_max = min(len(idx) for idx in permutacoes)
+        linhas_por_rodada = self._rodadas(len(candidatos), n_max)
+        decomposicao = _decompor(self.estimator, candidatos) if self.cache_folds else None
+        eixo = decomposicao['eixo'] if decomposicao is not None and self.crescimento_incremental else None
+
+        estimador = self.estimator
+        n_jobs = self.n_jobs
+        configuracao = contextlib.nullcontext()
+        self.plano_recursos_ = None
+        if self.nucleos is not None or self.memoria_mb is not None:
+            n_jobs, n_interno = self._planejar_recursos(X, candidatos, splits, eixo)
+            estimador = _com_n_jobs(self.estimator, n_interno)
+            if decomposicao is not None:
+                decomposicao = _decompor(estimador, candidatos)
+            # Limita também as threads OpenMP/BLAS dentro de cada worker (HistGradientBoosting).
+            configuracao = parallel_config(backend='loky', inner_max_num_threads=n_interno)
+        pasta_cache = tempfile.mkdtemp(prefix='busca_folds_') if decomposicao is not None else None
+
+        registro = _RegistroResultados(
+            self.checkpoint, self._assinatura(X, y, splits, linhas_por_rodada) if self.checkpoint else None)
+        if self.verbose and registro.resultados:
+            print(f"Checkpoint '{self.checkpoint}': {len(registro.resultados)} ajuste(s) já concluído(s) serão reaproveitados.")
+        self.resultados_ = []
+        self.cv_results_ = {
+            'params': [], 'rodada': [], 'n_linhas': [], 'mean_test_score': [], 'mean_fit_time': [],
+            'mean_oob_score': [],
+        }
+        self.rodada_parcial_ = None
+        ajustes = 0
+        vivos = list(range(len(candidatos)))
+        melhor_rodada = rodada_escolhida = None
+
+        # Os Parallel são criados e usados dentro do parallel_config, para que o backend e o
+        # limite de threads por worker valham de fato para as tarefas da busca.
+        with configuracao:
+            paralelo = Parallel(n_jobs=n_jobs)
+            paralelo_em_andamento = Parallel(n_jobs=n_jobs, return_as='generator_unordered')
+            try:
+                for rodada, n_linhas in enumerate(linhas_por_rodada):
+                    if self._orcamento_esgotado(ajustes, inicio):
+                        break
+                    if self.verbose:
+                        print(f"Rodada {rodada + 1}/{len(linhas_por_rodada)}: {len(vivos)} configuração(ões) "
+                              f"x {len(splits)} folds com {n_linhas} linhas de treino")
+
+                    ultima = rodada == len(linhas_por_rodada) - 1
+                    folds = [
+                        (idx_treino if ultima else perm[:n_linhas], idx_val)
+                        for perm, (idx_treino, idx_val) in zip(permutacoes, splits)
+                    ]
+                    grupos = _agrupar(vivos, candidatos, eixo)
+                    chaves = {
+                        (j, fold): [registro.chave(candidatos[c], rodada, n_linhas, fold) for c in grupo]
+                        for j, grupo in enumerate(grupos) for fold in range(len(splits))
+                    }
+                    pendentes = {pos for pos, lista in chaves.items() if any(registro.obter(ch) is None for ch in lista)}
+
+                    # O cache dos folds só é montado se a rodada tiver trabalho que não está no checkpoint.
+                    caminhos = []
+                    if decomposicao is not None and pendentes:
+                        caminhos = paralelo(
+                            delayed(_preparar_fold)(decomposicao, X, y, idx_treino, idx_val,
+                                                    os.path.join(pasta_cache, f'rodada{rodada}_fold{f}.pkl'))
+                            for f, (idx_treino, idx_val) in enumerate(folds)
+                        )
+
+                    def tarefa(g, i):
+                        lista_params = [candidatos[c] for c in g]
+                        if decomposicao is None:
+                            return (_avaliar, estimador, lista_params, X, y, *folds[i], scorer, self.oob)
+                        return (_avaliar_em_cache, decomposicao, lista_params, caminhos[i], scorer, self.oob)
+
+                    # A rodada inteira vai para o Parallel de uma vez; as tarefas são geradas sob demanda,
+                    # à medida que os resultados chegam, e o orçamento é conferido antes de cada grupo.
+                    # Os candidatos vivos estão ordenados pelo score da rodada anterior, então um corte
+                    # no meio da rodada descarta os menos promissores. Um grupo só entra se couber
+                    # inteiro no orçamento (ajustes já gravados no checkpoint não contam).
+                    avaliados = []
+                    reservados = [ajustes]
+
+                    def tarefas():
+                        for j, grupo in enumerate(grupos):
+                            if self._orcamento_esgotado(reservados[0], inicio):
+                                return
+                            pendentes_grupo = [(j, fold) for fold in range(len(splits)) if (j, fold) in pendentes]
+                            custo = len(grupo) * len(pendentes_grupo)
+                            if self.max_ajustes is not None and reservados[0] + custo > self.max_ajustes:
+                                return
+                            reservados[0] += custo
+                            avaliados.append(j)
+                            for pos in pendentes_grupo:
+                                yield delayed(_executar)(pos, *tarefa(grupo, pos[1]))
+
+                    # Cada tarefa concluída é gravada no checkpoint assim que termina.
+                    for pos, saida in paralelo_em_andamento(tarefas()):
+                        for ch, (score, tempo, oob) in zip(chaves[pos], saida):
+                            registro.gravar(ch, float(score), tempo, oob)
+                        ajustes += len(saida)
+
+                    medias = {}
+                    for j in sorted(avaliados):
+                        for k, c in enumerate(grupos[j]):
+                            por_fold = [registro.obter(chaves[(j, fold)][k]) for fold in range(len(splits))]
+                            scores = [saida[0] for saida in por_fold]
+                            tempos = [saida[1] for saida in por_fold]
+                            oobs = [saida[2] for saida in por_fold]
+                            medias[c] = float(np.mean(scores))
+                            for fold, (score, tempo, oob) in enumerate(zip(scores, tempos, oobs)):
+                                self.resultados_.append({
+                                    'params': candidatos[c], 'rodada': rodada, 'n_linhas': n_linhas,
+                                    'fold': fold, 'score': float(score), 'tempo': tempo, 'oob': oob,
+                                })
+                            self.cv_results_['params'].append(candidatos[c])
+                            self.cv_results_['rodada'].append(rodada)
+                            self.cv_results_['n_linhas'].append(n_linhas)
+                            self.cv_results_['mean_test_score'].append(medias[c])
+                            self.cv_results_['mean_fit_time'].append(float(np.mean(tempos)))
+                            self.cv_results_['mean_oob_score'].append(
+                                float(np.mean(oobs)) if None not in oobs else None)
+
+                    for caminho in caminhos:
+                        os.remove(caminho)
+                    if not medias:
+                        break
+                    if len(medias) < len(vivos):
+                        # Rodada cortada pelo orçamento: as configurações que ficaram de fora podiam ser
+                        # melhores, então a escolha continua na última rodada completa. A parcial fica
+                        # em 'cv_results_' e em 'rodada_parcial_' só como informação.
+                        self.rodada_parcial_ = {'rodada': rodada, 'n_linhas': n_linhas,
+                                                'avaliadas': len(medias), 'vivas': len(vivos)}
+                        if self.verbose:
+                            print(f"Orçamento esgotado na rodada {rodada + 1}: {len(medias)} de {len(vivos)} "
+                                  f"configuração(ões) avaliadas; a escolha fica com a última rodada completa.")
+                        if melhor_rodada is None:
+                            # Nenhuma rodada completa: a parcial é tudo o que há para escolher.
+                            melhor_rodada, rodada_escolhida = medias, rodada
+                        break
+                    melhor_rodada, rodada_escolhida = medias, rodada
+                    vivos = self._promover(sorted(medias, key=medias.get, reverse=True))
+            finally:
+                if pasta_cache is not None:
+                    shutil.rmtree(pasta_cache, ignore_errors=True)
+
+        if melhor_rodada is None:
+            raise RuntimeError("O orçamento acabou antes de qualquer configuração ser avaliada.")
+
+        # Em empate, vence a primeira configuração na ordem do grid, como no GridSearchCV.
+        melhor = max(sorted(melhor_rodada), key=melhor_rodada.get)
+        self.best_params_ = candidatos[melhor]
+        self.best_score_ = melhor_rodada[melhor]
+        self.rodada_escolhida_ = rodada_escolhida
+        self.n_ajustes_ = ajustes
+        if self.verbose:
+            print(f"Busca encerrada após {ajustes} ajustes em {time.perf_counter() - inicio:.1f}s.")
+            oobs = [r['oob'] for r in self.resultados_
+                    if r['params'] is self.best_params_ and r['rodada'] == rodada_escolhida and r['oob'] is not None]
+            if oobs:
+                print(f"Score OOB (escala do treino) da melhor configuração: {np.mean(oobs):.4f}")
+
+        inicio_refit = time.perf_counter()
+        final = self.estimator
+        if self.plano_recursos_ is not None:
+            # O modelo final é um só: usa todos os núcleos do orçamento.
+            final = _com_n_jobs(self.estimator, self.plano_recursos_['nucleos'])
+        with etapa('busca:refit', categoria='modelo', linhas=len(X)):
+            self.best_estimator_ = clone(final).set_params(**self.best_params_).fit(X, y)
+        self.refit_time_ = time.perf_counter() - inicio_refit
+        return self
+
+
+class BuscaGrade(BuscaSucessiva):
+    """
+    Busca exaustiva: todas as configurações com o fold inteiro, em uma única rodada.
+    Dá os mesmos scores e 'best_params_' do GridSearchCV, mas com o cache de folds e o
+    orçamento de ajustes/tempo da 'BuscaSucessiva'.
+    """
+
+    def __init__(self, estimator, param_grid, cv=5, scoring='r2', max_ajustes=None, max_segundos=None,
+                 n_jobs=None, verbose=0, cache_folds=True, crescimento_incremental=True, oob=False,
+                 checkpoint=None, nucleos=None, memoria_mb=None):
+        super().__init__(estimator, param_grid, cv=cv, scoring=scoring, max_ajustes=max_ajustes,
+                         max_segundos=max_segundos, n_jobs=n_jobs, verbose=verbose, cache_folds=cache_folds,
+                         crescimento_incremental=crescimento_incremental, oob=oob, checkpoint=checkpoint,
+                         nucleos=nucleos, memoria_mb=memoria_mb)
+
+    def _rodadas(self, n_candidatos, n_max):
+        return [n_max]
+
+    def _promover(self, ordenados):
+        return ordenados
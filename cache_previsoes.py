@@ -0,0 +1,156 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from servico_previsao import prever, COLUNAS_LOCALIZACAO
+
+# --- Cache de Previsões ---
+# Pedidos repetidos (o mesmo clique no dashboard, as mesmas combinações de preço, categoria e
+# estado no serviço) não precisam de um novo 'predict'. A chave de cada pedido é o hash do
+# vetor completo de features: as ausentes recebem o padrão do perfil de serviço, os números
+# viram float e os textos viram str, e as colunas entram em ordem alfabética. Assim, a ordem
+# das chaves do JSON, 3 vs 3.0 e uma coluna omitida vs. informada com o valor padrão dão a
+# mesma chave. As entradas de localização (prefixos de CEP e estados) entram também como foram
+# informadas, pois delas sai a distância entre cliente e vendedor: um estado omitido (distância
+# mediana) e o mesmo estado informado (distância calculada) dão chaves diferentes.
+#
+# O cache é um LRU limitado por número de itens e por tempo de vida (TTL). Ele guarda a
+# assinatura do modelo em uso ('versoes_modelo.assinatura_artefatos': a versão publicada ou,
+# sem versões, o tamanho e a data dos artefatos); quando ela muda, as previsões antigas são descartadas.
+
+MAX_ITENS = 10_000
+TTL_S = 3600
+
+
+def _ausente(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def _normalizar_local(valor):
+    """Prefixo de CEP ou estado como texto: '01310', 1310 e 1310.0 viram '1310'."""
+    if _ausente(valor):
+        return None
+    try:
+        return str(int(float(valor)))
+    except (TypeError, ValueError):
+        return str(valor)
+
+
+def chave_pedido(pedido, padroes):
+    """
+    Hash canônico do vetor completo de features do pedido (as ausentes com o valor padrão)
+    mais as entradas de localização como foram informadas.
+    """
+    vetor = {}
+    for coluna, padrao in padroes.items():
+        if coluna == 'percentual_frete':  # recalculado a partir do preço e do frete
+            continue
+        valor = pedido.get(coluna)
+        if _ausente(valor):
+            valor = padrao
+        vetor[coluna] = float(valor) if isinstance(padrao, float) else str(valor)
+    vetor['localizacao'] = [_normalizar_local(pedido.get(coluna)) for coluna in COLUNAS_LOCALIZACAO]
+    texto = json.dumps(vetor, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CachePrevisoes:
+    """LRU de previsões com limite de itens e TTL, invalidado quando a assinatura dos artefatos muda."""
+
+    def __init__(self, max_itens=MAX_ITENS, ttl_s=TTL_S):
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self._itens = OrderedDict()
+        self._assinatura = None
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.removidos_lru = 0
+        self.invalidacoes = 0
+
+    def _validar_assinatura(self, assinatura):
+        if assinatura != self._assinatura:
+            if self._assinatura is not None:
+                self.invalidacoes += 1
+            self._itens.clear()
+            self._assinatura = assinatura
+
+    def obter(self, chaves, assinatura):
+        """Previsões em cache para cada chave (None quando não há ou expirou)."""
+        agora = time.monotonic()
+        valores = []
+        with self._trava:
+            self._validar_assinatura(assinatura)
+            for chave in chaves:
+                item = self._itens.get(chave)
+                if item is not None and item[1] < agora:
+                    del self._itens[chave]
+                    self.expirados += 1
+                    item = None
+                if item is None:
+                    self.falhas += 1
+                    valores.append(None)
+                else:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    valores.append(item[0])
+        return valores
+
+    def guardar(self, chaves, valores, assinatura):
+        expira = time.monotonic() + self.ttl_s
+        with self._trava:
+            self._validar_assinatura(assinatura)
+            for chave, valor in zip(chaves, valores):
+                self._itens[chave] = (valor, expira)
+                self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.removidos_lru += 1
+
+    def prever(self, modelo, pedidos, padroes, assinatura, indice_geo=None):
+        """
+        Previsões para uma lista de pedidos (dicionários): as que estão no cache são devolvidas
+        direto, e as demais são previstas juntas, em um único 'predict', e guardadas.
+        """
+        chaves = [chave_pedido(pedido, padroes) for pedido in pedidos]
+        valores = self.obter(chaves, assinatura)
+        faltantes = [i for i, valor in enumerate(valores) if valor is None]
+        if faltantes:
+            # Pedidos repetidos dentro do mesmo lote são previstos uma vez só.
+            unicos = list(dict.fromkeys(chaves[i] for i in faltantes))
+            posicao = {chave: i for i, chave in enumerate(unicos)}
+            primeiro = {}
+            for i in faltantes:
+                primeiro.setdefault(chaves[i], i)
+            novos = prever(modelo, pd.DataFrame([pedidos[primeiro[chave]] for chave in unicos]), padroes,
+                           indice_geo).tolist()
+            self.guardar(unicos, novos, assinatura)
+            for i in faltantes:
+                valores[i] = novos[posicao[chaves[i]]]
+        return np.asarray(valores, dtype='float64')
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'ttl_s': self.ttl_s,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else None,
+                'expirados': self.expirados,
+                'removidos_lru': self.removidos_lru,
+                'invalidacoes': self.invalidacoes,
+            }
@@ -0,0 +1,434 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from fontes_dados import iterar_tabela, DATA_PATH
+from instrumentacao import etapa
+from tipos_compactos import ler_csv_com_tipos
+
+OUTPUT_PATH = 'data_processed'
+DATASET_COMPLETO_CSV = os.path.join(OUTPUT_PATH, 'olist_dataset_completo.csv')
+DATASET_COMPLETO_PARTICOES = os.path.join(OUTPUT_PATH, 'olist_dataset_completo')
+
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+# Incrementar sempre que a lógica de combinação mudar, para forçar a reconstrução
+# de todas as partições no modo incremental.
+VERSAO_COMBINACAO = 1
+
+PARTICAO_SEM_DATA = 'sem_data'
+
+
+def deduplicar_reviews(reviews):
+    """Mantém apenas a avaliação mais recente de cada pedido."""
+    return reviews.sort_values('review_answer_timestamp').drop_duplicates('order_id', keep='last')
+
+
+def agregar_pagamentos(payments):
+    """Agrega os pagamentos de cada pedido em uma única linha."""
+    return payments.groupby('order_id').agg({
+        'payment_sequential': 'max',
+        'payment_type': 'first', # Pega o primeiro tipo de pagamento
+        'payment_installments': 'max',
+        'payment_value': 'sum'
+    }).reset_index()
+
+
+def combinar_tabelas(order_items, orders, products, sellers, customers, reviews, payments, translation):
+    """
+    Executa a cadeia principal de merges, partindo de 'order_items'.
+    Usa 'left' merge para garantir que todos os itens da tabela original sejam mantidos.
+    """
+    # 1.1 Adicionar informações dos Pedidos (orders) aos Itens
+    # Chave: order_id
+    with etapa('merge:orders', linhas=len(order_items)):
+        data = pd.merge(order_items, orders, on='order_id', how='left')
+
+    # 1.2 Adicionar informações dos Produtos (products)
+    # Chave: product_id
+    with etapa('merge:products', linhas=len(order_items)):
+        data = pd.merge(data, products, on='product_id', how='left')
+
+    # 1.3 Adicionar informações dos Vendedores (sellers)
+    # Chave: seller_id
+    with etapa('merge:sellers', linhas=len(order_items)):
+        data = pd.merge(data, sellers, on='seller_id', how='left')
+
+    # 1.4 Adicionar informações dos Clientes (customers)
+    # Chave: customer_id
+    with etapa('merge:customers', linhas=len(order_items)):
+        data = pd.merge(data, customers, on='customer_id', how='left')
+
+    # 1.5 Adicionar informações das Avaliações (reviews)
+    # Um pedido pode ter múltiplas avaliações, então vamos pegar apenas a mais recente por pedido
+    with etapa('merge:reviews', linhas=len(order_items)):
+        data = pd.merge(data, deduplicar_reviews(reviews), on='order_id', how='left')
+
+    # 2.1 Adicionar informações de Pagamentos (payments)
+    # Um pedido pode ter múltiplos pagamentos (ex: boleto + voucher), então
+    # os pagamentos são agregados por pedido antes do merge.
+    with etapa('merge:payments', linhas=len(order_items)):
+        data = pd.merge(data, agregar_pagamentos(payments), on='order_id', how='left')
+
+    # 2.2 Adicionar a Tradução das Categorias de Produtos
+    # Chave: product_category_name
+    with etapa('merge:translation', linhas=len(order_items)):
+        data = pd.merge(data, translation, on='product_category_name', how='left')
+
+    return data
+
+
+# --- Modo em Lotes (memória limitada) ---
+# As tabelas menores viram tabelas de consulta indexadas pela chave, e 'order_items'
+# é lido e escrito em lotes de tamanho fixo. O resultado é idêntico ao de 'combinar_tabelas'.
+
+# Memória estimada de um lote durante a junção, em múltiplos do tamanho do lote já combinado
+# (lote de entrada, cópias dos 'concat' e o buffer de escrita do CSV).
+FATOR_PICO_LOTE = 4
+MIN_LINHAS_POR_LOTE = 1_000
+LINHAS_AMOSTRA = 1_000
+
+
+def preparar_dimensoes(orders, products, sellers, customers, reviews, payments, translation):
+    """
+    Monta as tabelas de consulta da cadeia de merges, na mesma ordem de 'combinar_tabelas',
+    cada uma indexada pela sua chave. As chaves precisam ser únicas, como nos merges
+    'left' que não multiplicam as linhas de 'order_items'.
+    """
+    passos = [
+        ('order_id', orders),
+        ('product_id', products),
+        ('seller_id', sellers),
+        ('customer_id', customers),
+        ('order_id', deduplicar_reviews(reviews)),
+        ('order_id', agregar_pagamentos(payments)),
+        ('product_category_name', translation),
+    ]
+    dimensoes = []
+    for chave, tabela in passos:
+        indexada = tabela.set_index(chave)
+        indexada.index = indexada.index.astype(object)
+        if not indexada.index.is_unique:
+            raise ValueError(
+                f"A chave '{chave}' se repete em uma das tabelas de consulta; "
+                "o modo em lotes exige chaves únicas (use o modo completo)."
+            )
+        dimensoes.append((chave, indexada))
+    return dimensoes
+
+
+def _chaves_ausentes(lote, dimensoes):
+    """
+    Indica, para cada passo da cadeia, se alguma linha do lote fica sem correspondência.
+    Só as colunas-chave são propagadas (ex: 'customer_id' vem de 'orders').
+    """
+    chaves_cadeia = {chave for chave, _ in dimensoes}
+    valores = {c: lote[c].to_numpy(dtype=object) for c in lote.columns if c in chaves_cadeia}
+    ausentes = []
+    for chave, dimensao in dimensoes:
+        posicoes = dimensao.index.get_indexer(valores[chave])
+        faltando = posicoes < 0
+        ausentes.append(bool(faltando.any()))
+        for col in dimensao.columns:
+            if col in chaves_cadeia:
+                propagados = dimensao[col].to_numpy(dtype=object)[posicoes]
+                propagados[faltando] = np.nan
+                valores[col] = propagados
+    return ausentes
+
+
+def _ajustar_tipos(dimensoes, ausentes):
+    """
+    No merge 'left', colunas inteiras viram float64 quando alguma linha fica sem correspondência.
+    Como isso depende do dataset inteiro e não de cada lote, o ajuste é feito uma vez nas dimensões.
+    """
+    ajustadas = []
+    for (chave, dimensao), tem_ausentes in zip(dimensoes, ausentes):
+        if tem_ausentes:
+            inteiras = [c for c in dimensao.columns if pd.api.types.is_integer_dtype(dimensao[c].dtype)]
+            dimensao = dimensao.astype({c: 'float64' for c in inteiras})
+        ajustadas.append((chave, dimensao))
+    return ajustadas
+
+
+def juntar_lote(lote, dimensoes):
+    """Aplica a cadeia de merges a um lote de 'order_items' usando as tabelas de consulta."""
+    for chave, dimensao in dimensoes:
+        extra = dimensao.reindex(lote[chave].to_numpy(dtype=object))
+        extra.index = lote.index
+        lote = pd.concat([lote, extra], axis=1)
+    return lote
+
+
+def _memoria_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def combinar_em_lotes(dimensoes, caminho_saida, memoria_max_mb=1024, data_path=DATA_PATH):
+    """
+    Combina 'order_items' com as tabelas de consulta em lotes e grava o CSV lote a lote.
+    O tamanho do lote é calculado para que tabelas de consulta + lote fiquem abaixo de
+    'memoria_max_mb'. Retorna (linhas, colunas, linhas_por_lote).
+    """
+    chaves_itens = [chave for chave, _ in dimensoes if chave in ('order_id', 'product_id', 'seller_id')]
+    chaves_itens = list(dict.fromkeys(chaves_itens))
+
+    # 1. Varredura só das chaves, para reproduzir os tipos do merge do dataset inteiro.
+    ausentes = [False] * len(dimensoes)
+    for lote in iterar_tabela('order_items', 200_000, colunas=chaves_itens, data_path=data_path):
+        ausentes = [a or b for a, b in zip(ausentes, _chaves_ausentes(lote, dimensoes))]
+    dimensoes = _ajustar_tipos(dimensoes, ausentes)
+
+    # 2. Tamanho do lote a partir do teto de memória e de uma amostra já combinada.
+    memoria_dimensoes = sum(_memoria_bytes(d) for _, d in dimensoes)
+    amostra = next(iterar_tabela('order_items', LINHAS_AMOSTRA, data_path=data_path), None)
+    if amostra is None or amostra.empty:
+        raise ValueError("A tabela 'order_items' está vazia; não há o que combinar.")
+    bytes_por_linha = _memoria_bytes(juntar_lote(amostra, dimensoes)) / len(amostra)
+    disponivel = memoria_max_mb * 1024 ** 2 - memoria_dimensoes
+    linhas_por_lote = max(MIN_LINHAS_POR_LOTE, int(disponivel / (FATOR_PICO_LOTE * bytes_por_linha)))
+    if disponivel <= 0:
+        print(
+            f"Aviso: as tabelas de consulta já ocupam {memoria_dimensoes / 1024 ** 2:.0f} MB, acima do teto "
+            f"de {memoria_max_mb} MB. Usando o lote mínimo de {MIN_LINHAS_POR_LOTE} linhas."
+        )
+
+    # 3. Junção e escrita lote a lote, em arquivo temporário trocado atomicamente no final.
+    temporario = caminho_saida + '.tmp'
+    linhas = 0
+    colunas = []
+    for lote in iterar_tabela('order_items', linhas_por_lote, data_path=data_path):
+        with etapa('merge:lote', linhas=len(lote)):
+            combinado = juntar_lote(lote, dimensoes)
+            combinado.to_csv(
+                temporario, index=False, date_format=FORMATO_DATA,
+                mode='w' if linhas == 0 else 'a', header=linhas == 0
+            )
+        linhas += len(combinado)
+        colunas = combinado.columns.tolist()
+    os.replace(temporario, caminho_saida)
+    return linhas, colunas, linhas_por_lote
+
+
+# --- Modo Incremental (saída particionada por mês da compra) ---
+
+def _hash_linhas(df):
+    """Hash de 64 bits de cada linha (o índice não entra no cálculo)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _hash_por_chave(df, chave):
+    """Combina (soma módulo 2^64) os hashes de todas as linhas que compartilham a mesma chave."""
+    hashes = pd.Series(_hash_linhas(df), index=df[chave].to_numpy())
+    return hashes.groupby(level=0).sum()
+
+
+def _buscar(hashes, chaves):
+    """Busca o hash de cada chave; chaves ausentes recebem 0."""
+    posicoes = hashes.index.get_indexer(np.asarray(chaves, dtype=object))
+    return np.where(posicoes >= 0, hashes.to_numpy()[posicoes], np.uint64(0)).astype('uint64')
+
+
+def _misturar(hashes, componente):
+    """
+    Re-hash de um vetor de hashes, com uma constante diferente por componente,
+    para que componentes distintos não se cancelem na soma.
+    """
+    constante = np.uint64(int.from_bytes(hashlib.sha256(componente.encode('utf-8')).digest()[:8], 'little'))
+    return pd.util.hash_array(np.asarray(hashes, dtype='uint64') ^ constante)
+
+
+def calcular_impressoes(tabelas):
+    """
+    Calcula uma impressão digital por 'order_id' que cobre todas as linhas que
+    contribuem para as linhas daquele pedido no dataset final: itens, o próprio pedido,
+    avaliações, pagamentos e as dimensões (produto, tradução, vendedor e cliente).
+    Só hashes são combinados aqui; nenhum merge das tabelas completas é feito.
+    """
+    order_items = tabelas['order_items']
+    orders = tabelas['orders']
+    products = tabelas['products']
+
+    # Dimensões: a tradução entra no hash do produto pela categoria.
+    h_traducao = _hash_por_chave(tabelas['translation'], 'product_category_name')
+    h_produto = _hash_por_chave(products, 'product_id')
+    categoria = products.drop_duplicates('product_id').set_index('product_id')['product_category_name']
+    h_produto = h_produto + _misturar(
+        _buscar(h_traducao, categoria.reindex(h_produto.index).to_numpy()), 'traducao'
+    )
+    h_vendedor = _hash_por_chave(tabelas['sellers'], 'seller_id')
+    h_cliente = _hash_por_chave(tabelas['customers'], 'customer_id')
+
+    # Itens: cada linha carrega também o hash do seu produto e do seu vendedor.
+    h_item = (
+        _hash_linhas(order_items)
+        + _misturar(_buscar(h_produto, order_items['product_id']), 'produto')
+        + _misturar(_buscar(h_vendedor, order_items['seller_id']), 'vendedor')
+    )
+    h_itens = pd.Series(h_item, index=order_items['order_id'].to_numpy()).groupby(level=0).sum()
+
+    # Pedido: o registro do pedido mais o do cliente.
+    h_pedido = pd.Series(
+        _hash_linhas(orders) + _misturar(_buscar(h_cliente, orders['customer_id']), 'cliente'),
+        index=orders['order_id'].to_numpy()
+    ).groupby(level=0).sum()
+
+    h_reviews = _hash_por_chave(tabelas['reviews'], 'order_id')
+    h_pagamentos = _hash_por_chave(tabelas['payments'], 'order_id')
+
+    componentes = {'itens': h_itens, 'pedido': h_pedido, 'reviews': h_reviews, 'pagamentos': h_pagamentos}
+    indice = h_itens.index
+    for serie in componentes.values():
+        indice = indice.union(serie.index)
+
+    impressao = np.zeros(len(indice), dtype='uint64')
+    for nome, serie in componentes.items():
+        impressao += _misturar(_buscar(serie, indice), nome)
+    return pd.Series(impressao, index=indice, name='impressao')
+
+
+def calcular_particoes(orders, order_ids):
+    """Mapeia cada 'order_id' ao mês da compra ('AAAA-MM') ou a 'sem_data'."""
+    compra = orders.drop_duplicates('order_id').set_index('order_id')['order_purchase_timestamp']
+    compra = pd.to_datetime(compra.reindex(order_ids), errors='coerce')
+    particao = compra.dt.strftime('%Y-%m').fillna(PARTICAO_SEM_DATA)
+    return pd.Series(particao.to_numpy(), index=order_ids, name='particao')
+
+
+def _caminho_particao(saida_dir, particao):
+    return os.path.join(saida_dir, f'mes={particao}.csv')
+
+
+def _ler_estado(saida_dir):
+    """Lê o manifesto e as impressões da última execução incremental (ou None)."""
+    caminho_manifesto = os.path.join(saida_dir, '_manifesto.json')
+    caminho_impressoes = os.path.join(saida_dir, '_impressoes.csv')
+    if not (os.path.exists(caminho_manifesto) and os.path.exists(caminho_impressoes)):
+        return None, None
+    with open(caminho_manifesto, 'r') as f:
+        manifesto = json.load(f)
+    if manifesto.get('versao_combinacao') != VERSAO_COMBINACAO:
+        return None, None
+    estado = pd.read_csv(
+        caminho_impressoes, dtype={'order_id': 'object', 'impressao': 'uint64', 'particao': 'object'}
+    ).set_index('order_id')
+    return manifesto, estado
+
+
+def _salvar_estado(saida_dir, estado, particoes):
+    """Salva as impressões e o manifesto; o manifesto é escrito por último."""
+    caminho_impressoes = os.path.join(saida_dir, '_impressoes.csv')
+    estado.rename_axis('order_id').reset_index().to_csv(caminho_impressoes + '.tmp', index=False)
+    os.replace(caminho_impressoes + '.tmp', caminho_impressoes)
+
+    caminho_manifesto = os.path.join(saida_dir, '_manifesto.json')
+    manifesto = {'versao_combinacao': VERSAO_COMBINACAO, 'particoes': sorted(particoes)}
+    with open(caminho_manifesto + '.tmp', 'w') as f:
+        json.dump(manifesto, f, indent=4)
+    os.replace(caminho_manifesto + '.tmp', caminho_manifesto)
+
+
+def reconstruir_incremental(tabelas, saida_dir=DATASET_COMPLETO_PARTICOES):
+    """
+    Atualiza o dataset completo particionado por mês de 'order_purchase_timestamp'.
+    Só as partições com pedidos novos, alterados ou removidos (em qualquer tabela de origem,
+    incluindo avaliações tardias e pagamentos extras) são recombinadas e reescritas.
+    Retorna a lista de partições reescritas.
+    """
+    os.makedirs(saida_dir, exist_ok=True)
+    manifesto, estado_anterior = _ler_estado(saida_dir)
+
+    impressoes = calcular_impressoes(tabelas)
+    particoes = calcular_particoes(tabelas['orders'], impressoes.index)
+    estado = pd.DataFrame({'impressao': impressoes, 'particao': particoes})
+
+    if estado_anterior is None:
+        # Sem estado válido (primeira execução ou versão nova): todas as partições são refeitas.
+        afetadas = set(estado['particao'])
+        existentes = set()
+    else:
+        existentes = set(manifesto['particoes'])
+        posicoes = estado_anterior.index.get_indexer(estado.index)
+        encontrado = posicoes >= 0
+        impressao_anterior = estado_anterior['impressao'].to_numpy()[posicoes]
+        particao_anterior = estado_anterior['particao'].to_numpy()[posicoes]
+        mudou = (
+            ~encontrado
+            | (estado['impressao'].to_numpy() != impressao_anterior)
+            | (estado['particao'].to_numpy() != particao_anterior)
+        )
+        removidos = ~estado_anterior.index.isin(estado.index)
+        # Um pedido que mudou de mês afeta tanto a partição antiga quanto a nova.
+        afetadas = (
+            set(estado['particao'].to_numpy()[mudou])
+            | set(particao_anterior[mudou & encontrado])
+            | set(estado_anterior['particao'].to_numpy()[removidos])
+        )
+
+    # Apenas pedidos com itens geram linhas no dataset final.
+    order_items = tabelas['order_items']
+    particao_item = particoes.reindex(order_items['order_id'].to_numpy()).to_numpy()
+    com_itens = set(pd.unique(particao_item))
+
+    reescritas = []
+    for particao in sorted(afetadas):
+        caminho = _caminho_particao(saida_dir, particao)
+        if particao not in com_itens:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            continue
+
+        itens = order_items[particao_item == particao]
+        pedidos = set(itens['order_id'])
+        subconjunto = {
+            'order_items': itens,
+            'orders': tabelas['orders'][tabelas['orders']['order_id'].isin(pedidos)],
+            'reviews': tabelas['reviews'][tabelas['reviews']['order_id'].isin(pedidos)],
+            'payments': tabelas['payments'][tabelas['payments']['order_id'].isin(pedidos)],
+        }
+        for dimensao in ('products', 'sellers', 'customers', 'translation'):
+            subconjunto[dimensao] = tabelas[dimensao]
+
+        data = combinar_tabelas(**subconjunto)
+        data.to_csv(caminho + '.tmp', index=False, date_format=FORMATO_DATA)
+        os.replace(caminho + '.tmp', caminho)
+        reescritas.append(particao)
+
+    # Partições que deixaram de ter itens são removidas do disco.
+    for particao in existentes - com_itens:
+        caminho = _caminho_particao(saida_dir, particao)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    _salvar_estado(saida_dir, estado, com_itens)
+    return reescritas
+
+
+def remover_particoes(saida_dir=DATASET_COMPLETO_PARTICOES):
+    """Apaga a saída particionada (usado quando o modo completo reescreve o CSV único)."""
+    if os.path.isdir(saida_dir):
+        shutil.rmtree(saida_dir)
+
+
+def carregar_dataset_completo(colunas=None):
+    """
+    Carrega o dataset completo: das partições mensais (modo incremental) quando o
+    manifesto delas existe; senão, do CSV único (modo completo).
+    """
+    manifesto_path = os.path.join(DATASET_COMPLETO_PARTICOES, '_manifesto.json')
+    if os.path.exists(manifesto_path):
+        with open(manifesto_path, 'r') as f:
+            manifesto = json.load(f)
+        with etapa('carregar:olist_dataset_completo (partições)', categoria='io') as e:
+            partes = [
+                pd.read_csv(_caminho_particao(DATASET_COMPLETO_PARTICOES, p), usecols=colunas)
+                for p in manifesto['particoes']
+            ]
+            df = pd.concat(partes, ignore_index=True)
+            e.linhas = len(df)
+        return df
+    return ler_csv_com_tipos(DATASET_COMPLETO_CSV, usecols=colunas)
@@ -0,0 +1,146 @@
+import copy
+import io
+import time
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import BaseEnsemble, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+# --- Compressão do Modelo ---
+# Depois do treino, procura um modelo menor cuja perda de R² fique dentro do orçamento
+# ('perda_max_r2'). A escolha (o prefixo de árvores, o aluno e o vencedor) é feita em uma
+# fatia separada do treino ('FRACAO_SELECAO'), que os alunos não veem; o conjunto de teste
+# só é usado para as métricas finais do relatório. O modelo original foi treinado também
+# nessa fatia, então a perda medida ali é pessimista: a escolha erra para o lado seguro.
+# Duas estratégias:
+#   'subconjunto_arvores': nas florestas, mantém só as primeiras k árvores. Como as árvores
+#       são independentes e sorteadas da mesma forma, o prefixo é uma floresta menor
+#       equivalente; o menor k dentro do orçamento é escolhido.
+#   'destilacao': treina um modelo aluno menor sobre o mesmo pré-processamento, com as
+#       previsões do modelo original no resto do treino como alvo.
+# Entre os candidatos dentro do orçamento, vence o de menor artefato.
+
+COMPRIMIDO_PATH = 'data/modelo_vendas_comprimido.pkl'
+FRACAO_SELECAO = 0.2
+
+# Alunos da destilação, do mais simples ao mais complexo. Cada um recebe o 'n_jobs' planejado
+# (o HistGradientBoosting não tem 'n_jobs': as suas threads OpenMP seguem o ambiente).
+ALUNOS = {
+    'hist_gradient_boosting': lambda n_jobs: HistGradientBoostingRegressor(max_iter=200, max_leaf_nodes=31,
+                                                                           random_state=42),
+    'random_forest_raso': lambda n_jobs: RandomForestRegressor(n_estimators=50, max_depth=12, min_samples_leaf=2,
+                                                               random_state=42, n_jobs=n_jobs),
+}
+
+
+def tamanho_mb(pipeline):
+    """Tamanho do pipeline serializado com joblib, em MB."""
+    buffer = io.BytesIO()
+    joblib.dump(pipeline, buffer)
+    return buffer.getbuffer().nbytes / 1024 ** 2
+
+
+def _medir(pipeline, X_test, y_test):
+    inicio = time.perf_counter()
+    previsao = pipeline.predict(X_test)
+    latencia = time.perf_counter() - inicio
+    return {
+        'r2_teste': r2_score(y_test, previsao),
+        'mse_teste': mean_squared_error(y_test, previsao),
+        'tamanho_mb': tamanho_mb(pipeline),
+        'latencia_lote_ms': 1000 * latencia,
+    }
+
+
+def _subconjunto_arvores(pipeline, X_selecao, y_selecao, r2_minimo):
+    """Menor prefixo de árvores da floresta com R² na fatia de seleção >= r2_minimo (ou None)."""
+    interno = pipeline.regressor_
+    modelo = interno.named_steps['model']
+    if not isinstance(modelo, BaseEnsemble) or not hasattr(modelo, 'estimators_'):
+        return None
+
+    X_transformado = interno.named_steps['preprocessor'].transform(X_selecao)
+    # Previsão de cada árvore na escala do treino (log1p); a média acumulada dá a de cada prefixo.
+    por_arvore = np.array([arvore.predict(X_transformado) for arvore in modelo.estimators_])
+    medias = np.cumsum(por_arvore, axis=0) / np.arange(1, len(por_arvore) + 1)[:, None]
+    for k, media in enumerate(medias, start=1):
+        if r2_score(y_selecao, pipeline.inverse_func(media)) >= r2_minimo:
+            if k == len(modelo.estimators_):
+                return None
+            comprimido = copy.deepcopy(pipeline)
+            floresta = comprimido.regressor_.named_steps['model']
+            floresta.estimators_ = floresta.estimators_[:k]
+            floresta.n_estimators = k
+            return comprimido, {'n_arvores': k, 'n_arvores_original': len(modelo.estimators_)}
+    return None
+
+
+def _destilar(pipeline, aluno, X_train):
+    """Treina o aluno, sobre uma cópia do mesmo pré-processamento, para imitar o pipeline original."""
+    interno = pipeline.regressor_
+    alvo_professor = pipeline.predict(X_train)
+    estudante = TransformedTargetRegressor(
+        regressor=Pipeline(steps=[
+            ('preprocessor', clone(interno.named_steps['preprocessor'])),
+            ('model', aluno)
+        ]),
+        func=pipeline.func,
+        inverse_func=pipeline.inverse_func
+    )
+    return estudante.fit(X_train, alvo_professor)
+
+
+def comprimir_modelo(pipeline, X_train, y_train, X_test, y_test, perda_max_r2,
+                     fracao_selecao=FRACAO_SELECAO, n_jobs=-1, random_state=42):
+    """
+    Procura o menor pipeline com R² >= R² original - perda_max_r2 na fatia de seleção
+    separada de 'X_train'; o conjunto de teste só entra nas métricas do relatório.
+    'n_jobs' vai para os alunos da destilação.
+    Retorna (pipeline escolhido ou None, relatório para o 'model_metrics.json').
+    """
+    X_ajuste, X_selecao, _, y_selecao = train_test_split(
+        X_train, y_train, test_size=fracao_selecao, random_state=random_state)
+    original = _medir(pipeline, X_test, y_test)
+    original['r2_selecao'] = r2_score(y_selecao, pipeline.predict(X_selecao))
+    r2_minimo = original['r2_selecao'] - perda_max_r2
+    candidatos = []
+
+    subconjunto = _subconjunto_arvores(pipeline, X_selecao, y_selecao, r2_minimo)
+    if subconjunto is not None:
+        comprimido, detalhes = subconjunto
+        candidatos.append(('subconjunto_arvores', comprimido, detalhes))
+
+    for nome, criar in ALUNOS.items():
+        candidatos.append((f'destilacao_{nome}', _destilar(pipeline, criar(n_jobs), X_ajuste), {}))
+
+    avaliados = []
+    for estrategia, comprimido, detalhes in candidatos:
+        medidas = _medir(comprimido, X_test, y_test)
+        medidas['r2_selecao'] = r2_score(y_selecao, comprimido.predict(X_selecao))
+        medidas.update(detalhes, estrategia=estrategia,
+                       perda_r2_selecao=original['r2_selecao'] - medidas['r2_selecao'],
+                       perda_r2=original['r2_teste'] - medidas['r2_teste'])
+        avaliados.append((medidas, comprimido))
+        print(f"[compressão] {estrategia}: perda de R² {medidas['perda_r2_selecao']:.4f} na seleção, "
+              f"R² de teste {medidas['r2_teste']:.4f} (perda {medidas['perda_r2']:.4f}), "
+              f"{medidas['tamanho_mb']:.2f} MB, {medidas['latencia_lote_ms']:.1f} ms no lote de teste")
+
+    dentro = [(m, p) for m, p in avaliados
+              if m['r2_selecao'] >= r2_minimo and m['tamanho_mb'] < original['tamanho_mb']]
+    relatorio = {
+        'perda_max_r2': perda_max_r2,
+        'fracao_selecao': fracao_selecao,
+        'original': original,
+        'candidatos': [m for m, _ in avaliados],
+        'escolhido': None,
+    }
+    if not dentro:
+        return None, relatorio
+    medidas, escolhido = min(dentro, key=lambda item: item[0]['tamanho_mb'])
+    relatorio['escolhido'] = medidas
+    return escolhido, relatorio
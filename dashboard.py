@@ -1,10 +1,15 @@
+import time
 import streamlit as st
+import altair as alt
 import pandas as pd
 import numpy as np
-import joblib
-import json
 import os
 from fpdf import FPDF
+from instrumentacao import etapa
+from cache_previsoes import CachePrevisoes
+from explicacoes_modelo import explicar_previsoes, serie_importancia
+from servico_previsao import prever_em_lotes, varrer_cenarios, COLUNA_PREVISAO, FEATURES_MODELO
+from versoes_modelo import ArtefatosRecarregaveis, listar_versoes, reverter_versao
 
 # --- Configuração da Página ---
 st.set_page_config(page_title="Dashboard de Vendas", layout="wide")
@@ -13,63 +18,129 @@ st.title("📊 Dashboard de Análise e Previsão de Vendas")
 
 # --- Funções de Carregamento ---
 
-@st.cache_data
-def load_processed_data(file_path):
-    """Carrega o dataset final, já processado."""
-    try:
-        return pd.read_csv(file_path)
-    except FileNotFoundError:
-        st.error(f"Erro: O dataset processado '{file_path}' não foi encontrado.")
-        st.info("Por favor, execute o script 'engenharia_features.py' primeiro para gerar o arquivo.")
-        return None
+@st.cache_resource
+def load_versioned_artifacts():
+    """
+    Carrega a versão atual do modelo (pipeline, modelo compilado, métricas, nomes das features e
+    perfil de serviço). Uma thread observa 'data/versoes/ATUAL' e troca tudo de uma vez, em
+    segundo plano, quando o 'main.py' publica uma versão nova.
+    """
+    return ArtefatosRecarregaveis()
 
 
 @st.cache_resource
-def load_model_pipeline(file_path):
-    """Carrega o pipeline do modelo treinado."""
-    try:
-        return joblib.load(file_path)
-    except FileNotFoundError:
-        st.error(f"Erro: O pipeline '{file_path}' não foi encontrado.")
-        st.info("Por favor, execute o script 'main.py' para treinar o modelo e salvar o pipeline.")
-        return None
-
-
-@st.cache_data
-def load_json_data(file_path):
-    """Carrega arquivos JSON, como as métricas do modelo."""
-    try:
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        st.error(f"Erro: O arquivo de métricas '{file_path}' não foi encontrado.")
-        st.info("Por favor, execute o script 'main.py'.")
-        return None
+def load_prediction_cache():
+    """Cache de previsões compartilhado pelas sessões do dashboard."""
+    return CachePrevisoes()
 
 
-# --- Carregamento Principal dos Artefatos ---
+@st.cache_data(max_entries=64, show_spinner=False)
+def calcular_varredura(_modelo, _padroes, _indice_geo, assinatura, base, eixos):
+    """
+    Previsões de toda a grade de cenários em um único 'predict'. O cache é indexado pela versão
+    do modelo ('assinatura'), pelo pedido base e pelos valores de cada eixo.
+    """
+    return varrer_cenarios(_modelo, base, eixos, _padroes, _indice_geo)
+
 
-# Definindo os caminhos corretos para os artefatos
-PROCESSED_DATA_PATH = os.path.join('database', 'dataset_para_modelo.csv')
-PIPELINE_PATH = os.path.join('data', 'modelo_vendas.pkl')
-METRICS_PATH = os.path.join('data', 'model_metrics.json')
-FEATURES_NAMES_PATH = os.path.join('data', 'encoders.pkl')
+@st.cache_data(max_entries=256, show_spinner=False)
+def explicar_pedido(_modelo, _padroes, _indice_geo, assinatura, pedido):
+    """Valor de referência e contribuição de cada coluna (em R$) para a previsão de um pedido."""
+    referencia, contribuicoes = explicar_previsoes(_modelo, pd.DataFrame([pedido]), _padroes, _indice_geo)
+    return referencia, contribuicoes.iloc[0]
 
-# Carregar tudo
-df_processed = load_processed_data(PROCESSED_DATA_PATH)
-pipeline_model = load_model_pipeline(PIPELINE_PATH)
-model_metrics = load_json_data(METRICS_PATH)
+
+# --- Carregamento Principal dos Artefatos ---
+
+# Se o carregamento falhar, nada fica em cache e a próxima interação tenta de novo.
 try:
-    feature_names = joblib.load(FEATURES_NAMES_PATH)
-except FileNotFoundError:
-    feature_names = None
+    artefatos_versionados = load_versioned_artifacts()
+except (FileNotFoundError, ValueError) as e:
+    st.error(f"Erro: Os artefatos do modelo não puderam ser carregados. {e}")
+    st.info("Por favor, execute o script 'main.py' para treinar o modelo e salvar os artefatos.")
+    st.stop()
+
+# Uma cópia da referência por execução: mesmo que a versão troque no meio, esta execução
+# usa pipeline, métricas e perfil da mesma versão.
+artefatos = artefatos_versionados.atual
+pipeline_model = artefatos['pipeline']
+# As previsões usam o modelo compilado quando ele existe; o pipeline fica para a importância das features.
+modelo_previsao = artefatos['modelo']
+model_metrics = artefatos['metricas']
+feature_names = artefatos['nomes_features']
+importancia_permutacao = artefatos['importancia']
+perfil_servico = artefatos['perfil']
+assinatura_modelo = artefatos['assinatura']
+cache_previsoes = load_prediction_cache()
 
 # Parar a execução se os arquivos essenciais não forem carregados
-if df_processed is None or pipeline_model is None or model_metrics is None:
+if model_metrics is None:
+    st.error(f"Erro: O arquivo de métricas 'model_metrics.json' não foi encontrado em '{artefatos['pasta']}'.")
+    st.info("Por favor, execute o script 'main.py'.")
     st.stop()
+padroes_features = perfil_servico['padroes']
+# A distância entre cliente e vendedor sai do estado do cliente (e do vendedor, nas simulações).
+indice_geo = artefatos['indice_geo']
+vocabularios = perfil_servico['vocabularios']
+
+# --- Versão do Modelo ---
+with st.sidebar:
+    st.subheader("🗂️ Versão do Modelo")
+    st.write(f"Em uso: **{artefatos['versao'] or 'artefatos de data/ (sem versão)'}**")
+    if artefatos_versionados.erro:
+        st.warning(f"A última tentativa de carregar uma versão nova falhou: {artefatos_versionados.erro}")
+    if len(listar_versoes()) > 1 and st.button("↩️ Voltar para a versão anterior"):
+        try:
+            reverter_versao()
+            artefatos_versionados.verificar()
+            st.rerun()
+        except ValueError as e:
+            st.warning(str(e))
+
+
+def indice_opcao(coluna, preferida):
+    """Posição da opção preferida no vocabulário da coluna (ou do valor padrão, se ela não existir)."""
+    opcoes = vocabularios[coluna]
+    return opcoes.index(preferida if preferida in opcoes else padroes_features[coluna])
+
+
+# --- Análise de Sensibilidade ---
+# Entradas que podem ser variadas na simulação; as inteiras recebem só valores inteiros.
+ENTRADAS_VARREDURA = {
+    'price': "Preço do Produto (R$)",
+    'freight_value': "Valor do Frete (R$)",
+    'product_weight_g': "Peso do Produto (g)",
+    'payment_installments': "Número de Parcelas",
+    'review_score': "Nota da Avaliação",
+    'product_category_name_english': "Categoria do Produto",
+    'customer_state': "Estado do Cliente",
+    'seller_state': "Estado do Vendedor",
+    'payment_type': "Forma de Pagamento",
+}
+ENTRADAS_INTEIRAS = {'product_weight_g', 'payment_installments', 'review_score'}
+MAX_PONTOS_VARREDURA = 20_000
+
+
+def faixa_padrao(coluna):
+    """Intervalo inicial de uma entrada numérica: percentis 1 e 99 do perfil de serviço."""
+    if coluna == 'payment_installments':
+        return 1.0, 24.0
+    faixas = perfil_servico.get('faixas', {})  # perfis antigos não têm faixas
+    if coluna in faixas:
+        return tuple(faixas[coluna])
+    return 0.0, 2 * float(padroes_features[coluna]) or 1.0
+
+
+def valores_eixo(coluna, minimo, maximo, pontos):
+    valores = np.linspace(minimo, maximo, pontos)
+    if coluna in ENTRADAS_INTEIRAS:
+        return np.unique(np.round(valores)).astype(int).tolist()
+    return np.unique(np.round(valores, 2)).tolist()
+
 
 # --- Abas do Dashboard ---
-aba1, aba2, aba3 = st.tabs(["🎯 Previsão e Análise do Modelo", "📄 Gerar Relatório PDF", "📄 Sobre o Projeto"])
+aba1, aba2, aba3, aba4 = st.tabs(["🎯 Previsão e Análise do Modelo", "📄 Gerar Relatório PDF", "📄 Sobre o Projeto",
+                                  "📦 Pontuação em Lote"])
 
 # --- Aba 1: Previsão e Análise ---
 with aba1:
@@ -96,60 +167,58 @@ with aba1:
 
             'product_category_name_english': st.selectbox(
                 "Categoria do Produto",
-                options=sorted(df_processed['product_category_name_english'].dropna().unique().tolist()),
-                index=sorted(df_processed['product_category_name_english'].dropna().unique().tolist()).index(
-                    'bed_bath_table')
+                options=vocabularios['product_category_name_english'],
+                index=indice_opcao('product_category_name_english', 'bed_bath_table')
             ),
 
             'customer_state': st.selectbox(
                 "Estado do Cliente",
-                options=sorted(df_processed['customer_state'].dropna().unique().tolist()),
-                index=sorted(df_processed['customer_state'].dropna().unique().tolist()).index('SP')
+                options=vocabularios['customer_state'],
+                index=indice_opcao('customer_state', 'SP')
             ),
 
             'payment_installments': st.slider("Número de Parcelas", min_value=1, max_value=24, value=3)
         }
 
         if st.button("Prever Valor da Venda", key="predict_button", type="primary"):
-            # A lógica a partir daqui contínua a mesma, pois ela precisa
-            # preencher as features 'ocultas' que o usuário não inseriu.
-
-            features_do_modelo = [
-                'price', 'freight_value', 'product_name_lenght', 'product_description_lenght',
-                'product_photos_qty', 'product_weight_g', 'product_length_cm', 'product_height_cm',
-                'product_width_cm', 'review_score', 'payment_sequential', 'payment_installments',
-                'tempo_entrega_dias', 'tempo_estimado_dias', 'atraso_na_entrega_dias',
-                'compra_dia_da_semana', 'compra_mes', 'percentual_frete',
-                'seller_state', 'customer_state', 'payment_type', 'product_category_name_english'
-            ]
-
-            input_completo = {}
-            for feature in features_do_modelo:
-                if feature in input_data_usuario:
-                    input_completo[feature] = input_data_usuario[feature]
-                else:
-                    if df_processed[feature].dtype == 'object':
-                        input_completo[feature] = df_processed[feature].mode()[0]
-                    else:
-                        input_completo[feature] = df_processed[feature].median()
-
-            if 'price' in input_completo and input_completo['price'] > 0:
-                input_completo['percentual_frete'] = input_completo['freight_value'] / (
-                            input_completo['price'] + input_completo['freight_value'])
-            else:
-                input_completo['percentual_frete'] = 0
-
+            # As features 'ocultas' que o usuário não inseriu recebem os valores padrão
+            # (moda/mediana), como na pontuação em lote ('servico_previsao.py').
             try:
-                input_df = pd.DataFrame([input_completo])
-                input_df = input_df[features_do_modelo]
-
-                prediction = pipeline_model.predict(input_df)[0]
+                # Entradas já previstas (por esta ou outra sessão) saem do cache, sem novo 'predict'.
+                with etapa('dashboard:previsao', categoria='servico', linhas=1):
+                    prediction = cache_previsoes.prever(
+                        modelo_previsao, [input_data_usuario], padroes_features, assinatura_modelo, indice_geo)[0]
 
                 st.success(f"**Valor Previsto da Venda: R$ {prediction:.2f}**")
+                estatisticas_cache = cache_previsoes.estatisticas()
+                st.caption(f"Cache de previsões: {estatisticas_cache['itens']} itens, "
+                           f"taxa de acerto de {estatisticas_cache['taxa_acerto']:.0%}.")
                 st.session_state.ultima_predicao = prediction
             except Exception as e:
                 st.error(f"Erro ao realizar a previsão: {e}")
                 st.session_state.ultima_predicao = 0.0
+            else:
+                # Por que este valor: quanto cada informação do pedido somou ou subtraiu, em R$,
+                # a partir do valor de referência do modelo (decomposição do caminho nas árvores).
+                try:
+                    with etapa('dashboard:explicacao', categoria='servico', linhas=1):
+                        referencia, contribuicoes = explicar_pedido(
+                            modelo_previsao, padroes_features, indice_geo, assinatura_modelo, input_data_usuario)
+                    principais = contribuicoes.reindex(contribuicoes.abs().sort_values(ascending=False).index).head(8)
+                    grafico_contribuicoes = alt.Chart(
+                        principais.rename('contribuicao').rename_axis('coluna').reset_index()
+                    ).mark_bar().encode(
+                        x=alt.X('contribuicao:Q', title="Contribuição (R$)"),
+                        y=alt.Y('coluna:N', sort=None, title=None),
+                        color=alt.condition(alt.datum.contribuicao > 0, alt.value('#2e7d32'), alt.value('#c62828')),
+                        tooltip=['coluna', alt.Tooltip('contribuicao:Q', format='.2f')],
+                    )
+                    st.write("**Por que este valor?**")
+                    st.altair_chart(grafico_contribuicoes, use_container_width=True)
+                    st.caption(f"Valor de referência do modelo: R$ {referencia:.2f}. As barras mostram quanto cada "
+                               f"informação somou (verde) ou subtraiu (vermelho) até chegar a R$ {prediction:.2f}.")
+                except ValueError as e:
+                    st.info(str(e))
 
     with col_results:
         st.subheader("🎯 Desempenho do Modelo (em dados de teste)")
@@ -166,20 +235,93 @@ with aba1:
         st.subheader("📊 Importância das Features")
         st.write("Quais informações o modelo considera mais importantes?")
 
+        # A importância por permutação (calculada pelo 'main.py') é por coluna original; sem ela,
+        # fica a importância por impureza da floresta, por coluna após o one-hot.
+        if importancia_permutacao is not None:
+            st.session_state.top_features = serie_importancia(importancia_permutacao).head(10)
+            st.bar_chart(st.session_state.top_features)
+            st.caption(f"Queda do R² ao embaralhar cada informação em {importancia_permutacao['linhas']:,} "
+                       f"pedidos de teste ({importancia_permutacao['repeticoes']} repetições).")
+        else:
+            try:
+                inner_pipeline = pipeline_model.regressor_
+                actual_model = inner_pipeline.named_steps['model']
+
+                if feature_names and hasattr(actual_model, 'feature_importances_'):
+                    importances_series = pd.Series(actual_model.feature_importances_, index=feature_names).sort_values(
+                        ascending=False)
+                    # Salvar as top features para usar no relatório
+                    st.session_state.top_features = importances_series.head(10)
+                    st.bar_chart(st.session_state.top_features)
+                else:
+                    st.warning("Não foi possível obter a importância das features.")
+            except Exception as e:
+                st.error(f"Erro ao gerar o gráfico de importância: {e}")
+
+    st.markdown("---")
+    st.subheader("🔎 Análise de Sensibilidade")
+    st.write("Como a previsão muda quando uma ou duas informações variam, mantendo o restante do pedido acima?")
+
+    entradas_escolhidas = st.multiselect(
+        "Informações a variar (até duas)",
+        options=list(ENTRADAS_VARREDURA),
+        default=['price'],
+        format_func=ENTRADAS_VARREDURA.get,
+        max_selections=2,
+    )
+
+    # Os valores de cada eixo: uma faixa com N pontos para as numéricas e uma lista para as categóricas.
+    eixos = {}
+    for coluna in entradas_escolhidas:
+        rotulo = ENTRADAS_VARREDURA[coluna]
+        if coluna in vocabularios:
+            eixos[coluna] = st.multiselect(f"Valores de '{rotulo}'", options=vocabularios[coluna],
+                                           default=vocabularios[coluna], key=f"varredura_{coluna}")
+        else:
+            minimo_padrao, maximo_padrao = faixa_padrao(coluna)
+            col_min, col_max, col_pontos = st.columns(3)
+            minimo = col_min.number_input(f"{rotulo}: mínimo", value=float(minimo_padrao), key=f"varredura_min_{coluna}")
+            maximo = col_max.number_input(f"{rotulo}: máximo", value=float(maximo_padrao), key=f"varredura_max_{coluna}")
+            pontos = col_pontos.slider(f"{rotulo}: pontos", min_value=2, max_value=200, value=50,
+                                       key=f"varredura_pontos_{coluna}")
+            eixos[coluna] = valores_eixo(coluna, minimo, maximo, pontos)
+
+    total_pontos = int(np.prod([len(valores) for valores in eixos.values()])) if eixos else 0
+    if not eixos:
+        st.info("Escolha ao menos uma informação para variar.")
+    elif total_pontos == 0:
+        st.info("Escolha ao menos um valor para cada informação.")
+    elif total_pontos > MAX_PONTOS_VARREDURA:
+        st.warning(f"A grade tem {total_pontos:,} cenários; reduza para no máximo {MAX_PONTOS_VARREDURA:,}.")
+    else:
+        # A grade inteira vira um DataFrame e é prevista em uma única chamada (o 'percentual_frete'
+        # e a distância são recalculados para todas as linhas de uma vez); a mesma grade sai do cache.
         try:
-            inner_pipeline = pipeline_model.regressor_
-            actual_model = inner_pipeline.named_steps['model']
-
-            if feature_names and hasattr(actual_model, 'feature_importances_'):
-                importances_series = pd.Series(actual_model.feature_importances_, index=feature_names).sort_values(
-                    ascending=False)
-                # Salvar as top features para usar no relatório
-                st.session_state.top_features = importances_series.head(10)
-                st.bar_chart(st.session_state.top_features)
-            else:
-                st.warning("Não foi possível obter a importância das features.")
+            inicio = time.perf_counter()
+            with etapa('dashboard:varredura', categoria='servico', linhas=total_pontos):
+                varredura = calcular_varredura(modelo_previsao, padroes_features, indice_geo, assinatura_modelo,
+                                               input_data_usuario, eixos)
+            segundos = time.perf_counter() - inicio
         except Exception as e:
-            st.error(f"Erro ao gerar o gráfico de importância: {e}")
+            st.error(f"Erro ao calcular a análise de sensibilidade: {e}")
+        else:
+            colunas_eixos = list(eixos)
+            if len(colunas_eixos) == 1:
+                grafico = varredura.set_index(colunas_eixos[0])[COLUNA_PREVISAO]
+                if colunas_eixos[0] in vocabularios:
+                    st.bar_chart(grafico)
+                else:
+                    st.line_chart(grafico)
+            else:
+                eixo_x, eixo_y = colunas_eixos
+                mapa_calor = alt.Chart(varredura).mark_rect().encode(
+                    x=alt.X(f'{eixo_x}:O', title=ENTRADAS_VARREDURA[eixo_x]),
+                    y=alt.Y(f'{eixo_y}:O', title=ENTRADAS_VARREDURA[eixo_y]),
+                    color=alt.Color(f'{COLUNA_PREVISAO}:Q', title="Valor previsto (R$)"),
+                    tooltip=[eixo_x, eixo_y, alt.Tooltip(f'{COLUNA_PREVISAO}:Q', format='.2f')],
+                )
+                st.altair_chart(mapa_calor, use_container_width=True)
+            st.caption(f"{len(varredura):,} cenários previstos em {segundos * 1000:.0f} ms.")
 
 # --- Aba 2: Gerar Relatório PDF ---
 with aba2:
@@ -287,3 +429,37 @@ with aba3:
     5.  **Dashboard Interativo:** Esta interface, criada com Streamlit, permite que os usuários interajam com o modelo final, façam previsões e visualizem seus resultados.
     """)
 
+
+# --- Aba 4: Pontuação em Lote ---
+with aba4:
+    st.header("📦 Pontuação de um Arquivo de Pedidos")
+    st.write("Envie um CSV ou Parquet com as colunas conhecidas de cada pedido. As colunas ausentes recebem "
+             "os mesmos valores padrão do formulário de previsão. Para arquivos grandes, use o 'pontuar_lote.py'.")
+
+    arquivo_pedidos = st.file_uploader("Arquivo de pedidos", type=["csv", "parquet"])
+    if arquivo_pedidos is not None:
+        try:
+            if arquivo_pedidos.name.endswith('.parquet'):
+                pedidos_df = pd.read_parquet(arquivo_pedidos)
+            else:
+                pedidos_df = pd.read_csv(arquivo_pedidos)
+
+            with etapa('dashboard:previsao_lote', categoria='servico', linhas=len(pedidos_df)):
+                previsoes, linhas_por_s = prever_em_lotes(modelo_previsao, pedidos_df, padroes_features,
+                                                           indice_geo=indice_geo)
+            pedidos_df[COLUNA_PREVISAO] = previsoes
+
+            presentes = [coluna for coluna in FEATURES_MODELO if coluna in pedidos_df.columns]
+            st.success(f"{len(pedidos_df):,} pedidos pontuados ({linhas_por_s:,.0f} linhas/s).")
+            st.caption(f"Colunas do modelo encontradas no arquivo: {len(presentes)} de {len(FEATURES_MODELO)}.")
+            st.dataframe(pedidos_df.head(100))
+            st.download_button(
+                label="📥 Baixar as previsões (CSV)",
+                data=pedidos_df.to_csv(index=False).encode('utf-8'),
+                file_name="pedidos_pontuados.csv",
+                mime="text/csv"
+            )
+        except ImportError:
+            st.error("Ler Parquet requer o pyarrow (pip install pyarrow).")
+        except Exception as e:
+            st.error(f"Erro ao pontuar o arquivo: {e}")
@@ -1,14 +1,37 @@
+import argparse
 import pandas as pd
 import os
-
-# Carregar o dataset completo que criamos
+from combinacao_dados import carregar_dataset_completo
+from geo_indice import GEO_INDICE_PATH
+from registro_features import calcular_features, FEATURES_ENGENHARIA
+from loja_features import calcular_features_em_cache, limpar_loja, LOJA_FEATURES_PATH
+from tipos_compactos import compactar_tipos, memoria_mb, relatorio_memoria, salvar_csv_com_tipos
+
+parser = argparse.ArgumentParser(description="Limpeza e engenharia de features do dataset completo.")
+parser.add_argument(
+    '--sem-loja-features', action='store_true',
+    help=f"Recalcula todas as features sem ler nem gravar a loja de features em '{LOJA_FEATURES_PATH}'."
+)
+parser.add_argument(
+    '--compacto', action='store_true',
+    help="Mantém o dataset em tipos compactos (float32, inteiros estreitos, 'category') e grava "
+         "os tipos ao lado de 'dataset_para_modelo.csv' para o treinamento."
+)
+args = parser.parse_args()
+
+# Carregar o dataset completo que criamos (CSV único ou partições mensais do modo incremental)
 try:
-    df = pd.read_csv('data_processed/olist_dataset_completo.csv')
+    df = carregar_dataset_completo()
     print("Dataset completo carregado com sucesso!")
 except FileNotFoundError:
     print("Erro: Arquivo 'olist_dataset_completo.csv' não encontrado. Execute o script 'preparar_dados.py' primeiro.")
     exit()
 
+if args.compacto:
+    mb_antes = memoria_mb(df)
+    df = compactar_tipos(df)
+    relatorio_memoria("engenharia_features (carregamento)", mb_antes, df)
+
 # 1.1 Informações Gerais
 print("\n--- Informações Gerais do Dataset ---")
 df.info()
@@ -38,30 +61,31 @@ print("\n--- Iniciando Engenharia de Features ---")
 # 'payment_value' é um ótimo candidato para o que queremos prever.
 df.rename(columns={'payment_value': 'valor_venda_total'}, inplace=True)
 
-# 2.2 Features a partir de Datas
-# Calcular a diferença de tempo (em dias)
-df['tempo_entrega_dias'] = (df['order_delivered_customer_date'] - df['order_purchase_timestamp']).dt.days
-df['tempo_estimado_dias'] = (df['order_estimated_delivery_date'] - df['order_purchase_timestamp']).dt.days
-df['atraso_na_entrega_dias'] = df['tempo_entrega_dias'] - df['tempo_estimado_dias']
-df['atraso_na_entrega_dias'] = df['atraso_na_entrega_dias'].apply(lambda x: max(0, x)) # Se não houve atraso, o valor é 0
-
-# Extrair componentes da data da compra
-df['compra_dia_da_semana'] = df['order_purchase_timestamp'].dt.dayofweek # Segunda=0, Domingo=6
-df['compra_mes'] = df['order_purchase_timestamp'].dt.month
+# 2.2 Features a partir de Datas, Frete e Localização
+# Cada feature (tempo de entrega, atraso, dia da semana, mês, percentual do frete e
+# distância entre cliente e vendedor) está declarada em 'registro_features.py', com suas
+# colunas de entrada, dtype e implementação vetorizada. O motor calcula todas em uma passada.
+# A distância usa o índice geográfico gerado por 'preparar_dados.py'.
+# Por padrão, cada feature é lida da loja de features quando suas entradas e sua versão
+# não mudaram desde a última execução; só as invalidadas são recalculadas.
+try:
+    if args.sem_loja_features:
+        df[FEATURES_ENGENHARIA] = calcular_features(df, FEATURES_ENGENHARIA)
+    else:
+        limpar_loja()
+        features, relatorio_loja = calcular_features_em_cache(df, FEATURES_ENGENHARIA)
+        df[FEATURES_ENGENHARIA] = features
+        print(f"Features lidas da loja: {relatorio_loja['do_cache']}")
+        print(f"Features recalculadas: {relatorio_loja['recalculadas']}")
+except FileNotFoundError:
+    print(f"Erro: Índice geográfico '{GEO_INDICE_PATH}' não encontrado. Execute o script 'preparar_dados.py' primeiro.")
+    exit()
 
 # 2.3 Features a partir de Informações do Produto
 # O dataset já tem peso, volume, etc. Vamos garantir que não haja nulos.
 df['product_weight_g'].fillna(df['product_weight_g'].median(), inplace=True)
 # Faça o mesmo para product_length_cm, etc.
 
-# 2.4 Features a partir de Informações de Frete e Vendedor
-df['percentual_frete'] = df['freight_value'] / df['valor_venda_total']
-
-# 2.5 (Avançado) Calcular distância entre Cliente e Vendedor
-# Esta é uma feature poderosa, mas mais complexa.
-# Requer o arquivo de geolocalização e um pouco mais de processamento.
-# (Deixaremos como um próximo passo avançado para não complicar agora)
-
 print("Engenharia de features concluída!")
 
 # 3.1 Definir a variável alvo (y) e remover linhas onde ela é nula
@@ -89,14 +113,19 @@ df_modelo = df_modelo.drop(columns=['valor_venda_total'])
 # Para numéricos, usar a mediana. Para categóricos, usar a moda (valor mais comum).
 for col in df_modelo.select_dtypes(include='number').columns:
     df_modelo[col] = df_modelo[col].fillna(df_modelo[col].median())
-for col in df_modelo.select_dtypes(include='object').columns:
+for col in df_modelo.select_dtypes(include=['object', 'category']).columns:
     df_modelo[col] = df_modelo[col].fillna(df_modelo[col].mode()[0])
 
 # 3.3 Salvar o dataset final pronto para o modelo
 df_modelo['valor_venda_total'] = y # Adicionar a variável alvo de volta para referência
 output_path = 'database'
 final_para_modelo_path = os.path.join(output_path, 'dataset_para_modelo.csv')
-df_modelo.to_csv(final_para_modelo_path, index=False)
+if args.compacto:
+    mb_antes = memoria_mb(df_modelo)
+    df_modelo = compactar_tipos(df_modelo)
+    relatorio_memoria("engenharia_features (dataset para o modelo)", mb_antes, df_modelo)
+# No modo compacto, os tipos são gravados ao lado do CSV ('dataset_para_modelo.tipos.json').
+salvar_csv_com_tipos(df_modelo, final_para_modelo_path, args.compacto)
 
 print("\n--- Processamento Finalizado ---")
 print(f"Dataset final pronto para modelagem salvo em: {final_para_modelo_path}")
@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from inferencia_numpy import ModeloCompilado, TRANSFORMACOES_ALVO
+from servico_previsao import montar_entrada
+
+# --- Explicações do Modelo ---
+# Dois tipos de explicação, ambos por coluna de entrada (as dummies do one-hot não aparecem):
+#
+# * Importância por permutação: quanto o R² no conjunto de teste cai quando os valores de uma
+#   coluna são embaralhados. O 'main.py' a calcula uma vez, em paralelo (uma coluna por
+#   processo), e a grava em 'importancia_permutacao.json' junto com a versão do modelo; o
+#   dashboard só lê o arquivo. Como o pipeline recebe as colunas originais, cada categórica é
+#   embaralhada inteira.
+# * Contribuições por previsão: o caminho de cada pedido em cada árvore do modelo compilado é
+#   decomposto nos passos de cada divisão ('ModeloCompilado.contribuicoes'), para todos os
+#   pedidos e todas as árvores de uma vez. O modelo prevê no espaço log1p; as contribuições são
+#   levadas para R$ proporcionalmente, de modo que o valor de referência mais a soma delas
+#   dá exatamente a previsão.
+
+IMPORTANCIA_PATH = os.path.join('data', 'importancia_permutacao.json')
+REPETICOES_IMPORTANCIA = 5
+MAX_LINHAS_IMPORTANCIA = 20_000
+
+
+# --- Importância por Permutação ---
+
+def calcular_importancia_permutacao(pipeline, X, y, repeticoes=REPETICOES_IMPORTANCIA,
+                                    max_linhas=MAX_LINHAS_IMPORTANCIA, n_jobs=-1, random_state=42):
+    """
+    Queda média (e desvio) do R² ao embaralhar cada coluna de 'X', da mais para a menos
+    importante. Acima de 'max_linhas', usa uma amostra de 'X'.
+    """
+    from sklearn.inspection import permutation_importance
+
+    if len(X) > max_linhas:
+        X = X.sample(max_linhas, random_state=random_state)
+        y = y.loc[X.index]
+    resultado = permutation_importance(pipeline, X, y, scoring='r2', n_repeats=repeticoes,
+                                       n_jobs=n_jobs, random_state=random_state)
+    ordem = np.argsort(-resultado.importances_mean)
+    return {
+        'metrica': 'r2',
+        'linhas': int(len(X)),
+        'repeticoes': repeticoes,
+        'importancias': [{'coluna': str(X.columns[i]), 'media': float(resultado.importances_mean[i]),
+                          'desvio': float(resultado.importances_std[i])} for i in ordem],
+    }
+
+
+def salvar_importancia(importancia, caminho=IMPORTANCIA_PATH):
+    with open(caminho + '.tmp', 'w') as f:
+        json.dump(importancia, f, indent=4)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def carregar_importancia(caminho=IMPORTANCIA_PATH):
+    with open(caminho, 'r') as f:
+        return json.load(f)
+
+
+def serie_importancia(importancia):
+    """As importâncias como uma Series {coluna: queda média do R²}, da maior para a menor."""
+    return pd.Series({item['coluna']: item['media'] for item in importancia['importancias']})
+
+
+# --- Contribuições por Previsão ---
+
+def explicar_previsoes(modelo, df, padroes, indice_geo=None):
+    """
+    Contribuição de cada coluna de entrada para a previsão de cada pedido, em R$. Devolve
+    (valor de referência, DataFrame pedidos x colunas); a referência mais a soma de uma linha
+    é a previsão do pedido. Exige o modelo compilado.
+    """
+    if not isinstance(modelo, ModeloCompilado):
+        raise ValueError("As contribuições por previsão exigem o modelo compilado. Rode o 'main.py' novamente.")
+    entrada = montar_entrada(df, padroes, modelo.colunas_entrada, indice_geo)
+    base, contribuicoes = modelo.contribuicoes(entrada)
+    _, inversa = TRANSFORMACOES_ALVO[modelo.meta['alvo']]
+
+    # Na escala do alvo, cada linha recebe o fator (previsão - referência) / soma das contribuições.
+    # Quando a soma é ~0, usa a derivada da transformação inversa no ponto.
+    soma = contribuicoes.sum(axis=1)
+    referencia = float(inversa(base))
+    previsoes = inversa(base + soma)
+    derivada = (inversa(base + soma + 1e-6) - inversa(base + soma - 1e-6)) / 2e-6
+    fator = np.where(np.abs(soma) > 1e-9, (previsoes - referencia) / np.where(soma == 0, 1, soma), derivada)
+    return referencia, pd.DataFrame(contribuicoes * fator[:, None], index=df.index, columns=modelo.colunas_entrada)
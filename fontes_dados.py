@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa
+
+# O cache em Parquet depende do pyarrow. Sem ele, as tabelas continuam sendo
+# lidas do CSV original (já com os tipos do esquema), apenas sem o cache.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+DATA_PATH = 'database'
+CACHE_PATH = os.path.join('data_processed', 'cache')
+
+# Linhas lidas do CSV por vez ao montar a cópia em Parquet.
+LINHAS_POR_LOTE_CACHE = 250_000
+
+# --- Esquema explícito de cada uma das 9 tabelas da Olist ---
+# 'tipos' define o dtype de cada coluna já na leitura (categorias para estados,
+# cidades e tipos de pagamento; inteiros estreitos para contagens e notas).
+# 'datas' lista as colunas convertidas para datetime64 logo no carregamento.
+# Valores monetários continuam em float64 porque são somados na agregação dos pagamentos.
+ESQUEMAS = {
+    'customers': {
+        'arquivo': 'olist_customers_dataset.csv',
+        'tipos': {
+            'customer_id': 'object',
+            'customer_unique_id': 'object',
+            'customer_zip_code_prefix': 'int32',
+            'customer_city': 'category',
+            'customer_state': 'category',
+        },
+        'datas': [],
+    },
+    'geolocation': {
+        'arquivo': 'olist_geolocation_dataset.csv',
+        'tipos': {
+            'geolocation_zip_code_prefix': 'int32',
+            'geolocation_lat': 'float32',
+            'geolocation_lng': 'float32',
+            'geolocation_city': 'category',
+            'geolocation_state': 'category',
+        },
+        'datas': [],
+    },
+    'order_items': {
+        'arquivo': 'olist_order_items_dataset.csv',
+        'tipos': {
+            'order_id': 'object',
+            'order_item_id': 'int16',
+            'product_id': 'object',
+            'seller_id': 'object',
+            'shipping_limit_date': 'object',
+            'price': 'float64',
+            'freight_value': 'float64',
+        },
+        'datas': ['shipping_limit_date'],
+    },
+    'payments': {
+        'arquivo': 'olist_order_payments_dataset.csv',
+        'tipos': {
+            'order_id': 'object',
+            'payment_sequential': 'int16',
+            'payment_type': 'category',
+            'payment_installments': 'int16',
+            'payment_value': 'float64',
+        },
+        'datas': [],
+    },
+    'reviews': {
+        'arquivo': 'olist_order_reviews_dataset.csv',
+        'tipos': {
+            'review_id': 'object',
+            'order_id': 'object',
+            'review_score': 'int8',
+            'review_comment_title': 'object',
+            'review_comment_message': 'object',
+            'review_creation_date': 'object',
+            'review_answer_timestamp': 'object',
+        },
+        'datas': ['review_creation_date', 'review_answer_timestamp'],
+    },
+    'orders': {
+        'arquivo': 'olist_orders_dataset.csv',
+        'tipos': {
+            'order_id': 'object',
+            'customer_id': 'object',
+            'order_status': 'category',
+            'order_purchase_timestamp': 'object',
+            'order_approved_at': 'object',
+            'order_delivered_carrier_date': 'object',
+            'order_delivered_customer_date': 'object',
+            'order_estimated_delivery_date': 'object',
+        },
+        'datas': [
+            'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+            'order_delivered_customer_date', 'order_estimated_delivery_date'
+        ],
+    },
+    'products': {
+        'arquivo': 'olist_products_dataset.csv',
+        'tipos': {
+            'product_id': 'object',
+            'product_category_name': 'category',
+            'product_name_lenght': 'float32',
+            'product_description_lenght': 'float32',
+            'product_photos_qty': 'float32',
+            'product_weight_g': 'float32',
+            'product_length_cm': 'float32',
+            'product_height_cm': 'float32',
+            'product_width_cm': 'float32',
+        },
+        'datas': [],
+    },
+    'sellers': {
+        'arquivo': 'olist_sellers_dataset.csv',
+        'tipos': {
+            'seller_id': 'object',
+            'seller_zip_code_prefix': 'int32',
+            'seller_city': 'category',
+            'seller_state': 'category',
+        },
+        'datas': [],
+    },
+    'translation': {
+        'arquivo': 'product_category_name_translation.csv',
+        'tipos': {
+            'product_category_name': 'category',
+            'product_category_name_english': 'category',
+        },
+        'datas': [],
+    },
+}
+
+
+def _versao_esquema(nome):
+    """Gera um identificador do esquema da tabela, para invalidar o cache quando ele mudar."""
+    texto = json.dumps(ESQUEMAS[nome], sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 do arquivo lendo-o em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _validar_colunas(nome, colunas):
+    if nome not in ESQUEMAS:
+        raise KeyError(f"Tabela desconhecida: '{nome}'. Opções: {sorted(ESQUEMAS)}")
+    if colunas is not None:
+        desconhecidas = [c for c in colunas if c not in ESQUEMAS[nome]['tipos']]
+        if desconhecidas:
+            raise KeyError(f"Colunas fora do esquema de '{nome}': {desconhecidas}")
+
+
+def _aplicar_datas(nome, df):
+    for col in ESQUEMAS[nome]['datas']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
+    return df
+
+
+def ler_csv_tipado(nome, colunas=None, data_path=DATA_PATH):
+    """Lê o CSV original da tabela aplicando o esquema (tipos e datas) já na leitura."""
+    esquema = ESQUEMAS[nome]
+    caminho = os.path.join(data_path, esquema['arquivo'])
+    tipos = esquema['tipos'] if colunas is None else {c: esquema['tipos'][c] for c in colunas}
+
+    df = pd.read_csv(caminho, usecols=list(tipos), dtype=tipos)
+    return _aplicar_datas(nome, df)[list(tipos)]
+
+
+def _ler_csv_em_lotes(nome, linhas_por_lote, colunas=None, data_path=DATA_PATH):
+    """Versão em lotes de 'ler_csv_tipado', para tabelas que não cabem na memória."""
+    esquema = ESQUEMAS[nome]
+    caminho = os.path.join(data_path, esquema['arquivo'])
+    tipos = esquema['tipos'] if colunas is None else {c: esquema['tipos'][c] for c in colunas}
+
+    for lote in pd.read_csv(caminho, usecols=list(tipos), dtype=tipos, chunksize=linhas_por_lote):
+        yield _aplicar_datas(nome, lote)[list(tipos)]
+
+
+def _esquema_arrow(nome):
+    """Esquema Arrow equivalente ao esquema pandas da tabela, fixo entre lotes."""
+    campos = []
+    for col, tipo in ESQUEMAS[nome]['tipos'].items():
+        if col in ESQUEMAS[nome]['datas']:
+            tipo_arrow = pa.timestamp('ns')
+        elif tipo == 'category':
+            tipo_arrow = pa.dictionary(pa.int32(), pa.string())
+        elif tipo == 'object':
+            tipo_arrow = pa.string()
+        else:
+            tipo_arrow = pa.from_numpy_dtype(np.dtype(tipo))
+        campos.append(pa.field(col, tipo_arrow))
+    return pa.schema(campos)
+
+
+def _cache_valido(nome, caminho_csv, caminho_meta, caminho_parquet):
+    """
+    Verifica se a cópia em Parquet ainda corresponde ao CSV de origem.
+    Tamanho e mtime iguais bastam; se só o mtime mudou, o hash do conteúdo decide.
+    """
+    if not (os.path.exists(caminho_meta) and os.path.exists(caminho_parquet)):
+        return False
+    with open(caminho_meta, 'r') as f:
+        meta = json.load(f)
+
+    stat = os.stat(caminho_csv)
+    if meta.get('versao_esquema') != _versao_esquema(nome) or meta.get('tamanho') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha256') != _hash_arquivo(caminho_csv):
+        return False
+
+    # Conteúdo idêntico (o arquivo só foi "tocado"): atualiza o mtime registrado.
+    meta['mtime_ns'] = stat.st_mtime_ns
+    with open(caminho_meta, 'w') as f:
+        json.dump(meta, f, indent=4)
+    return True
+
+
+def atualizar_cache(nome, data_path=DATA_PATH, cache_path=CACHE_PATH):
+    """
+    Garante que a cópia em Parquet da tabela esteja atualizada e retorna seu caminho.
+    Retorna None quando o pyarrow não está instalado.
+    """
+    if pq is None:
+        return None
+
+    caminho_csv = os.path.join(data_path, ESQUEMAS[nome]['arquivo'])
+    caminho_parquet = os.path.join(cache_path, f'{nome}.parquet')
+    caminho_meta = os.path.join(cache_path, f'{nome}.json')
+
+    if _cache_valido(nome, caminho_csv, caminho_meta, caminho_parquet):
+        return caminho_parquet
+
+    os.makedirs(cache_path, exist_ok=True)
+    stat = os.stat(caminho_csv)
+
+    # O CSV é convertido em lotes, então montar o cache nunca exige a tabela inteira na memória.
+    # Escreve em um arquivo temporário e troca atomicamente, para que uma execução
+    # interrompida nunca deixe um Parquet incompleto no cache.
+    esquema_arrow = _esquema_arrow(nome)
+    temporario = caminho_parquet + '.tmp'
+    linhas = 0
+    with pq.ParquetWriter(temporario, esquema_arrow) as escritor:
+        for lote in _ler_csv_em_lotes(nome, LINHAS_POR_LOTE_CACHE, data_path=data_path):
+            escritor.write_table(pa.Table.from_pandas(lote, schema=esquema_arrow, preserve_index=False))
+            linhas += len(lote)
+    os.replace(temporario, caminho_parquet)
+
+    meta = {
+        'arquivo': ESQUEMAS[nome]['arquivo'],
+        'tamanho': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _hash_arquivo(caminho_csv),
+        'versao_esquema': _versao_esquema(nome),
+        'linhas': linhas,
+    }
+    with open(caminho_meta, 'w') as f:
+        json.dump(meta, f, indent=4)
+    return caminho_parquet
+
+
+def carregar_tabela(nome, colunas=None, data_path=DATA_PATH, cache_path=CACHE_PATH):
+    """
+    Carrega uma tabela da Olist com os tipos do esquema.
+    'colunas' restringe a leitura apenas às colunas que a etapa realmente usa.
+    """
+    _validar_colunas(nome, colunas)
+    with etapa(f'carregar:{nome}', categoria='io') as e:
+        caminho_parquet = atualizar_cache(nome, data_path=data_path, cache_path=cache_path)
+        if caminho_parquet is None:
+            df = ler_csv_tipado(nome, colunas=colunas, data_path=data_path)
+        else:
+            df = pd.read_parquet(caminho_parquet, columns=colunas)
+        e.linhas = len(df)
+    return df
+
+
+def iterar_tabela(nome, linhas_por_lote, colunas=None, data_path=DATA_PATH, cache_path=CACHE_PATH):
+    """Lê a tabela em lotes de até 'linhas_por_lote' linhas, sem carregá-la inteira na memória."""
+    _validar_colunas(nome, colunas)
+    caminho_parquet = atualizar_cache(nome, data_path=data_path, cache_path=cache_path)
+    if caminho_parquet is None:
+        yield from _ler_csv_em_lotes(nome, linhas_por_lote, colunas=colunas, data_path=data_path)
+        return
+
+    arquivo = pq.ParquetFile(caminho_parquet)
+    for lote in arquivo.iter_batches(batch_size=linhas_por_lote, columns=colunas):
+        yield lote.to_pandas()
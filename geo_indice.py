@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from fontes_dados import carregar_tabela, ESQUEMAS, DATA_PATH
+
+GEO_INDICE_PATH = os.path.join('data_processed', 'geo_indice.npz')
+
+# Incrementar quando a forma de calcular os centróides mudar.
+VERSAO_INDICE_GEO = 1
+
+# Limites aproximados do território brasileiro. A tabela de geolocalização tem alguns
+# pontos claramente errados (fora do país) que distorceriam os centróides.
+LIMITES_BRASIL = {'lat_min': -33.75, 'lat_max': 5.30, 'lng_min': -74.00, 'lng_max': -34.75}
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def construir_indice_geo(geolocation):
+    """
+    Reduz a tabela de geolocalização (~1M linhas) a um centróide por prefixo de CEP
+    e a um centróide por estado, usado quando o prefixo não está no índice.
+    """
+    lat = geolocation['geolocation_lat'].to_numpy(dtype='float64')
+    lng = geolocation['geolocation_lng'].to_numpy(dtype='float64')
+    dentro = (
+        (lat >= LIMITES_BRASIL['lat_min']) & (lat <= LIMITES_BRASIL['lat_max'])
+        & (lng >= LIMITES_BRASIL['lng_min']) & (lng <= LIMITES_BRASIL['lng_max'])
+    )
+    pontos = pd.DataFrame({
+        'prefixo': geolocation['geolocation_zip_code_prefix'].to_numpy()[dentro],
+        'estado': geolocation['geolocation_state'].astype(object).to_numpy()[dentro],
+        'lat': lat[dentro],
+        'lng': lng[dentro],
+    })
+
+    por_prefixo = pontos.groupby('prefixo')[['lat', 'lng']].mean().sort_index()
+    por_estado = pontos.dropna(subset=['estado']).groupby('estado')[['lat', 'lng']].mean().sort_index()
+
+    return {
+        'prefixos': por_prefixo.index.to_numpy(dtype='int32'),
+        'lat': por_prefixo['lat'].to_numpy(dtype='float32'),
+        'lng': por_prefixo['lng'].to_numpy(dtype='float32'),
+        'estados': por_estado.index.to_numpy(dtype='U2'),
+        'lat_estado': por_estado['lat'].to_numpy(dtype='float32'),
+        'lng_estado': por_estado['lng'].to_numpy(dtype='float32'),
+    }
+
+
+def _origem(data_path):
+    """Tamanho e mtime do CSV de geolocalização, para saber se o índice precisa ser refeito."""
+    stat = os.stat(os.path.join(data_path, ESQUEMAS['geolocation']['arquivo']))
+    return np.array([VERSAO_INDICE_GEO, stat.st_size, stat.st_mtime_ns], dtype='int64')
+
+
+def atualizar_indice_geo(data_path=DATA_PATH, caminho=GEO_INDICE_PATH):
+    """
+    Gera o índice geográfico em '.npz' (arrays contíguos, sem pickle), apenas quando
+    o CSV de geolocalização mudou desde a última geração. Retorna True se o índice foi refeito.
+    """
+    origem = _origem(data_path)
+    if os.path.exists(caminho):
+        with np.load(caminho) as atual:
+            if 'origem' in atual and np.array_equal(atual['origem'], origem):
+                return False
+
+    colunas = ['geolocation_zip_code_prefix', 'geolocation_lat', 'geolocation_lng', 'geolocation_state']
+    indice = construir_indice_geo(carregar_tabela('geolocation', colunas=colunas, data_path=data_path))
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp.npz'
+    np.savez(temporario, origem=origem, **indice)
+    os.replace(temporario, caminho)
+    return True
+
+
+def carregar_indice_geo(caminho=GEO_INDICE_PATH):
+    """Carrega o índice geográfico gerado por 'preparar_dados.py'."""
+    with np.load(caminho) as arquivo:
+        return {nome: arquivo[nome] for nome in arquivo.files}
+
+
+def localizar(indice, prefixos, estados):
+    """
+    Retorna (lat, lng) de cada linha: o centróide do prefixo de CEP quando ele existe no
+    índice, senão o centróide do estado, senão NaN. Tudo por busca binária, sem merge.
+    """
+    prefixos = pd.to_numeric(pd.Series(prefixos), errors='coerce').to_numpy(dtype='float64')
+    estados = pd.Series(estados).astype(object).to_numpy()
+    lat = np.full(len(prefixos), np.nan)
+    lng = np.full(len(prefixos), np.nan)
+
+    # 1. Prefixo de CEP
+    validos = ~np.isnan(prefixos)
+    chaves = np.where(validos, prefixos, -1).astype('int64')
+    if len(indice['prefixos']):
+        posicoes = np.searchsorted(indice['prefixos'], chaves).clip(max=len(indice['prefixos']) - 1)
+        achou = validos & (indice['prefixos'][posicoes] == chaves)
+        lat[achou] = indice['lat'][posicoes[achou]]
+        lng[achou] = indice['lng'][posicoes[achou]]
+    else:
+        achou = np.zeros(len(prefixos), dtype=bool)
+
+    # 2. Fallback pelo estado
+    faltando = ~achou
+    if faltando.any() and len(indice['estados']):
+        uf = pd.Series(estados[faltando]).fillna('').astype(str).to_numpy(dtype='U2')
+        posicoes = np.searchsorted(indice['estados'], uf).clip(max=len(indice['estados']) - 1)
+        achou_uf = indice['estados'][posicoes] == uf
+        linhas = np.flatnonzero(faltando)[achou_uf]
+        lat[linhas] = indice['lat_estado'][posicoes[achou_uf]]
+        lng[linhas] = indice['lng_estado'][posicoes[achou_uf]]
+
+    return lat, lng
+
+
+def distancia_haversine_km(lat1, lng1, lat2, lng2):
+    """Distância de grande círculo (em km) entre pares de pontos, vetorizada."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distancia_cliente_vendedor(df, indice):
+    """Distância em km entre o cliente e o vendedor de cada linha do dataset completo."""
+    lat_c, lng_c = localizar(indice, df['customer_zip_code_prefix'], df['customer_state'])
+    lat_v, lng_v = localizar(indice, df['seller_zip_code_prefix'], df['seller_state'])
+    return distancia_haversine_km(lat_c, lng_c, lat_v, lng_v)
@@ -0,0 +1,375 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from fontes_dados import ESQUEMAS
+
+# --- Gerador de Dados Sintéticos da Olist ---
+# Gera as 9 tabelas da Olist, com as mesmas colunas e formatos dos CSVs originais, em
+# qualquer escala (de 100 mil a dezenas de milhões de itens de pedido). As proporções seguem
+# a base original (~112 mil itens): 1,13 item por pedido, um 'customer_id' por pedido e ~3% de
+# clientes recorrentes, ~0,29 produto e ~0,03 vendedor por item, ~2% dos pedidos com mais de
+# um pagamento (vouchers), ~0,5% com duas avaliações e ~0,8% de avaliações repetidas entre
+# pedidos. Produtos e vendedores têm popularidade concentrada, e estados, CEPs, status e
+# tipos de pagamento seguem as frequências da base original.
+#
+# A saída só depende de '--itens' e '--semente': os pedidos são gerados em lotes de tamanho
+# fixo, cada um com um gerador aleatório derivado da semente e do número do lote, e gravados
+# em modo append, então a memória não cresce com a escala.
+
+ITENS_BASE_ORIGINAL = 112_650
+PEDIDOS_POR_LOTE = 100_000
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+# UF: (peso dos clientes, peso dos vendedores, latitude e longitude da capital, faixas de CEP (prefixo de 5 dígitos))
+ESTADOS = {
+    'SP': (0.420, 0.597, -23.55, -46.63, [(1000, 19999)]),
+    'RJ': (0.129, 0.054, -22.91, -43.17, [(20000, 28999)]),
+    'MG': (0.117, 0.079, -19.92, -43.94, [(30000, 39999)]),
+    'RS': (0.055, 0.042, -30.03, -51.23, [(90000, 99999)]),
+    'PR': (0.051, 0.113, -25.43, -49.27, [(80000, 87999)]),
+    'SC': (0.037, 0.061, -27.59, -48.55, [(88000, 89999)]),
+    'BA': (0.034, 0.006, -12.97, -38.50, [(40000, 48999)]),
+    'DF': (0.022, 0.010, -15.78, -47.93, [(70000, 73699)]),
+    'ES': (0.020, 0.007, -20.32, -40.34, [(29000, 29999)]),
+    'GO': (0.020, 0.013, -16.69, -49.25, [(74000, 76799)]),
+    'PE': (0.017, 0.003, -8.05, -34.88, [(50000, 56999)]),
+    'CE': (0.013, 0.002, -3.73, -38.52, [(60000, 63999)]),
+    'PA': (0.010, 0.0003, -1.46, -48.49, [(66000, 68899)]),
+    'MT': (0.009, 0.0013, -15.60, -56.10, [(78000, 78899)]),
+    'MA': (0.0075, 0.0003, -2.53, -44.30, [(65000, 65999)]),
+    'MS': (0.0073, 0.0006, -20.44, -54.65, [(79000, 79999)]),
+    'PB': (0.0054, 0.0018, -7.12, -34.86, [(58000, 58999)]),
+    'PI': (0.0050, 0.0004, -5.09, -42.80, [(64000, 64999)]),
+    'RN': (0.0049, 0.0016, -5.79, -35.21, [(59000, 59999)]),
+    'AL': (0.0041, 0.0001, -9.67, -35.74, [(57000, 57999)]),
+    'SE': (0.0035, 0.0001, -10.91, -37.07, [(49000, 49999)]),
+    'TO': (0.0028, 0.0001, -10.18, -48.33, [(77000, 77999)]),
+    'RO': (0.0025, 0.0005, -8.76, -63.90, [(76800, 76999)]),
+    'AM': (0.0015, 0.0003, -3.12, -60.02, [(69000, 69299), (69400, 69899)]),
+    'AC': (0.0008, 0.0001, -9.97, -67.81, [(69900, 69999)]),
+    'AP': (0.0007, 0.0001, 0.03, -51.07, [(68900, 68999)]),
+    'RR': (0.0005, 0.0001, 2.82, -60.67, [(69300, 69399)]),
+}
+
+# Categorias mais frequentes da base original, em ordem de popularidade. As duas últimas
+# não têm tradução, como 'pc_gamer' e 'portateis_cozinha...' na base original.
+CATEGORIAS = [
+    ('cama_mesa_banho', 'bed_bath_table'), ('beleza_saude', 'health_beauty'),
+    ('esporte_lazer', 'sports_leisure'), ('moveis_decoracao', 'furniture_decor'),
+    ('informatica_acessorios', 'computers_accessories'), ('utilidades_domesticas', 'housewares'),
+    ('relogios_presentes', 'watches_gifts'), ('telefonia', 'telephony'),
+    ('ferramentas_jardim', 'garden_tools'), ('automotivo', 'auto'), ('brinquedos', 'toys'),
+    ('cool_stuff', 'cool_stuff'), ('perfumaria', 'perfumery'), ('bebes', 'baby'),
+    ('eletronicos', 'electronics'), ('papelaria', 'stationery'),
+    ('fashion_bolsas_e_acessorios', 'fashion_bags_accessories'), ('pet_shop', 'pet_shop'),
+    ('moveis_escritorio', 'office_furniture'), ('consoles_games', 'consoles_games'),
+    ('malas_acessorios', 'luggage_accessories'),
+    ('construcao_ferramentas_construcao', 'construction_tools_construction'),
+    ('eletrodomesticos', 'home_appliances'), ('instrumentos_musicais', 'musical_instruments'),
+    ('eletroportateis', 'small_appliances'), ('casa_construcao', 'home_construction'),
+    ('livros_interesse_geral', 'books_general_interest'), ('alimentos', 'food'),
+    ('moveis_sala', 'furniture_living_room'), ('casa_conforto', 'home_confort'), ('bebidas', 'drinks'),
+    ('audio', 'audio'), ('market_place', 'market_place'),
+    ('construcao_ferramentas_iluminacao', 'construction_tools_lights'), ('climatizacao', 'air_conditioning'),
+    ('alimentos_bebidas', 'food_drink'), ('industria_comercio_e_negocios', 'industry_commerce_and_business'),
+    ('livros_tecnicos', 'books_technical'), ('telefonia_fixa', 'fixed_telephony'),
+    ('fashion_calcados', 'fashion_shoes'), ('artes', 'art'), ('flores', 'flowers'),
+    ('seguros_e_servicos', 'security_and_services'),
+    ('pc_gamer', None), ('portateis_cozinha_e_preparadores_de_alimentos', None),
+]
+
+STATUS = (['delivered', 'shipped', 'canceled', 'unavailable', 'invoiced', 'processing', 'created', 'approved'],
+          [0.970, 0.011, 0.006, 0.006, 0.003, 0.003, 0.0005, 0.0005])
+TIPOS_PAGAMENTO = (['credit_card', 'boleto', 'voucher', 'debit_card'], [0.739, 0.190, 0.056, 0.015])
+NOTAS = ([5, 4, 1, 3, 2], [0.578, 0.193, 0.115, 0.082, 0.032])
+ITENS_POR_PEDIDO = ([1, 2, 3, 4, 5, 6], [0.900, 0.076, 0.014, 0.005, 0.003, 0.002])
+
+INICIO = np.datetime64('2016-09-04T00:00:00', 's')
+FIM = np.datetime64('2018-10-17T00:00:00', 's')
+DIA = np.timedelta64(86400, 's')
+
+
+def interpretar_escala(texto):
+    """Converte '100k', '1.5M' ou '250000' em número de itens."""
+    texto = str(texto).strip().lower()
+    multiplicador = {'k': 1_000, 'm': 1_000_000}.get(texto[-1:], 1)
+    if multiplicador != 1:
+        texto = texto[:-1]
+    return int(float(texto) * multiplicador)
+
+
+def _ids(indices, sal):
+    """IDs hexadecimais de 32 caracteres, como os da Olist, derivados de (índice, sal) sem colisões."""
+    x = np.asarray(indices, dtype=np.uint64)
+    partes = []
+    for rodada in range(2):
+        # splitmix64: bijetivo, então índices diferentes dão IDs diferentes.
+        z = x + np.uint64(0x9E3779B97F4A7C15 * (sal * 2 + rodada + 1) % 2 ** 64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        partes.append(z ^ (z >> np.uint64(31)))
+    bytes_ids = np.stack(partes, axis=1).astype('>u8').tobytes()
+    return np.frombuffer(bytes_ids.hex().encode('ascii'), dtype='S32').astype(str)
+
+
+def _popular(rng, n_total, tamanho, concentracao=2.5):
+    """Índices em [0, n_total) com popularidade concentrada nos primeiros (lei de potência)."""
+    return np.minimum((n_total * rng.random(tamanho) ** concentracao).astype(np.int64), n_total - 1)
+
+
+def _escolher(rng, opcoes_pesos, tamanho):
+    opcoes, pesos = opcoes_pesos
+    pesos = np.asarray(pesos, dtype=float)
+    return np.asarray(opcoes)[rng.choice(len(opcoes), size=tamanho, p=pesos / pesos.sum())]
+
+
+def _datas(valores):
+    return pd.Series(valores).dt.strftime(FORMATO_DATA)
+
+
+def _gravar(df, nome, saida, primeiro_lote):
+    caminho = os.path.join(saida, ESQUEMAS[nome]['arquivo'])
+    df[list(ESQUEMAS[nome]['tipos'])].to_csv(caminho, mode='w' if primeiro_lote else 'a',
+                                             header=primeiro_lote, index=False)
+    return len(df)
+
+
+def gerar_cadastros(rng, escala):
+    """CEPs (com a geolocalização), vendedores e produtos, dimensionados pela escala."""
+    ufs = list(ESTADOS)
+    # CEPs: a base original tem ~19 mil prefixos; em escalas maiores, até todos os das faixas.
+    n_ceps = int(min(19_015 * max(escala, 0.05), 95_000))
+    pesos = np.array([ESTADOS[uf][0] for uf in ufs])
+    por_uf = np.maximum(1, np.round(n_ceps * pesos / pesos.sum())).astype(int)
+    ceps, uf_cep = [], []
+    for uf, n in zip(ufs, por_uf):
+        faixa = np.concatenate([np.arange(a, b + 1) for a, b in ESTADOS[uf][4]])
+        escolhidos = np.sort(rng.choice(faixa, size=min(n, len(faixa)), replace=False))
+        ceps.append(escolhidos)
+        uf_cep.append(np.full(len(escolhidos), uf))
+    ceps, uf_cep = np.concatenate(ceps), np.concatenate(uf_cep)
+    ordem = np.argsort(ceps, kind='stable')  # as faixas de alguns estados se intercalam
+    ceps, uf_cep = ceps[ordem], uf_cep[ordem]
+    cidade_cep = np.char.add(np.char.add(np.char.lower(uf_cep), '_municipio_'), (ceps // 100).astype(str))
+    lat_cep = np.array([ESTADOS[uf][2] for uf in uf_cep]) + rng.normal(0, 1.2, len(ceps))
+    lng_cep = np.array([ESTADOS[uf][3] for uf in uf_cep]) + rng.normal(0, 1.2, len(ceps))
+
+    repeticoes = 1 + rng.poisson(51, len(ceps))
+    geo = pd.DataFrame({
+        'geolocation_zip_code_prefix': np.repeat(ceps, repeticoes),
+        'geolocation_lat': np.repeat(lat_cep, repeticoes) + rng.normal(0, 0.02, repeticoes.sum()),
+        'geolocation_lng': np.repeat(lng_cep, repeticoes) + rng.normal(0, 0.02, repeticoes.sum()),
+        'geolocation_city': np.repeat(cidade_cep, repeticoes),
+        'geolocation_state': np.repeat(uf_cep, repeticoes),
+    })
+
+    n_vendedores = max(10, round(3_095 * escala))
+    pesos_v = np.array([ESTADOS[uf][1] for uf in ufs])
+    uf_vendedor = rng.choice(ufs, size=n_vendedores, p=pesos_v / pesos_v.sum())
+    cep_vendedor = _cep_do_estado(rng, ceps, uf_cep, uf_vendedor)
+    sellers = pd.DataFrame({
+        'seller_id': _ids(np.arange(n_vendedores), sal=1),
+        'seller_zip_code_prefix': cep_vendedor,
+        'seller_city': _cidades(cep_vendedor, ceps, cidade_cep),
+        'seller_state': uf_vendedor,
+    })
+
+    n_produtos = max(20, round(32_951 * escala))
+    categoria = _popular(rng, len(CATEGORIAS), n_produtos, concentracao=2.0)
+    nomes = np.array([pt for pt, _ in CATEGORIAS], dtype=object)[categoria]
+    nomes[rng.random(n_produtos) < 0.0185] = None  # ~1,85% dos produtos sem categoria
+    peso = np.round(np.exp(rng.normal(6.5, 1.3, n_produtos)).clip(2, 40_000))
+    produtos = pd.DataFrame({
+        'product_id': _ids(np.arange(n_produtos), sal=2),
+        'product_category_name': nomes,
+        'product_name_lenght': rng.integers(5, 77, n_produtos).astype(float),
+        'product_description_lenght': np.round(np.exp(rng.normal(6.4, 0.8, n_produtos)).clip(4, 3_992)),
+        'product_photos_qty': (1 + rng.poisson(1.2, n_produtos)).clip(1, 20).astype(float),
+        'product_weight_g': peso,
+        'product_length_cm': np.round((peso ** (1 / 3) * rng.uniform(1.2, 2.5, n_produtos)).clip(7, 105)),
+        'product_height_cm': np.round((peso ** (1 / 3) * rng.uniform(0.5, 1.5, n_produtos)).clip(2, 105)),
+        'product_width_cm': np.round((peso ** (1 / 3) * rng.uniform(0.9, 2.0, n_produtos)).clip(6, 118)),
+    })
+    sem_medidas = rng.random(n_produtos) < 0.0006
+    produtos.loc[sem_medidas, produtos.columns[2:]] = np.nan
+    # Cada produto tem um vendedor principal (na base original, a grande maioria tem um só)
+    # e um preço base que depende da categoria.
+    produto_vendedor = _popular(rng, n_vendedores, n_produtos, concentracao=3.0)
+    preco_categoria = np.exp(rng.normal(4.3, 0.5, len(CATEGORIAS)))
+    produto_preco = preco_categoria[categoria] * np.exp(rng.normal(0, 0.8, n_produtos))
+
+    traducao = pd.DataFrame(
+        [(pt, en) for pt, en in CATEGORIAS if en is not None],
+        columns=['product_category_name', 'product_category_name_english']
+    )
+    return {
+        'geo': geo, 'sellers': sellers, 'products': produtos, 'translation': traducao,
+        'ceps': ceps, 'uf_cep': uf_cep, 'cidade_cep': cidade_cep,
+        'produto_vendedor': produto_vendedor, 'produto_preco': produto_preco,
+        'produto_peso': np.nan_to_num(produtos['product_weight_g'].to_numpy(), nan=500.0),
+    }
+
+
+def _cep_do_estado(rng, ceps, uf_cep, ufs):
+    """Sorteia, para cada UF, um dos CEPs daquele estado."""
+    ordem = np.argsort(uf_cep, kind='stable')
+    ufs_ordenadas = uf_cep[ordem]
+    inicio = np.searchsorted(ufs_ordenadas, ufs, side='left')
+    fim = np.searchsorted(ufs_ordenadas, ufs, side='right')
+    return ceps[ordem[inicio + (rng.random(len(ufs)) * (fim - inicio)).astype(np.int64)]]
+
+
+def _cidades(cep, ceps, cidade_cep):
+    return cidade_cep[np.searchsorted(ceps, cep)]
+
+
+def gerar_lote_pedidos(rng, lote, n_pedidos, cadastros, proporcao_recorrentes=0.031):
+    """Pedidos, clientes, itens, pagamentos e avaliações de um lote (índices globais a partir de 'lote')."""
+    indices = np.arange(lote, lote + n_pedidos)
+    order_id = _ids(indices, sal=3)
+
+    # Clientes: um 'customer_id' por pedido; os recorrentes repetem um 'customer_unique_id' anterior.
+    unico = indices.copy()
+    recorrente = (rng.random(n_pedidos) < proporcao_recorrentes) & (indices > 0)
+    unico[recorrente] = (rng.random(recorrente.sum()) * indices[recorrente]).astype(np.int64)
+    pesos_c = np.array([ESTADOS[uf][0] for uf in ESTADOS])
+    uf_cliente = rng.choice(list(ESTADOS), size=n_pedidos, p=pesos_c / pesos_c.sum())
+    cep_cliente = _cep_do_estado(rng, cadastros['ceps'], cadastros['uf_cep'], uf_cliente)
+    fora_da_geo = rng.random(n_pedidos) < 0.003  # alguns CEPs de clientes não estão na geolocalização
+    cep_cliente[fora_da_geo] = rng.integers(1000, 99999, fora_da_geo.sum())
+    customers = pd.DataFrame({
+        'customer_id': _ids(indices, sal=4),
+        'customer_unique_id': _ids(unico, sal=5),
+        'customer_zip_code_prefix': cep_cliente,
+        'customer_city': np.where(
+            fora_da_geo, 'municipio_sem_geo',
+            cadastros['cidade_cep'][np.minimum(np.searchsorted(cadastros['ceps'], cep_cliente), len(cadastros['ceps']) - 1)]),
+        'customer_state': uf_cliente,
+    })
+
+    # Pedidos: volume crescente ao longo do período, como na base original.
+    segundos = (FIM - INICIO) / np.timedelta64(1, 's')
+    compra = INICIO + (np.sqrt(rng.random(n_pedidos)) * segundos).astype('timedelta64[s]')
+    status = _escolher(rng, STATUS, n_pedidos)
+    aprovado = compra + rng.exponential(10 * 3600, n_pedidos).astype('timedelta64[s]')
+    transportadora = aprovado + (rng.gamma(2.0, 1.5, n_pedidos) * DIA).astype('timedelta64[s]')
+    entregue = transportadora + (rng.gamma(3.0, 3.0, n_pedidos) * DIA).astype('timedelta64[s]')
+    estimado = (compra + (rng.normal(24, 8, n_pedidos).clip(3, 60) * DIA)).astype('datetime64[D]').astype('datetime64[s]')
+    nao_entregue = status != 'delivered'
+    sem_transportadora = np.isin(status, ['canceled', 'unavailable', 'invoiced', 'processing', 'created', 'approved'])
+    entregue[nao_entregue] = np.datetime64('NaT')
+    transportadora[sem_transportadora] = np.datetime64('NaT')
+    aprovado[status == 'created'] = np.datetime64('NaT')
+    orders = pd.DataFrame({
+        'order_id': order_id,
+        'customer_id': customers['customer_id'].to_numpy(),
+        'order_status': status,
+        'order_purchase_timestamp': _datas(compra),
+        'order_approved_at': _datas(aprovado),
+        'order_delivered_carrier_date': _datas(transportadora),
+        'order_delivered_customer_date': _datas(entregue),
+        'order_estimated_delivery_date': _datas(estimado),
+    })
+
+    # Itens: cada pedido repete o mesmo produto às vezes (várias unidades) ou mistura produtos.
+    n_itens = _escolher(rng, ITENS_POR_PEDIDO, n_pedidos).astype(np.int64)
+    pedido_item = np.repeat(np.arange(n_pedidos), n_itens)
+    numero_item = np.arange(len(pedido_item)) - np.repeat(np.cumsum(n_itens) - n_itens, n_itens) + 1
+    produto = _popular(rng, len(cadastros['produto_preco']), len(pedido_item))
+    mesmo_produto = (numero_item > 1) & (rng.random(len(pedido_item)) < 0.6)
+    anterior = np.flatnonzero(mesmo_produto)
+    for _ in range(int(n_itens.max())):
+        # Propaga o produto do item anterior (itens 2, 3... do mesmo pedido).
+        produto[anterior] = produto[anterior - 1]
+    preco = np.round(cadastros['produto_preco'][produto] * rng.uniform(0.95, 1.05, len(produto)), 2).clip(0.85)
+    frete = np.round(8 + cadastros['produto_peso'][produto] / 1000 * 2.5 + rng.gamma(2.0, 4.0, len(produto)), 2)
+    frete[rng.random(len(frete)) < 0.003] = 0.0
+    order_items = pd.DataFrame({
+        'order_id': order_id[pedido_item],
+        'order_item_id': numero_item,
+        'product_id': _ids(produto, sal=2),
+        'seller_id': _ids(cadastros['produto_vendedor'][produto], sal=1),
+        'shipping_limit_date': _datas(compra[pedido_item] + (rng.normal(6, 2, len(pedido_item)).clip(1, 30) * DIA).astype('timedelta64[s]')),
+        'price': preco,
+        'freight_value': frete,
+    })
+
+    # Pagamentos: o total do pedido, às vezes dividido em vários pagamentos (quase sempre vouchers).
+    total = np.bincount(pedido_item, weights=preco + frete, minlength=n_pedidos)
+    n_pagamentos = np.where(rng.random(n_pedidos) < 0.022, 1 + rng.geometric(0.45, n_pedidos), 1)
+    pedido_pag = np.repeat(np.arange(n_pedidos), n_pagamentos)
+    sequencial = np.arange(len(pedido_pag)) - np.repeat(np.cumsum(n_pagamentos) - n_pagamentos, n_pagamentos) + 1
+    tipo = _escolher(rng, TIPOS_PAGAMENTO, len(pedido_pag))
+    tipo[sequencial > 1] = 'voucher'
+    partes = rng.random(len(pedido_pag)) + 0.1
+    valor = total[pedido_pag] * partes / np.bincount(pedido_pag, weights=partes)[pedido_pag]
+    parcelas = np.where(tipo == 'credit_card', rng.choice([1, 1, 1, 2, 3, 4, 5, 6, 8, 10], len(tipo)), 1)
+    payments = pd.DataFrame({
+        'order_id': order_id[pedido_pag],
+        'payment_sequential': sequencial,
+        'payment_type': tipo,
+        'payment_installments': parcelas,
+        'payment_value': np.round(valor, 2),
+    })
+
+    # Avaliações: ~0,5% dos pedidos com duas; ~0,8% reaproveitam o 'review_id' do pedido anterior.
+    n_avaliacoes = np.where(rng.random(n_pedidos) < 0.0055, 2, 1)
+    pedido_av = np.repeat(np.arange(n_pedidos), n_avaliacoes)
+    review_indices = np.arange(len(pedido_av)) + 2 * lote
+    repetida = (rng.random(len(pedido_av)) < 0.008) & (np.arange(len(pedido_av)) > 0)
+    review_indices[repetida] = review_indices[np.flatnonzero(repetida) - 1]
+    referencia = np.where(np.isnat(entregue), estimado, entregue)[pedido_av]
+    criacao = (referencia + (rng.integers(0, 3, len(pedido_av)) * DIA)).astype('datetime64[D]').astype('datetime64[s]')
+    com_mensagem = rng.random(len(pedido_av)) < 0.41
+    reviews = pd.DataFrame({
+        'review_id': _ids(review_indices, sal=6),
+        'order_id': order_id[pedido_av],
+        'review_score': _escolher(rng, NOTAS, len(pedido_av)),
+        'review_comment_title': np.where(rng.random(len(pedido_av)) < 0.12, 'Recomendo', None),
+        'review_comment_message': np.where(com_mensagem, 'Produto entregue dentro do prazo.', None),
+        'review_creation_date': _datas(criacao),
+        'review_answer_timestamp': _datas(criacao + rng.exponential(3 * 86400, len(pedido_av)).astype('timedelta64[s]')),
+    })
+    return {'customers': customers, 'orders': orders, 'order_items': order_items,
+            'payments': payments, 'reviews': reviews}
+
+
+def gerar_dados(itens, saida, semente=42, verbose=True):
+    """Grava as 9 tabelas em 'saida' com ~'itens' itens de pedido. Devolve o número de linhas de cada tabela."""
+    os.makedirs(saida, exist_ok=True)
+    escala = itens / ITENS_BASE_ORIGINAL
+    cadastros = gerar_cadastros(np.random.default_rng([semente, 0]), escala)
+    linhas = {
+        'geolocation': _gravar(cadastros['geo'], 'geolocation', saida, True),
+        'sellers': _gravar(cadastros['sellers'], 'sellers', saida, True),
+        'products': _gravar(cadastros['products'], 'products', saida, True),
+        'translation': _gravar(cadastros['translation'], 'translation', saida, True),
+    }
+    n_pedidos = max(1, round(itens / (ITENS_BASE_ORIGINAL / 99_441)))
+    for numero, inicio in enumerate(range(0, n_pedidos, PEDIDOS_POR_LOTE)):
+        rng = np.random.default_rng([semente, numero + 1])
+        tabelas = gerar_lote_pedidos(rng, inicio, min(PEDIDOS_POR_LOTE, n_pedidos - inicio), cadastros)
+        for nome, df in tabelas.items():
+            linhas[nome] = linhas.get(nome, 0) + _gravar(df, nome, saida, numero == 0)
+        if verbose:
+            print(f"  {min(inicio + PEDIDOS_POR_LOTE, n_pedidos):,} de {n_pedidos:,} pedidos gerados...")
+    return linhas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera as 9 tabelas da Olist com dados sintéticos, em qualquer escala.")
+    parser.add_argument('--itens', default='100k', help="Número aproximado de itens de pedido (ex.: 100k, 1M, 20M).")
+    parser.add_argument('--saida', default='database', help="Pasta onde os CSVs são gravados (padrão: 'database').")
+    parser.add_argument('--semente', type=int, default=42, help="Semente: a mesma semente e escala geram os mesmos arquivos.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    print(f"Gerando ~{interpretar_escala(args.itens):,} itens de pedido em '{args.saida}'...")
+    linhas = gerar_dados(interpretar_escala(args.itens), args.saida, semente=args.semente)
+    for nome, n in linhas.items():
+        print(f"  {ESQUEMAS[nome]['arquivo']}: {n:,} linhas")
+    print(f"Dados sintéticos gerados em {time.perf_counter() - inicio:.1f}s.")
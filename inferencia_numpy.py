@@ -0,0 +1,408 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# --- Modelo Compilado ---
+# Versão "achatada" do pipeline salvo em 'modelo_vendas.pkl', para previsão só com NumPy:
+# as estatísticas do StandardScaler e os vocabulários dos encoders vão para 'meta.json', e os
+# nós de todas as árvores (feature, limiar, filhos, valor) são concatenados em arrays contíguos
+# '.npy', lidos com np.load(mmap_mode='r'). Assim um processo de previsão não importa o
+# sklearn nem desserializa o pipeline inteiro, e as páginas dos arrays são compartilhadas
+# entre processos pelo sistema operacional.
+# Só 'exportar_modelo_compilado' (chamado pelo 'main.py') usa o sklearn, e o importa localmente.
+
+MODELO_COMPILADO_PATH = os.path.join('data', 'modelo_compilado')
+
+VERSAO_FORMATO = 1
+
+# Transformações do alvo suportadas (func, inverse_func do TransformedTargetRegressor).
+TRANSFORMACOES_ALVO = {'log1p': (np.log1p, np.expm1)}
+
+
+# --- Exportação ---
+
+def _exportar_preprocessador(preprocessador, arrays):
+    """Descreve cada transformador do ColumnTransformer ajustado; os números vão para 'arrays'."""
+    from sklearn.preprocessing import (
+        FunctionTransformer, StandardScaler, OneHotEncoder, OrdinalEncoder, TargetEncoder
+    )
+
+    etapas = []
+    for nome, transformador, colunas in preprocessador.transformers_:
+        if transformador == 'drop' or len(colunas) == 0:
+            continue
+        colunas = list(colunas)
+        # Depois do ajuste, o 'passthrough' vira um FunctionTransformer sem função.
+        if transformador == 'passthrough' or (
+            isinstance(transformador, FunctionTransformer) and transformador.func is None
+        ):
+            etapas.append({'tipo': 'passthrough', 'colunas': colunas})
+        elif isinstance(transformador, StandardScaler):
+            media = transformador.mean_ if transformador.with_mean else np.zeros(len(colunas))
+            escala = transformador.scale_ if transformador.with_std else np.ones(len(colunas))
+            arrays[f'{nome}_media'] = np.asarray(media, dtype=np.float64)
+            arrays[f'{nome}_escala'] = np.asarray(escala, dtype=np.float64)
+            etapas.append({'tipo': 'escala', 'colunas': colunas, 'media': f'{nome}_media', 'escala': f'{nome}_escala'})
+        elif isinstance(transformador, OneHotEncoder):
+            if transformador.handle_unknown != 'ignore':
+                raise ValueError("Só o OneHotEncoder com handle_unknown='ignore' é suportado.")
+            descartadas = transformador.drop_idx_
+            etapas.append({
+                'tipo': 'onehot', 'colunas': colunas,
+                'categorias': [[str(c) for c in cats] for cats in transformador.categories_],
+                'descartada': [None if descartadas is None or descartadas[i] is None else int(descartadas[i])
+                               for i in range(len(colunas))],
+            })
+        elif isinstance(transformador, OrdinalEncoder):
+            etapas.append({
+                'tipo': 'ordinal', 'colunas': colunas,
+                'categorias': [[str(c) for c in cats] for cats in transformador.categories_],
+                'desconhecida': float(transformador.unknown_value),
+            })
+        elif isinstance(transformador, TargetEncoder):
+            etapas.append({
+                'tipo': 'alvo', 'colunas': colunas,
+                'categorias': [[str(c) for c in cats] for cats in transformador.categories_],
+                'codificacoes': [[float(v) for v in cod] for cod in transformador.encodings_],
+                'desconhecida': float(transformador.target_mean_),
+            })
+        else:
+            raise ValueError(f"Transformador '{nome}' ({type(transformador).__name__}) não é suportado pelo modelo compilado.")
+    return etapas
+
+
+def _exportar_floresta(modelo):
+    """Concatena os nós de todas as árvores de uma floresta (RandomForest/ExtraTrees)."""
+    arvores = [estimador.tree_ for estimador in modelo.estimators_]
+    raizes = np.cumsum([0] + [arvore.node_count for arvore in arvores[:-1]]).astype(np.int64)
+    partes = {nome: [] for nome in ('feature', 'limiar', 'esquerda', 'direita', 'valor', 'faltante_esquerda')}
+    for raiz, arvore in zip(raizes, arvores):
+        indices = np.arange(arvore.node_count, dtype=np.int64) + raiz
+        folha = arvore.children_left == -1
+        # Nas folhas, os dois filhos apontam para a própria folha: o percurso fica parado nela.
+        partes['esquerda'].append(np.where(folha, indices, arvore.children_left + raiz))
+        partes['direita'].append(np.where(folha, indices, arvore.children_right + raiz))
+        partes['feature'].append(np.where(folha, 0, arvore.feature))
+        partes['limiar'].append(arvore.threshold)
+        partes['valor'].append(arvore.value[:, 0, 0])
+        partes['faltante_esquerda'].append(np.asarray(arvore.missing_go_to_left, dtype=bool))
+    arrays = {nome: np.concatenate(valores) for nome, valores in partes.items()}
+    arrays['categorica'] = np.zeros(len(arrays['feature']), dtype=bool)
+    arrays['bitset'] = np.zeros(len(arrays['feature']), dtype=np.int32)
+    arrays['bitsets'] = np.zeros((0, 8), dtype=np.uint32)
+    arrays['categorias_conhecidas'] = np.zeros((0, 8), dtype=np.uint32)
+    arrays['indice_conhecidas'] = np.zeros(modelo.n_features_in_, dtype=np.int32)
+    arrays['raizes'] = raizes
+    meta = {
+        'tipo': 'floresta', 'base': 0.0, 'profundidade': int(max(arvore.max_depth for arvore in arvores)),
+        # As árvores do sklearn comparam X em float32 com o limiar em float64.
+        'dtype_comparacao': 'float32',
+        'ordem_features': None, 'categorias_internas': [],
+    }
+    return arrays, meta
+
+
+def _exportar_boosting(modelo):
+    """Concatena os nós das árvores de um HistGradientBoostingRegressor (com divisões categóricas)."""
+    preditores = [iteracao[0] for iteracao in modelo._predictors]
+    raizes = np.cumsum([0] + [len(p.nodes) for p in preditores[:-1]]).astype(np.int64)
+    bitsets_antes = np.cumsum([0] + [len(p.raw_left_cat_bitsets) for p in preditores[:-1]])
+    partes = {nome: [] for nome in ('feature', 'limiar', 'esquerda', 'direita', 'valor',
+                                    'faltante_esquerda', 'categorica', 'bitset')}
+    for raiz, deslocamento, preditor in zip(raizes, bitsets_antes, preditores):
+        nos = preditor.nodes
+        indices = np.arange(len(nos), dtype=np.int64) + raiz
+        folha = nos['is_leaf'].astype(bool)
+        partes['esquerda'].append(np.where(folha, indices, nos['left'].astype(np.int64) + raiz))
+        partes['direita'].append(np.where(folha, indices, nos['right'].astype(np.int64) + raiz))
+        partes['feature'].append(nos['feature_idx'].astype(np.int64))
+        partes['limiar'].append(nos['num_threshold'])
+        partes['valor'].append(nos['value'])
+        partes['faltante_esquerda'].append(nos['missing_go_to_left'].astype(bool))
+        partes['categorica'].append(nos['is_categorical'].astype(bool))
+        partes['bitset'].append(nos['bitset_idx'].astype(np.int64) + deslocamento)
+    arrays = {nome: np.concatenate(valores) for nome, valores in partes.items()}
+    arrays['bitsets'] = np.concatenate([p.raw_left_cat_bitsets for p in preditores]).astype(np.uint32).reshape(-1, 8)
+    conhecidas, indice_conhecidas = modelo._bin_mapper.make_known_categories_bitsets()
+    arrays['categorias_conhecidas'] = np.asarray(conhecidas, dtype=np.uint32).reshape(-1, 8)
+    arrays['indice_conhecidas'] = np.asarray(indice_conhecidas, dtype=np.int32)
+    arrays['raizes'] = raizes
+    # Com categóricas, o HistGradientBoosting recodifica essas colunas internamente (0..k-1,
+    # desconhecidas viram NaN) e as coloca antes das numéricas; os nós usam essa ordem.
+    ordem, categorias_internas = None, []
+    interno = getattr(modelo, '_preprocessor', None)
+    if interno is not None:
+        ordem = []
+        for nome, transformador, mascara in interno.transformers_:
+            if nome == 'remainder':
+                continue
+            indices = np.flatnonzero(mascara) if np.asarray(mascara).dtype == bool else np.asarray(mascara)
+            if nome == 'encoder':
+                categorias_internas = [[float(v) for v in cats] for cats in transformador.categories_]
+            ordem.extend(int(i) for i in indices)
+    meta = {
+        'tipo': 'boosting', 'base': float(np.ravel(modelo._baseline_prediction)[0]),
+        'ordem_features': ordem, 'categorias_internas': categorias_internas,
+        'profundidade': int(max(p.get_max_depth() for p in preditores)) if preditores else 0,
+        'dtype_comparacao': 'float64',
+        # Só as folhas recebem o learning_rate; os nós internos guardam o valor sem ele.
+        'escala_nos_internos': float(modelo.learning_rate),
+    }
+    return arrays, meta
+
+
+def _salvar_pasta(pasta, arrays, meta):
+    """Grava os arrays e o meta.json em uma pasta temporária e a troca pela pasta final."""
+    temporaria = pasta + '.tmp'
+    antiga = pasta + '.antiga'
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+    for nome, valores in arrays.items():
+        np.save(os.path.join(temporaria, f'{nome}.npy'), np.ascontiguousarray(valores), allow_pickle=False)
+    with open(os.path.join(temporaria, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(pasta):
+        os.replace(pasta, antiga)
+    os.replace(temporaria, pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+
+
+def remover_modelo_compilado(pasta=MODELO_COMPILADO_PATH):
+    """Remove um modelo compilado antigo (quando o modelo novo não pode ser exportado)."""
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+def exportar_modelo_compilado(pipeline, pasta=MODELO_COMPILADO_PATH):
+    """
+    Exporta o TransformedTargetRegressor(Pipeline(preprocessor, model)) treinado para 'pasta'.
+    Lança ValueError se alguma etapa (transformação do alvo, encoder ou modelo) não for suportada.
+    """
+    from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+
+    alvo = None
+    for nome, (func, inversa) in TRANSFORMACOES_ALVO.items():
+        if pipeline.func is func and pipeline.inverse_func is inversa:
+            alvo = nome
+    if alvo is None or pipeline.transformer is not None:
+        raise ValueError("Só a transformação do alvo log1p/expm1 é suportada pelo modelo compilado.")
+
+    interno = pipeline.regressor_
+    modelo = interno.named_steps['model']
+    if isinstance(modelo, (RandomForestRegressor, ExtraTreesRegressor)):
+        arrays, meta = _exportar_floresta(modelo)
+    elif isinstance(modelo, HistGradientBoostingRegressor):
+        arrays, meta = _exportar_boosting(modelo)
+    else:
+        raise ValueError(f"O modelo {type(modelo).__name__} não é suportado pelo modelo compilado.")
+
+    meta['versao_formato'] = VERSAO_FORMATO
+    meta['alvo'] = alvo
+    meta['preprocessamento'] = _exportar_preprocessador(interno.named_steps['preprocessor'], arrays)
+    meta['colunas_entrada'] = [col for etapa in meta['preprocessamento'] for col in etapa['colunas']]
+    _salvar_pasta(pasta, arrays, meta)
+    return meta
+
+
+# --- Previsão ---
+
+def _no_bitset(bitsets, linhas, valores):
+    """Verifica, para cada posição, se o valor (0-255) está marcado no bitset da linha indicada."""
+    palavras = bitsets[linhas, valores >> 5]
+    return ((palavras >> (valores & 31).astype(np.uint32)) & 1).astype(bool)
+
+
+def _vocabulario_ordenado(categorias, descartada=None):
+    """
+    As categorias em ordem (para a busca binária), a posição original de cada uma (o código) e,
+    para o one-hot, a coluna da dummy de cada código, com uma posição a mais para o -1.
+    """
+    categorias = np.asarray(categorias, dtype=str)
+    ordem = np.argsort(categorias, kind='stable')
+    manter = [k for k in range(len(categorias)) if k != descartada]
+    destino = np.full(len(categorias) + 1, -1, dtype=np.int64)
+    destino[manter] = np.arange(len(manter))
+    return categorias[ordem], ordem.astype(np.int64), destino
+
+
+def _codificar(valores, ordenadas, ordem):
+    """Código de cada valor no vocabulário (-1 quando ele não está lá), sem laço em Python."""
+    if len(ordenadas) == 0:
+        return np.full(len(valores), -1, dtype=np.int64)
+    posicao = np.searchsorted(ordenadas, valores).clip(max=len(ordenadas) - 1)
+    return np.where(ordenadas[posicao] == valores, ordem[posicao], -1)
+
+
+class ModeloCompilado:
+    """Carrega um modelo exportado por 'exportar_modelo_compilado' e faz previsões em lote só com NumPy."""
+
+    def __init__(self, pasta=MODELO_COMPILADO_PATH, linhas_por_lote=10_000):
+        with open(os.path.join(pasta, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get('versao_formato') != VERSAO_FORMATO:
+            raise ValueError(f"Formato do modelo compilado em '{pasta}' é de outra versão. Rode o 'main.py' novamente.")
+        self.arrays = {
+            arquivo[:-4]: np.load(os.path.join(pasta, arquivo), mmap_mode='r', allow_pickle=False)
+            for arquivo in os.listdir(pasta) if arquivo.endswith('.npy')
+        }
+        self.linhas_por_lote = linhas_por_lote
+        self.colunas_entrada = self.meta['colunas_entrada']
+        # Vocabulários ordenados (com a posição original de cada categoria), montados uma vez,
+        # para codificar uma coluna inteira com np.searchsorted.
+        self._vocabularios = [
+            [_vocabulario_ordenado(cats, etapa['descartada'][i] if etapa['tipo'] == 'onehot' else None)
+             for i, cats in enumerate(etapa['categorias'])] if 'categorias' in etapa else None
+            for etapa in self.meta['preprocessamento']
+        ]
+        self._largura = len(self.colunas_origem())
+
+    def transformar(self, dados):
+        """Aplica o pré-processamento a um DataFrame (ou dicionário de colunas) e devolve a matriz float64."""
+        n_linhas = len(dados[self.colunas_entrada[0]])
+        # A matriz é alocada uma vez, por colunas (cada etapa escreve colunas inteiras, contíguas).
+        X = np.empty((n_linhas, self._largura), order='F')
+        inicio = 0
+        for etapa, vocabularios in zip(self.meta['preprocessamento'], self._vocabularios):
+            if etapa['tipo'] in ('passthrough', 'escala'):
+                fim = inicio + len(etapa['colunas'])
+                for j, col in enumerate(etapa['colunas']):
+                    X[:, inicio + j] = np.asarray(dados[col], dtype=np.float64)
+                if etapa['tipo'] == 'escala':
+                    X[:, inicio:fim] -= self.arrays[etapa['media']]
+                    X[:, inicio:fim] /= self.arrays[etapa['escala']]
+                inicio = fim
+                continue
+
+            for i, col in enumerate(etapa['colunas']):
+                ordenadas, ordem, destino = vocabularios[i]
+                codigo = _codificar(np.asarray(dados[col], dtype=object).astype(str), ordenadas, ordem)
+                if etapa['tipo'] == 'onehot':
+                    # Categoria desconhecida (e a descartada) vira uma linha de zeros, como no
+                    # handle_unknown='ignore'. 'destino' leva o código à coluna da dummy (-1: nenhuma).
+                    largura = int(destino.max()) + 1 if len(destino) else 0
+                    X[:, inicio:inicio + largura] = 0.0
+                    coluna = destino[codigo]
+                    linhas = np.flatnonzero(coluna >= 0)
+                    X[linhas, inicio + coluna[linhas]] = 1.0
+                    inicio += largura
+                    continue
+                if etapa['tipo'] == 'ordinal':
+                    X[:, inicio] = np.where(codigo >= 0, codigo, etapa['desconhecida'])
+                else:
+                    codificacoes = np.asarray(etapa['codificacoes'][i])
+                    X[:, inicio] = np.where(codigo >= 0, codificacoes[np.maximum(codigo, 0)], etapa['desconhecida'])
+                inicio += 1
+        return X
+
+    def colunas_origem(self):
+        """Coluna de entrada de cada coluna da matriz de 'transformar' (as dummies do one-hot apontam para a categórica)."""
+        origem = []
+        for etapa in self.meta['preprocessamento']:
+            for i, col in enumerate(etapa['colunas']):
+                if etapa['tipo'] == 'onehot':
+                    largura = len(etapa['categorias'][i]) - (etapa['descartada'][i] is not None)
+                    origem.extend([col] * largura)
+                else:
+                    origem.append(col)
+        return origem
+
+    def _descer(self, X, nos, linhas):
+        """Um nível abaixo em todas as árvores: o filho de cada nó em 'nos' (árvores, linhas); as folhas ficam paradas."""
+        a = self.arrays
+        feature = a['feature'][nos]
+        x = X[linhas, feature]
+        faltante = np.isnan(x)
+        esquerda = np.where(faltante, a['faltante_esquerda'][nos], x <= a['limiar'][nos])
+        categorica = a['categorica'][nos]
+        if categorica.any():
+            # Divisão categórica: vai para a esquerda se a categoria está no bitset do nó.
+            # Categorias negativas ou não vistas no treino seguem o lado dos faltantes.
+            cat_x = x[categorica]
+            cat_nos = nos[categorica]
+            codigo = np.where(np.isnan(cat_x) | (cat_x < 0) | (cat_x > 255), 0, cat_x).astype(np.int64)
+            conhecida = ~np.isnan(cat_x) & (cat_x >= 0) & (cat_x <= 255) & _no_bitset(
+                a['categorias_conhecidas'], a['indice_conhecidas'][feature[categorica]], codigo)
+            esquerda[categorica] = np.where(
+                conhecida, _no_bitset(a['bitsets'], a['bitset'][cat_nos], codigo),
+                a['faltante_esquerda'][cat_nos])
+        return np.where(esquerda, a['esquerda'][nos], a['direita'][nos])
+
+    def _percorrer(self, X):
+        """Percorre todas as árvores ao mesmo tempo e devolve a soma dos valores das folhas por linha."""
+        X = X.astype(self.meta['dtype_comparacao'])
+        linhas = np.arange(X.shape[0])[None, :]
+        nos = np.repeat(np.asarray(self.arrays['raizes'])[:, None], X.shape[0], axis=1)  # (árvores, linhas)
+        for _ in range(self.meta['profundidade']):
+            nos = self._descer(X, nos, linhas)
+        return self.arrays['valor'][nos].sum(axis=0)
+
+    def _recodificar_internas(self, X):
+        """Reproduz a recodificação interna de categóricas do HistGradientBoosting (veja '_exportar_boosting')."""
+        X = X[:, self.meta['ordem_features']]
+        for j, categorias in enumerate(self.meta['categorias_internas']):
+            categorias = np.asarray(categorias)
+            posicao = np.searchsorted(categorias, X[:, j])
+            posicao_valida = np.minimum(posicao, len(categorias) - 1)
+            X[:, j] = np.where(categorias[posicao_valida] == X[:, j], posicao_valida, np.nan)
+        return X
+
+    def predict(self, dados):
+        X = self.transformar(dados)
+        if self.meta['ordem_features'] is not None:
+            X = self._recodificar_internas(X)
+        n_arvores = len(self.arrays['raizes'])
+        saida = np.empty(X.shape[0])
+        for inicio in range(0, X.shape[0], self.linhas_por_lote):
+            soma = self._percorrer(X[inicio:inicio + self.linhas_por_lote])
+            if self.meta['tipo'] == 'floresta':
+                saida[inicio:inicio + self.linhas_por_lote] = soma / n_arvores
+            else:
+                saida[inicio:inicio + self.linhas_por_lote] = self.meta['base'] + soma
+        _, inversa = TRANSFORMACOES_ALVO[self.meta['alvo']]
+        return inversa(saida)
+
+    def contribuicoes(self, dados):
+        """
+        Decompõe cada previsão pelo caminho percorrido em cada árvore (método de Saabas): ao
+        descer de um nó para o filho, a diferença entre os valores dos dois é creditada à
+        coluna de entrada da divisão (as dummies do one-hot somam na categórica de origem).
+        Devolve (base, matriz linhas x colunas_entrada) no espaço do alvo transformado, com
+        base + soma da linha igual à previsão antes da transformação inversa.
+        """
+        a = self.arrays
+        X = self.transformar(dados)
+        origem = self.colunas_origem()
+        if self.meta['ordem_features'] is not None:
+            X = self._recodificar_internas(X)
+            origem = [origem[i] for i in self.meta['ordem_features']]
+        # Coluna de entrada de cada feature usada pelos nós.
+        indice_coluna = np.array([self.colunas_entrada.index(col) for col in origem], dtype=np.int64)
+        n_colunas = len(self.colunas_entrada)
+        raizes = np.asarray(a['raizes'])
+        valor = np.asarray(a['valor'])
+        escala = self.meta.get('escala_nos_internos', 1.0)
+        if escala != 1.0:
+            folha = np.asarray(a['esquerda']) == np.arange(len(valor))
+            valor = np.where(folha, valor, valor * escala)
+
+        X = X.astype(self.meta['dtype_comparacao'])
+        saida = np.empty((X.shape[0], n_colunas))
+        for inicio in range(0, X.shape[0], self.linhas_por_lote):
+            lote = X[inicio:inicio + self.linhas_por_lote]
+            linhas = np.arange(lote.shape[0])[None, :]
+            nos = np.repeat(raizes[:, None], lote.shape[0], axis=1)  # (árvores, linhas)
+            soma = np.zeros(lote.shape[0] * n_colunas)
+            for _ in range(self.meta['profundidade']):
+                filhos = self._descer(lote, nos, linhas)
+                # Nas folhas o filho é o próprio nó, então a diferença é zero.
+                posicao = linhas * n_colunas + indice_coluna[a['feature'][nos]]
+                soma += np.bincount(posicao.ravel(), weights=(valor[filhos] - valor[nos]).ravel(), minlength=soma.size)
+                nos = filhos
+            saida[inicio:inicio + self.linhas_por_lote] = soma.reshape(lote.shape[0], n_colunas)
+
+        base = float(valor[raizes].sum())
+        if self.meta['tipo'] == 'floresta':
+            return base / len(raizes), saida / len(raizes)
+        return self.meta['base'] + base, saida
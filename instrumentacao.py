@@ -0,0 +1,179 @@
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: sem o pico de memória do processo
+    resource = None
+
+# --- Instrumentação por Etapa ---
+# 'etapa(nome)' envolve uma etapa nomeada (leitura de uma tabela, cada merge, cada feature, o
+# ajuste do codificador, a busca, cada previsão do dashboard) e registra a duração, a memória
+# (RSS atual, pico do processo e quanto o pico subiu durante a etapa) e o número de linhas.
+#
+# Fica desligada por padrão: sem a variável de ambiente OLIST_TRACE, 'etapa' devolve sempre o
+# mesmo objeto vazio e o custo é o de uma chamada de função. Com OLIST_TRACE=<arquivo>, cada
+# etapa vira um evento "X" do formato Trace Event (o do chrome://tracing e do Perfetto) gravado
+# no arquivo assim que termina. O arquivo usa o formato de array sem fechamento, que os
+# visualizadores aceitam e permite que vários processos (ex.: workers da busca) acrescentem
+# eventos ao mesmo arquivo. 'python instrumentacao.py <arquivo>' resume o trace por etapa.
+
+VARIAVEL_AMBIENTE = 'OLIST_TRACE'
+CATEGORIA_PADRAO = 'olist'
+
+_trava = threading.Lock()
+_caminho = os.environ.get(VARIAVEL_AMBIENTE) or None
+_descritor = None
+
+
+def ativo():
+    """Indica se a instrumentação está ligada (OLIST_TRACE definida)."""
+    return _caminho is not None
+
+
+def _rss_atual_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _pico_processo_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 ** 2 if sys.platform == 'darwin' else 1024)  # KB no Linux, bytes no macOS
+
+
+def _gravar_evento(evento):
+    global _descritor
+    linha = (json.dumps(evento, default=str) + ',\n').encode('utf-8')
+    with _trava:
+        if _descritor is None:
+            pasta = os.path.dirname(_caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            _descritor = os.open(_caminho, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if os.fstat(_descritor).st_size == 0:
+                os.write(_descritor, b'[\n')
+            atexit.register(os.close, _descritor)
+            # Nome do processo no visualizador: o script que o iniciou.
+            nome = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+            metadado = {'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': f'{nome} ({os.getpid()})'}}
+            os.write(_descritor, (json.dumps(metadado) + ',\n').encode('utf-8'))
+        os.write(_descritor, linha)
+
+
+class _EtapaNula:
+    """Etapa da instrumentação desligada: não mede nada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULA = _EtapaNula()
+
+
+class _Etapa:
+    """Etapa medida. 'linhas' (e outros atributos em 'args') podem ser preenchidos dentro do bloco."""
+
+    def __init__(self, nome, categoria, linhas, args):
+        self.nome = nome
+        self.categoria = categoria
+        self.linhas = linhas
+        self.args = args
+
+    def __enter__(self):
+        self._pico_inicial = _pico_processo_mb()
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, rastro):
+        fim = time.perf_counter_ns()
+        pico = _pico_processo_mb()
+        args = dict(self.args)
+        if self.linhas is not None:
+            args['linhas'] = int(self.linhas)
+        args['rss_mb'] = _rss_atual_mb()
+        args['pico_processo_mb'] = pico
+        if pico is not None and self._pico_inicial is not None:
+            args['aumento_pico_mb'] = pico - self._pico_inicial
+        if tipo_excecao is not None:
+            args['erro'] = tipo_excecao.__name__
+        _gravar_evento({
+            'name': self.nome, 'cat': self.categoria, 'ph': 'X',
+            'ts': self._inicio / 1000, 'dur': (fim - self._inicio) / 1000,
+            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args,
+        })
+        return False
+
+
+def etapa(nome, categoria=CATEGORIA_PADRAO, linhas=None, **args):
+    """
+    Context manager que mede a etapa 'nome'. Uso:
+
+        with etapa('carregar:orders', categoria='io') as e:
+            orders = carregar_tabela('orders')
+            e.linhas = len(orders)
+    """
+    if _caminho is None:
+        return _NULA
+    return _Etapa(nome, categoria, linhas, args)
+
+
+def ler_trace(caminho):
+    """Lê os eventos de um arquivo de trace (array JSON, fechado ou não)."""
+    with open(caminho, 'r') as f:
+        texto = f.read().strip()
+    if not texto.endswith(']'):
+        texto = texto.rstrip(',') + ']'
+    return json.loads(texto)
+
+
+def resumir_trace(caminho):
+    """Agrega os eventos por etapa: chamadas, tempo total e máximo, linhas e maior pico do processo."""
+    resumo = {}
+    for evento in ler_trace(caminho):
+        if evento.get('ph') != 'X':
+            continue
+        r = resumo.setdefault(evento['name'], {'chamadas': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'linhas': 0, 'pico_mb': 0.0})
+        duracao = evento['dur'] / 1000
+        r['chamadas'] += 1
+        r['total_ms'] += duracao
+        r['max_ms'] = max(r['max_ms'], duracao)
+        r['linhas'] += evento['args'].get('linhas') or 0
+        r['pico_mb'] = max(r['pico_mb'], evento['args'].get('pico_processo_mb') or 0.0)
+    return dict(sorted(resumo.items(), key=lambda item: -item[1]['total_ms']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resume um arquivo de trace gravado com OLIST_TRACE.")
+    parser.add_argument('arquivo', help="Arquivo de trace (JSON no formato Trace Event).")
+    parser.add_argument('--json', action='store_true', help="Imprime o resumo em JSON em vez da tabela.")
+    args = parser.parse_args()
+
+    try:
+        resumo = resumir_trace(args.arquivo)
+    except FileNotFoundError:
+        print(f"Erro: o arquivo de trace '{args.arquivo}' não foi encontrado.")
+        exit()
+    if args.json:
+        print(json.dumps(resumo, indent=4))
+    else:
+        print(f"{'etapa':<45} {'chamadas':>8} {'total (ms)':>12} {'máx (ms)':>10} {'linhas':>12} {'pico (MB)':>10}")
+        for nome, r in resumo.items():
+            print(f"{nome[:45]:<45} {r['chamadas']:>8} {r['total_ms']:>12.1f} {r['max_ms']:>10.1f} "
+                  f"{r['linhas']:>12,} {r['pico_mb']:>10.0f}")
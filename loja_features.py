@@ -0,0 +1,117 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa
+from registro_features import (
+    FEATURES, compilar_features, preparar_entrada, aplicar_feature, verificar_entradas
+)
+
+# --- Loja de Features ---
+# Cada coluna de feature é gravada em um '.npy' próprio, em
+# 'data_processed/features/<feature>/v<versão>-<chave>.npy'. A chave combina a versão
+# e o dtype da feature, a impressão digital das colunas de entrada (valores, dtype e
+# ordem das linhas) e, para features derivadas, as chaves das features das quais dependem.
+
+LOJA_FEATURES_PATH = os.path.join('data_processed', 'features')
+
+# Quantas chaves (datasets diferentes) da versão atual manter por feature.
+MAX_CHAVES_POR_FEATURE = 3
+
+
+def _impressao_coluna(serie):
+    """Impressão digital de uma coluna bruta: nome, dtype e o hash de cada linha (com o índice)."""
+    h = hashlib.sha256()
+    h.update(f'{serie.name}|{serie.dtype}|'.encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(serie, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _chave_feature(nome, assinaturas_entradas):
+    feature = FEATURES[nome]
+    partes = [nome, str(feature['versao']), feature['dtype'], *assinaturas_entradas]
+    if feature['recursos_externos'] is not None:
+        partes.append(feature['recursos_externos']())
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:24]
+
+
+def _salvar_coluna(caminho, valores):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        np.save(f, valores, allow_pickle=False)
+    os.replace(temporario, caminho)
+
+
+def _despejar(pasta, versao, max_chaves):
+    """
+    Remove da pasta de uma feature os arquivos de versões antigas do código e,
+    da versão atual, mantém só as 'max_chaves' usadas mais recentemente.
+    """
+    prefixo = f'v{versao}-'
+    atuais = []
+    for arquivo in os.listdir(pasta):
+        caminho = os.path.join(pasta, arquivo)
+        if not arquivo.startswith(prefixo) or not arquivo.endswith('.npy'):
+            os.remove(caminho)
+        else:
+            atuais.append(caminho)
+    atuais.sort(key=os.path.getmtime, reverse=True)
+    for caminho in atuais[max_chaves:]:
+        os.remove(caminho)
+
+
+def limpar_loja(loja_path=LOJA_FEATURES_PATH):
+    """Remove da loja as pastas de features que não estão mais registradas."""
+    if not os.path.isdir(loja_path):
+        return
+    for nome in os.listdir(loja_path):
+        if nome not in FEATURES:
+            shutil.rmtree(os.path.join(loja_path, nome), ignore_errors=True)
+
+
+def calcular_features_em_cache(df, nomes, loja_path=LOJA_FEATURES_PATH, max_chaves=MAX_CHAVES_POR_FEATURE):
+    """
+    Versão memorizada de 'calcular_features': cada feature cuja chave já está na loja é
+    lida do disco, e só as invalidadas (entradas ou versão mudaram) são recalculadas e gravadas.
+    Retorna o DataFrame de features e um relatório {'do_cache': [...], 'recalculadas': [...]}.
+    """
+    plano = compilar_features(tuple(nomes))
+    verificar_entradas(df, plano)
+
+    assinaturas = {}   # coluna bruta ou feature -> impressão digital / chave
+    colunas = {}       # coluna bruta ou feature -> Series
+    relatorio = {'do_cache': [], 'recalculadas': []}
+
+    for nome in plano['ordem']:
+        feature = FEATURES[nome]
+        for entrada in feature['entradas']:
+            if entrada not in FEATURES and entrada not in assinaturas:
+                assinaturas[entrada] = _impressao_coluna(df[entrada])
+
+        chave = _chave_feature(nome, [assinaturas[e] for e in feature['entradas']])
+        assinaturas[nome] = chave
+        pasta = os.path.join(loja_path, nome)
+        caminho = os.path.join(pasta, f"v{feature['versao']}-{chave}.npy")
+
+        if os.path.exists(caminho):
+            with etapa(f'feature:{nome}', categoria='features', linhas=len(df), origem='loja'):
+                colunas[nome] = pd.Series(np.load(caminho, allow_pickle=False), index=df.index)
+            os.utime(caminho)  # marca como usada recentemente
+            relatorio['do_cache'].append(nome)
+        else:
+            with etapa(f'feature:{nome}', categoria='features', linhas=len(df), origem='calculada'):
+                for entrada in feature['entradas']:
+                    if entrada not in colunas:
+                        colunas[entrada] = preparar_entrada(df, entrada)
+                colunas[nome] = aplicar_feature(nome, colunas, df.index)
+            _salvar_coluna(caminho, colunas[nome].to_numpy())
+            relatorio['recalculadas'].append(nome)
+
+        _despejar(pasta, feature['versao'], max_chaves)
+
+    resultado = pd.DataFrame({nome: colunas[nome] for nome in plano['nomes']}, index=df.index)
+    return resultado, relatorio
@@ -4,13 +4,84 @@ from sklearn.compose import TransformedTargetRegressor
 import numpy as np
 import json
 import joblib
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
+import io
+import os
+import shutil
+import time
+from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import mean_squared_error, r2_score
 import matplotlib.pyplot as plt
+import argparse
+import atexit
+from tipos_compactos import compactar_tipos, memoria_mb, relatorio_memoria, ler_csv_com_tipos
+from busca_hiperparametros import BuscaGrade, BuscaSucessiva
+from inferencia_numpy import ModeloCompilado, exportar_modelo_compilado, remover_modelo_compilado, MODELO_COMPILADO_PATH
+from servico_previsao import criar_perfil_servico, salvar_perfil_servico, PERFIL_SERVICO_PATH, INDICE_GEO_SERVICO_PATH
+from geo_indice import GEO_INDICE_PATH
+from explicacoes_modelo import calcular_importancia_permutacao, salvar_importancia, IMPORTANCIA_PATH
+from versoes_modelo import criar_pasta_versao, publicar_versao, VERSOES_PATH
+from compressao_modelo import comprimir_modelo, COMPRIMIDO_PATH
+from instrumentacao import etapa
+from pipeline_modelo import (
+    CODIFICACOES, MOTORES, criar_preprocessador, criar_modelo, relatorio_codificacao, verificar_combinacao
+)
+
+parser = argparse.ArgumentParser(description="Treina o modelo de previsão do valor da venda.")
+parser.add_argument(
+    '--compacto', action='store_true',
+    help="Treina com tipos compactos (float32, inteiros estreitos, 'category') e mostra a memória economizada."
+)
+parser.add_argument(
+    '--busca', choices=['grid', 'sucessiva'], default='grid',
+    help="'grid' avalia todas as combinações com o fold inteiro; 'sucessiva' avalia todas com poucas "
+         "linhas e promove só as melhores para rodadas com mais linhas (successive halving)."
+)
+parser.add_argument('--fator', type=int, default=3, help="Na busca sucessiva, fração (1/fator) promovida a cada rodada.")
+parser.add_argument('--max-ajustes', type=int, default=None, help="Limite de ajustes da busca (configuração x fold).")
+parser.add_argument('--max-minutos', type=float, default=None, help="Limite de tempo da busca em minutos.")
+parser.add_argument(
+    '--sem-cache-folds', action='store_true',
+    help="Reajusta o pré-processamento em cada ajuste da busca, em vez de uma vez por fold."
+)
+parser.add_argument(
+    '--oob', action='store_true',
+    help="Nas florestas com bootstrap, registra também o score out-of-bag de cada configuração da busca."
+)
+parser.add_argument(
+    '--sem-checkpoint', action='store_true',
+    help="Não grava nem reaproveita os resultados da busca em 'data/checkpoints/' (a busca recomeça do zero)."
+)
+parser.add_argument(
+    '--nucleos', type=int, default=None,
+    help="Núcleos da busca: divididos entre ajustes em paralelo e o 'n_jobs' do modelo (padrão: todos)."
+)
+parser.add_argument(
+    '--memoria-mb', type=float, default=None,
+    help="Memória da busca em MB: limita quantos ajustes rodam em paralelo (padrão: a memória disponível)."
+)
+parser.add_argument(
+    '--codificacao', choices=CODIFICACOES, default=None,
+    help="Codificação das categóricas: one-hot denso com StandardScaler, one-hot esparso, códigos "
+         "ordinais ou target encoding (as três últimas sem escala nas numéricas). Padrão: a do motor."
+)
+parser.add_argument(
+    '--motor', choices=list(MOTORES), default='random_forest',
+    help="Modelo treinado dentro do pipeline (cada um com seu espaço de busca)."
+)
+parser.add_argument(
+    '--benchmark', action='store_true',
+    help="Treina todos os motores no mesmo split, compara tempo, latência, tamanho e R²/MSE e salva o vencedor."
+)
+parser.add_argument(
+    '--comprimir', action='store_true',
+    help="Depois do treino, procura um modelo menor (subconjunto de árvores ou destilação) dentro do orçamento de perda de R²."
+)
+parser.add_argument(
+    '--perda-max-r2', type=float, default=0.01,
+    help="Perda máxima de R² aceita pela compressão, medida em uma fatia separada do treino (padrão 0.01)."
+)
+args = parser.parse_args()
 
 def feature_engineering_data(df_input):
     """Applies basic feature engineering to the dataframe."""
@@ -21,12 +92,18 @@ def feature_engineering_data(df_input):
     return df_processed
 
 # 1. Carregar os dados
+# Se 'engenharia_features.py' rodou com --compacto, os tipos salvos ao lado do CSV são aplicados na leitura.
 try:
-    df_raw = pd.read_csv("database/dataset_para_modelo.csv")
+    df_raw = ler_csv_com_tipos("database/dataset_para_modelo.csv")
 except FileNotFoundError:
     print("Erro: O arquivo 'dataset_para_modelo.csv' não foi encontrado. Verifique o caminho.")
     exit()
 
+if args.compacto:
+    mb_antes = memoria_mb(df_raw)
+    df_raw = compactar_tipos(df_raw)
+    relatorio_memoria("main (dataset de treino)", mb_antes, df_raw)
+
 # 2. Feature Engineering
 # df_engineered = feature_engineering_data(df_raw)
 
@@ -44,7 +121,7 @@ numeric_features = [
     'product_photos_qty', 'product_weight_g', 'product_length_cm', 'product_height_cm',
     'product_width_cm', 'review_score', 'payment_sequential', 'payment_installments',
     'tempo_entrega_dias', 'tempo_estimado_dias', 'atraso_na_entrega_dias',
-    'compra_dia_da_semana', 'compra_mes', 'percentual_frete'
+    'compra_dia_da_semana', 'compra_mes', 'percentual_frete', 'distancia_cliente_vendedor_km'
 ]
 categorical_features = [
     # 'seller_city',
@@ -55,79 +132,227 @@ categorical_features = [
     'product_category_name_english'
 ]
 
-# 5. Criar o pré-processador com ColumnTransformer
-# StandardScaler para numéricas, OneHotEncoder para categóricas
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numeric_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore', drop='first', sparse_output=False), categorical_features)
-    ],
-    remainder='drop' #descarta as colunas desnecessárias
-)
+# 5-7. Montar o modelo: pré-processador (ColumnTransformer) + modelo do motor escolhido,
+# embrulhados pelo TransformedTargetRegressor (log1p no alvo). Os motores disponíveis e seus
+# espaços de busca estão em 'pipeline_modelo.py'.
+def montar_regressor(motor, codificacao):
+    # 5. Criar o pré-processador com ColumnTransformer
+    # Por padrão, StandardScaler para numéricas e OneHotEncoder denso para categóricas;
+    # as outras estratégias estão em 'pipeline_modelo.py'.
+    preprocessor = criar_preprocessador(codificacao, numeric_features, categorical_features)
 
-# 6. Criar o pipeline com pré-processador e modelo
-pipeline_rf = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('model', RandomForestRegressor(random_state=42))
-])
-
-# 7. Embrulhar o pipeline com TransformedTargetRegressor
-regr_trans = TransformedTargetRegressor(
-    regressor=pipeline_rf,
-    func=np.log1p,
-    inverse_func=np.expm1
-)
+    # 6. Criar o pipeline com pré-processador e modelo
+    pipeline = Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('model', criar_modelo(motor, codificacao, numeric_features, categorical_features))
+    ])
 
-# 8. Definir o grid de parâmetros para GridSearchCV
-# Parâmetros do RandomForestRegressor são prefixos com 'model__'
-param_grid = {
-    'regressor__model__n_estimators': [100, 200],
-    'regressor__model__max_depth': [10, 20, 30],
-    'regressor__model__min_samples_leaf': [1, 2, 4],
-    'regressor__model__min_samples_split': [2, 5, 10],
-    'regressor__model__max_features': ['sqrt', 'log2']
-}
+    # 7. Embrulhar o pipeline com TransformedTargetRegressor
+    return TransformedTargetRegressor(
+        regressor=pipeline,
+        func=np.log1p,
+        inverse_func=np.expm1
+    )
 
-# 9. Separar dados em treino e teste
+# 9. Separar dados em treino e teste (o mesmo split para todos os motores)
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# 10. Otimização com GridSearchCV
-grid_search = GridSearchCV(
-    estimator=regr_trans,
-    param_grid=param_grid,
-    cv=5,
-    scoring='r2',
-    n_jobs=-1,
-    verbose=1
-)
+def treinar_motor(motor, codificacao):
+    """Busca os hiperparâmetros do motor e avalia o melhor pipeline no conjunto de teste."""
+    print(f"\n--- Treinando o motor '{motor}' (codificação '{codificacao}') ---")
+    regr_trans = montar_regressor(motor, codificacao)
+
+    # 8. O grid de parâmetros de cada motor está no registro ('pipeline_modelo.py')
+    # Parâmetros do modelo são prefixados com 'regressor__model__'
+    param_grid = MOTORES[motor]['param_grid']
+
+    # 9.1 Memória e tempo da codificação escolhida sobre o conjunto de treino
+    relatorio_cod = relatorio_codificacao(codificacao, regr_trans.regressor.named_steps['preprocessor'],
+                                          X_train, np.log1p(y_train))
+
+    # 10. Otimização com busca em grade ou com a busca sucessiva com orçamento
+    # As duas usam os mesmos 5 folds do GridSearchCV. Como o grid só varia parâmetros do modelo,
+    # o ColumnTransformer e o log1p do alvo são calculados uma vez por fold e reaproveitados por
+    # todas as configurações, e as florestas que só diferem em 'n_estimators' crescem com
+    # 'warm_start' a partir da menor, em vez de serem treinadas do zero. A busca sucessiva ainda
+    # descarta cedo as configurações ruins, que são avaliadas só com uma fração das linhas de treino.
+    # Cada ajuste concluído vai para um checkpoint; se o treino for interrompido, a próxima
+    # execução com os mesmos dados e o mesmo grid retoma a busca de onde parou.
+    max_segundos = args.max_minutos * 60 if args.max_minutos is not None else None
+    checkpoint = None if args.sem_checkpoint else os.path.join(
+        'data', 'checkpoints', f'busca_{args.busca}_{motor}_{codificacao}.jsonl')
+    if args.busca == 'sucessiva':
+        grid_search = BuscaSucessiva(
+            estimator=regr_trans,
+            param_grid=param_grid,
+            cv=5,
+            scoring='r2',
+            fator=args.fator,
+            max_ajustes=args.max_ajustes,
+            max_segundos=max_segundos,
+            n_jobs=-1,
+            verbose=1,
+            cache_folds=not args.sem_cache_folds,
+            oob=args.oob,
+            checkpoint=checkpoint,
+            nucleos=args.nucleos,
+            memoria_mb=args.memoria_mb
+        )
+    else:
+        grid_search = BuscaGrade(
+            estimator=regr_trans,
+            param_grid=param_grid,
+            cv=5,
+            scoring='r2',
+            max_ajustes=args.max_ajustes,
+            max_segundos=max_segundos,
+            n_jobs=-1,
+            verbose=1,
+            cache_folds=not args.sem_cache_folds,
+            oob=args.oob,
+            checkpoint=checkpoint,
+            nucleos=args.nucleos,
+            memoria_mb=args.memoria_mb
+        )
+
+    inicio_busca = time.perf_counter()
+    with etapa(f'busca:{motor}', categoria='modelo', linhas=len(X_train), busca=args.busca):
+        grid_search.fit(X_train, y_train)
+    tempo_busca = time.perf_counter() - inicio_busca
+
+    best_pipeline = grid_search.best_estimator_
+    relatorio_cod['tempo_treino_final_s'] = grid_search.refit_time_
+    print(f"[codificação] {codificacao}: treino do modelo final em {grid_search.refit_time_:.2f}s")
+
+    # 11. Avaliação do modelo otimizado no conjunto de teste
+    y_pred_test = best_pipeline.predict(X_test)
+    return {
+        'motor': motor,
+        'pipeline': best_pipeline,
+        'best_params': grid_search.best_params_,
+        'r2_cv': grid_search.best_score_,
+        'tempo_busca_s': tempo_busca,
+        'recursos': grid_search.plano_recursos_,
+        'codificacao': relatorio_cod,
+        'y_pred_test': y_pred_test,
+        'mse_teste': mean_squared_error(y_test, y_pred_test),
+        'r2_teste': r2_score(y_test, y_pred_test),
+    }
+
+def medir_motor(resultado, repeticoes=50):
+    """Latência de previsão (uma linha e o lote de teste inteiro) e tamanho do artefato salvo."""
+    pipeline = resultado['pipeline']
+    linha = X_test.iloc[[0]]
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        pipeline.predict(linha)
+        tempos.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    pipeline.predict(X_test)
+    tempo_lote = time.perf_counter() - inicio
+    artefato = io.BytesIO()
+    joblib.dump(pipeline, artefato)
+    return {
+        'motor': resultado['motor'],
+        'codificacao': resultado['codificacao']['codificacao'],
+        'tempo_busca_s': resultado['tempo_busca_s'],
+        'tempo_treino_final_s': resultado['codificacao']['tempo_treino_final_s'],
+        'latencia_uma_linha_ms': 1000 * float(np.median(tempos)),
+        'latencia_lote_ms': 1000 * tempo_lote,
+        'linhas_lote': len(X_test),
+        'tamanho_artefato_mb': artefato.getbuffer().nbytes / 1024 ** 2,
+        'r2_cv': resultado['r2_cv'],
+        'r2_teste': resultado['r2_teste'],
+        'mse_teste': resultado['mse_teste'],
+    }
+
+motores = list(MOTORES) if args.benchmark else [args.motor]
+
+# Combinações inválidas (ex.: HistGradientBoosting com one-hot esparso) são avisadas antes da
+# busca; no benchmark, o motor é pulado e os demais são comparados.
+for motor in list(motores):
+    try:
+        verificar_combinacao(motor, args.codificacao or MOTORES[motor]['codificacao'])
+    except ValueError as e:
+        if not args.benchmark:
+            print(f"Erro: {e}")
+            exit()
+        print(f"Aviso: o motor '{motor}' foi pulado no benchmark. {e}")
+        motores.remove(motor)
+if not motores:
+    print("Erro: nenhum motor aceita a codificação escolhida.")
+    exit()
 
 try:
-    grid_search.fit(X_train, y_train)
+    resultados = [treinar_motor(motor, args.codificacao or MOTORES[motor]['codificacao']) for motor in motores]
 except Exception as e:
-    print(f"Erro durante o GridSearchCV: {e}")
+    print(f"Erro durante a busca de hiperparâmetros: {e}")
     exit()
 
-best_pipeline = grid_search.best_estimator_
+# 10.1 Benchmark: compara os motores treinados no mesmo split. O vencedor é o de melhor R²
+# da validação cruzada (o conjunto de teste só é usado para reportar).
+if args.benchmark:
+    comparacao = [medir_motor(r) for r in resultados]
+    print("\n--- Benchmark dos Motores ---")
+    print(pd.DataFrame(comparacao).set_index('motor').round(4).to_string())
+    try:
+        with open("data/benchmark_motores.json", "w") as f:
+            json.dump(comparacao, f, indent=4)
+        print("Benchmark salvo em benchmark_motores.json")
+    except IOError:
+        print("Erro ao salvar o benchmark dos motores.")
 
-# 11. Avaliação do modelo otimizado no conjunto de teste
-y_pred_test = best_pipeline.predict(X_test)
-mse_test = mean_squared_error(y_test, y_pred_test)
-r2_test = r2_score(y_test, y_pred_test)
-best_params = grid_search.best_params_
+vencedor = max(resultados, key=lambda r: r['r2_cv'])
+best_pipeline = vencedor['pipeline']
+y_pred_test = vencedor['y_pred_test']
+mse_test = vencedor['mse_teste']
+r2_test = vencedor['r2_teste']
+best_params = vencedor['best_params']
 
 print(f"\n--- Resultados da Avaliação no Conjunto de Teste ---")
+print(f"Motor: {vencedor['motor']}")
 print(f"MSE (Teste): {mse_test:.2f}")
 print(f"R² (Teste): {r2_test:.2f}")
 print("Melhores parâmetros encontrados:", best_params)
 
-# 12. Salvar métricas e melhores parâmetros
+# 11.1 (Opcional) Compressão do modelo com orçamento de perda de R² (escolha em uma fatia do
+# treino; o conjunto de teste só entra nas métricas)
+modelo_comprimido, relatorio_compressao = None, None
+if args.comprimir:
+    print(f"\n--- Compressão do Modelo (perda máxima de R²: {args.perda_max_r2}) ---")
+    with etapa('compressao', categoria='modelo'):
+        modelo_comprimido, relatorio_compressao = comprimir_modelo(
+            best_pipeline, X_train, y_train, X_test, y_test, args.perda_max_r2, n_jobs=args.nucleos or -1)
+    if modelo_comprimido is None:
+        print("Nenhum modelo menor ficou dentro do orçamento; só o original será salvo.")
+    else:
+        escolhido = relatorio_compressao['escolhido']
+        print(f"Escolhido: {escolhido['estrategia']} ({relatorio_compressao['original']['tamanho_mb']:.2f} MB -> "
+              f"{escolhido['tamanho_mb']:.2f} MB, R² {escolhido['r2_teste']:.4f})")
+
+# 12. Os artefatos deste treino são gravados em uma pasta de preparação e publicados juntos
+# como uma nova versão em 'data/versoes/' ao final (ver 'versoes_modelo.py'); as cópias em
+# 'data/' são atualizadas a partir dela.
+pasta_versao = criar_pasta_versao()
+# Se o script parar antes da publicação (erro, exit() ou Ctrl+C), a pasta de preparação é
+# apagada ao sair; depois de publicada ela já foi renomeada e nada acontece.
+atexit.register(shutil.rmtree, pasta_versao, ignore_errors=True)
+
+# 12.1 Salvar métricas e melhores parâmetros
 metrics_output = {
     "mse_teste": mse_test,
     "r2_teste": r2_test,
-    "best_params": best_params
+    "best_params": best_params,
+    "motor": vencedor['motor'],
+    "codificacao": vencedor['codificacao']
 }
+if vencedor['recursos'] is not None:
+    metrics_output["recursos"] = vencedor['recursos']
+if relatorio_compressao is not None:
+    metrics_output["compressao"] = relatorio_compressao
 try:
-    with open("data/model_metrics.json", "w") as f:
+    with open(os.path.join(pasta_versao, "model_metrics.json"), "w") as f:
         json.dump(metrics_output, f, indent=4)
     print("\nMétricas do modelo salvas em model_metrics.json")
 except IOError:
@@ -135,11 +360,67 @@ except IOError:
 
 # 13. Exportar o pipeline completo
 try:
-    joblib.dump(best_pipeline, "data/modelo_vendas.pkl")
+    joblib.dump(best_pipeline, os.path.join(pasta_versao, "modelo_vendas.pkl"))
     print("Pipeline completo salvo como modelo_vendas.pkl")
 except Exception as e:
     print(f"Erro ao salvar o pipeline: {e}")
 
+# 13.0 Salvar o pipeline comprimido ao lado do original (sem ele, a cópia antiga em 'data/'
+# é removida na publicação, pois não vale mais)
+if modelo_comprimido is not None:
+    try:
+        joblib.dump(modelo_comprimido, os.path.join(pasta_versao, os.path.basename(COMPRIMIDO_PATH)))
+        print(f"Pipeline comprimido salvo como {os.path.basename(COMPRIMIDO_PATH)}")
+    except Exception as e:
+        print(f"Erro ao salvar o pipeline comprimido: {e}")
+
+# 13.1 Exportar o modelo compilado (só NumPy) para os processos de previsão
+# Os parâmetros do pré-processamento e os nós das árvores vão para arrays '.npy' em
+# 'data/modelo_compilado/'; a previsão compilada é conferida com a do pipeline no conjunto de teste.
+pasta_compilado = os.path.join(pasta_versao, os.path.basename(MODELO_COMPILADO_PATH))
+try:
+    with etapa('exportar_compilado', categoria='modelo'):
+        exportar_modelo_compilado(best_pipeline, pasta_compilado)
+    diferenca = np.max(np.abs(ModeloCompilado(pasta_compilado).predict(X_test) - y_pred_test))
+    if not diferenca <= 1e-6 * max(1.0, np.max(np.abs(y_pred_test))):
+        raise ValueError(f"a previsão compilada difere da do pipeline no teste (diferença máxima {diferenca:.2e})")
+    print(f"Modelo compilado salvo em {MODELO_COMPILADO_PATH} (diferença máxima no teste: {diferenca:.2e})")
+except Exception as e:
+    # Qualquer falha na exportação ou na conferência (modelo não suportado, arquivo, índice,
+    # diferença nas previsões) deixa a versão sem o modelo compilado: quem prevê usa o '.pkl'.
+    remover_modelo_compilado(pasta_compilado)
+    print(f"Aviso: o modelo compilado não foi gerado; a previsão usará modelo_vendas.pkl. "
+          f"Motivo: {type(e).__name__}: {e}")
+
+# 13.2 Exportar o perfil de serviço: valores padrão das features e vocabulários das categóricas
+# O dashboard e a pontuação em lote partem só dele, sem carregar o dataset de treino.
+try:
+    salvar_perfil_servico(criar_perfil_servico(df_raw), os.path.join(pasta_versao, os.path.basename(PERFIL_SERVICO_PATH)))
+    print(f"Perfil de serviço salvo em {PERFIL_SERVICO_PATH}")
+except Exception as e:
+    print(f"Erro ao salvar o perfil de serviço: {e}")
+
+# 13.2.1 Copiar o índice geográfico compacto para junto do perfil: com ele, quem prevê calcula
+# a distância entre cliente e vendedor pelos CEPs ou estados do pedido, como no treino
+try:
+    shutil.copy2(GEO_INDICE_PATH, os.path.join(pasta_versao, os.path.basename(INDICE_GEO_SERVICO_PATH)))
+    print(f"Índice geográfico copiado para {INDICE_GEO_SERVICO_PATH}")
+except FileNotFoundError:
+    print(f"Aviso: '{GEO_INDICE_PATH}' não foi encontrado (execute o 'preparar_dados.py'); "
+          "as previsões usarão a distância mediana.")
+
+# 13.3 Importância por permutação no conjunto de teste (por coluna original), calculada em
+# paralelo uma vez aqui para o dashboard não precisar recalcular
+try:
+    inicio_importancia = time.perf_counter()
+    with etapa('importancia_permutacao', categoria='modelo', linhas=len(X_test)):
+        importancia = calcular_importancia_permutacao(best_pipeline, X_test, y_test, n_jobs=args.nucleos or -1)
+    salvar_importancia(importancia, os.path.join(pasta_versao, os.path.basename(IMPORTANCIA_PATH)))
+    print(f"Importância por permutação salva em {IMPORTANCIA_PATH} "
+          f"({importancia['linhas']:,} linhas, {time.perf_counter() - inicio_importancia:.1f}s)")
+except Exception as e:
+    print(f"Erro ao calcular a importância por permutação: {e}")
+
 # 14. (Opcional) Salvar nomes das features após o pré-processamento para referência
 # Isso serve para interpretar as feature_importances no dashboard
 try:
@@ -147,11 +428,21 @@ try:
     preprocessor_step = best_pipeline.regressor_.named_steps['preprocessor']
     feature_names_out = preprocessor_step.get_feature_names_out()
 
-    joblib.dump(list(feature_names_out), "data/encoders.pkl")  # Salva como lista
+    joblib.dump(list(feature_names_out), os.path.join(pasta_versao, "encoders.pkl"))  # Salva como lista
     print("Nomes das features processadas salvos em encoders.pkl")
 except Exception as err:
     print(f"Erro ao salvar nomes das features processadas: {err}")
 
+# 15. Publicar a versão: a pasta vira 'data/versoes/<data-hora>/', o ponteiro 'ATUAL' passa a
+# apontar para ela (dashboard e serviço trocam de modelo sozinhos) e 'data/' recebe as cópias.
+# Sem o pipeline a versão não serve para nada; a atual continua valendo.
+if os.path.exists(os.path.join(pasta_versao, "modelo_vendas.pkl")):
+    versao = publicar_versao(pasta_versao)
+    print(f"Versão {versao} publicada em {VERSOES_PATH} (cópias atualizadas em data/)")
+else:
+    shutil.rmtree(pasta_versao, ignore_errors=True)
+    print("Erro: o pipeline não foi salvo; nenhuma versão nova foi publicada.")
+
 # Adicione no final de main.py, antes do "Script concluído."
 print("\nGerando gráfico de diagnóstico...")
 plt.figure(figsize=(10, 6))
@@ -0,0 +1,162 @@
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, HistGradientBoostingRegressor
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, TargetEncoder
+
+from instrumentacao import etapa
+
+# --- Estratégias de Codificação ---
+# 'onehot_denso' é o pré-processamento original (StandardScaler + one-hot denso). As demais
+# passam as numéricas direto para o modelo, já que árvores não precisam de escala:
+#   'onehot_esparso': one-hot em matriz esparsa CSR, sem materializar as colunas de zeros;
+#   'ordinal': um código inteiro por categoria (uma coluna por variável categórica);
+#   'alvo': target encoding (média do alvo por categoria, com validação cruzada interna).
+# Todas aceitam o mesmo DataFrame na previsão, então o pipeline salvo continua compatível
+# com o 'predict' do dashboard.
+CODIFICACOES = ('onehot_denso', 'onehot_esparso', 'ordinal', 'alvo')
+
+
+def criar_preprocessador(codificacao, numeric_features, categorical_features):
+    """Cria o ColumnTransformer da estratégia de codificação escolhida."""
+    if codificacao == 'onehot_denso':
+        return ColumnTransformer(
+            transformers=[
+                ('num', StandardScaler(), numeric_features),
+                ('cat', OneHotEncoder(handle_unknown='ignore', drop='first', sparse_output=False), categorical_features)
+            ],
+            remainder='drop' #descarta as colunas desnecessárias
+        )
+    if codificacao == 'onehot_esparso':
+        categoricas = OneHotEncoder(handle_unknown='ignore', drop='first', sparse_output=True)
+    elif codificacao == 'ordinal':
+        categoricas = OrdinalEncoder(
+            handle_unknown='use_encoded_value', unknown_value=-1, encoded_missing_value=-1
+        )
+    elif codificacao == 'alvo':
+        categoricas = TargetEncoder(target_type='continuous', random_state=42)
+    else:
+        raise ValueError(f"Codificação desconhecida: '{codificacao}'. Opções: {CODIFICACOES}")
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', 'passthrough', numeric_features),
+            ('cat', categoricas, categorical_features)
+        ],
+        remainder='drop',
+        sparse_threshold=1.0 if codificacao == 'onehot_esparso' else 0.0
+    )
+
+
+def memoria_matriz_mb(matriz):
+    """Memória ocupada pela matriz de features (densa ou esparsa), em MB."""
+    if sparse.issparse(matriz):
+        matriz = matriz.tocsr()
+        return (matriz.data.nbytes + matriz.indices.nbytes + matriz.indptr.nbytes) / 1024 ** 2
+    return np.asarray(matriz).nbytes / 1024 ** 2
+
+
+def relatorio_codificacao(codificacao, preprocessador, X, y):
+    """
+    Ajusta uma cópia do pré-processador em (X, y) e mostra o formato, a memória da matriz de
+    treino e o tempo de ajuste. 'y' deve estar na escala em que o modelo é treinado (log1p).
+    """
+    inicio = time.perf_counter()
+    with etapa(f'codificador:{codificacao}', categoria='modelo', linhas=len(X)):
+        matriz = clone(preprocessador).fit_transform(X, y)
+    tempo = time.perf_counter() - inicio
+    relatorio = {
+        'codificacao': codificacao,
+        'linhas': int(matriz.shape[0]),
+        'colunas': int(matriz.shape[1]),
+        'esparsa': bool(sparse.issparse(matriz)),
+        'memoria_matriz_mb': memoria_matriz_mb(matriz),
+        'tempo_preprocessamento_s': tempo,
+    }
+    print(f"[codificação] {codificacao}: matriz {relatorio['linhas']}x{relatorio['colunas']}"
+          f"{' (esparsa)' if relatorio['esparsa'] else ''}, {relatorio['memoria_matriz_mb']:.1f} MB, "
+          f"pré-processamento em {tempo:.2f}s")
+    return relatorio
+
+
+# --- Registro de Motores ---
+# Cada motor declara como criar o modelo, a codificação usada por padrão e o seu próprio
+# espaço de busca (parâmetros do passo 'model', prefixados para o TransformedTargetRegressor).
+# 'criar' recebe os índices das colunas categóricas na saída do pré-processador quando elas
+# chegam como códigos ordinais, para motores com suporte nativo a categóricas.
+# 'aceita_esparsa' diz se o modelo treina com a matriz CSR do 'onehot_esparso'.
+
+def _criar_random_forest(indices_categoricas):
+    return RandomForestRegressor(random_state=42)
+
+
+def _criar_extra_trees(indices_categoricas):
+    return ExtraTreesRegressor(random_state=42)
+
+
+def _criar_hist_gradient_boosting(indices_categoricas):
+    # Códigos negativos (categoria desconhecida ou faltante) são tratados como valores faltantes.
+    return HistGradientBoostingRegressor(categorical_features=indices_categoricas, random_state=42)
+
+
+MOTORES = {
+    'random_forest': {
+        'criar': _criar_random_forest,
+        'codificacao': 'onehot_denso',
+        'aceita_esparsa': True,
+        'param_grid': {
+            'regressor__model__n_estimators': [100, 200],
+            'regressor__model__max_depth': [10, 20, 30],
+            'regressor__model__min_samples_leaf': [1, 2, 4],
+            'regressor__model__min_samples_split': [2, 5, 10],
+            'regressor__model__max_features': ['sqrt', 'log2']
+        },
+    },
+    'hist_gradient_boosting': {
+        'criar': _criar_hist_gradient_boosting,
+        'codificacao': 'ordinal',
+        'aceita_esparsa': False,
+        'param_grid': {
+            'regressor__model__learning_rate': [0.05, 0.1],
+            'regressor__model__max_iter': [200, 400],
+            'regressor__model__max_leaf_nodes': [15, 31, 63],
+            'regressor__model__min_samples_leaf': [20, 50],
+            'regressor__model__l2_regularization': [0.0, 1.0]
+        },
+    },
+    'extra_trees': {
+        'criar': _criar_extra_trees,
+        # Como a random_forest: sem suporte nativo a categóricas, os códigos ordinais seriam
+        # tratados como números ordenados, então o padrão é o one-hot.
+        'codificacao': 'onehot_denso',
+        'aceita_esparsa': True,
+        'param_grid': {
+            'regressor__model__n_estimators': [100, 200],
+            'regressor__model__max_depth': [10, 20, None],
+            'regressor__model__min_samples_leaf': [1, 2, 4],
+            'regressor__model__max_features': ['sqrt', 1.0]
+        },
+    },
+}
+
+
+def verificar_combinacao(motor, codificacao):
+    """Lança ValueError se o motor não existe ou não treina com a codificação escolhida."""
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconhecido: '{motor}'. Opções: {list(MOTORES)}")
+    if codificacao == 'onehot_esparso' and not MOTORES[motor]['aceita_esparsa']:
+        raise ValueError(f"O motor '{motor}' não aceita a matriz esparsa da codificação 'onehot_esparso'. "
+                         f"Use 'onehot_denso', 'ordinal' ou 'alvo'.")
+
+
+def criar_modelo(motor, codificacao, numeric_features, categorical_features):
+    """Cria o modelo do motor; com codificação ordinal, informa onde estão as colunas categóricas."""
+    verificar_combinacao(motor, codificacao)
+    indices = None
+    if codificacao == 'ordinal':
+        # O ColumnTransformer coloca as numéricas primeiro e as categóricas em seguida.
+        indices = list(range(len(numeric_features), len(numeric_features) + len(categorical_features)))
+    return MOTORES[motor]['criar'](indices)
@@ -0,0 +1,143 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from servico_previsao import carregar_modelo, carregar_perfil_servico, carregar_indice_servico, prever, COLUNA_PREVISAO
+from versoes_modelo import pasta_versao_atual
+
+# --- Pontuação em Lote ---
+# Lê um arquivo de pedidos (CSV ou Parquet) em lotes de tamanho fixo, preenche as features
+# ausentes como o dashboard faz ('servico_previsao.py', com a distância entre cliente e vendedor
+# calculada pelos CEPs ou estados do arquivo) e prevê cada lote em um pool de
+# processos. Cada processo carrega o modelo uma vez (o compilado, só NumPy, quando existe).
+# Os lotes são gravados na ordem de entrada assim que ficam prontos, com no máximo
+# 2 lotes por processo em andamento, então a memória não depende do tamanho do arquivo.
+
+LINHAS_POR_LOTE = 50_000
+
+_modelo = None
+_padroes = None
+_indice_geo = None
+
+
+def _iniciar_processo(pasta_modelo, padroes):
+    global _modelo, _padroes, _indice_geo
+    _modelo = carregar_modelo(os.path.join(pasta_modelo, 'modelo_compilado'),
+                              os.path.join(pasta_modelo, 'modelo_vendas.pkl'))
+    _padroes = padroes
+    _indice_geo = carregar_indice_servico(os.path.join(pasta_modelo, 'geo_indice.npz'))
+
+
+def _prever_lote(lote):
+    return prever(_modelo, lote, _padroes, _indice_geo)
+
+
+def ler_em_lotes(caminho, linhas_por_lote):
+    """Lotes de um CSV ou Parquet (pela extensão), sem carregar o arquivo inteiro."""
+    if caminho.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Ler Parquet requer o pyarrow (pip install pyarrow).")
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=linhas_por_lote):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, chunksize=linhas_por_lote)
+
+
+class EscritorEmLotes:
+    """Grava lotes em um CSV ou Parquet (pela extensão), em arquivo temporário trocado no final."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.temporario = caminho + '.tmp'
+        self.parquet = caminho.endswith('.parquet')
+        self._escritor = None
+        self._primeiro = True
+
+    def gravar(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.temporario, tabela.schema)
+            self._escritor.write_table(tabela.cast(self._escritor.schema))
+        else:
+            df.to_csv(self.temporario, index=False, mode='w' if self._primeiro else 'a', header=self._primeiro)
+        self._primeiro = False
+
+    def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+        if self._primeiro:
+            pd.DataFrame(columns=[COLUNA_PREVISAO]).to_csv(self.temporario, index=False)
+        os.replace(self.temporario, self.caminho)
+
+
+def pontuar_arquivo(entrada, saida, padroes, linhas_por_lote=LINHAS_POR_LOTE, processos=None, verbose=True,
+                    pasta_modelo=None):
+    """
+    Pontua 'entrada' e grava em 'saida' as colunas originais mais 'valor_venda_previsto'.
+    Todos os processos usam o modelo de 'pasta_modelo' (padrão: a versão atual).
+    Devolve um resumo com linhas, segundos e linhas por segundo.
+    """
+    processos = processos or os.cpu_count() or 1
+    pasta_modelo = pasta_modelo or pasta_versao_atual()
+    escritor = EscritorEmLotes(saida)
+    inicio = time.perf_counter()
+    linhas = 0
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(pasta_modelo, padroes)) as pool:
+        pendentes = deque()
+
+        def gravar_proximo():
+            nonlocal linhas
+            lote, futuro = pendentes.popleft()
+            lote[COLUNA_PREVISAO] = futuro.result()
+            escritor.gravar(lote)
+            linhas += len(lote)
+            if verbose:
+                decorrido = time.perf_counter() - inicio
+                print(f"  {linhas:,} linhas pontuadas ({linhas / decorrido:,.0f} linhas/s)")
+
+        for lote in ler_em_lotes(entrada, linhas_por_lote):
+            pendentes.append((lote, pool.submit(_prever_lote, lote)))
+            if len(pendentes) >= 2 * processos:
+                gravar_proximo()
+        while pendentes:
+            gravar_proximo()
+    escritor.fechar()
+    segundos = time.perf_counter() - inicio
+    return {'linhas': linhas, 'segundos': segundos, 'linhas_por_s': linhas / segundos if segundos > 0 else None}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pontua um arquivo de pedidos (CSV ou Parquet) com o modelo treinado.")
+    parser.add_argument('entrada', help="Arquivo de pedidos (.csv ou .parquet) com as colunas conhecidas de cada pedido.")
+    parser.add_argument('saida', help="Arquivo de saída (.csv ou .parquet): as colunas de entrada mais 'valor_venda_previsto'.")
+    parser.add_argument('--linhas-por-lote', type=int, default=LINHAS_POR_LOTE, help="Linhas previstas por vez em cada processo.")
+    parser.add_argument('--processos', type=int, default=None, help="Processos de previsão (padrão: um por núcleo).")
+    args = parser.parse_args()
+
+    # Os valores padrão das features ausentes vêm do perfil de serviço, como no dashboard. A pasta
+    # da versão é lida uma vez, então uma versão publicada no meio não mistura dois modelos.
+    pasta_modelo = pasta_versao_atual()
+    perfil_path = os.path.join(pasta_modelo, 'perfil_servico.json')
+    try:
+        padroes = carregar_perfil_servico(perfil_path)['padroes']
+    except FileNotFoundError:
+        print(f"Erro: o perfil de serviço '{perfil_path}' não foi encontrado. Execute o 'main.py' primeiro.")
+        exit()
+    if not os.path.exists(args.entrada):
+        print(f"Erro: o arquivo de entrada '{args.entrada}' não foi encontrado.")
+        exit()
+
+    print(f"Pontuando '{args.entrada}' em lotes de {args.linhas_por_lote:,} linhas...")
+    resumo = pontuar_arquivo(args.entrada, args.saida, padroes, args.linhas_por_lote, args.processos,
+                             pasta_modelo=pasta_modelo)
+    print(f"{resumo['linhas']:,} linhas pontuadas em {resumo['segundos']:.1f}s "
+          f"({resumo['linhas_por_s'] or 0:,.0f} linhas/s). Resultado salvo em '{args.saida}'.")
@@ -1,5 +1,39 @@
-import pandas as pd
+import argparse
 import os
+from fontes_dados import carregar_tabela
+from geo_indice import atualizar_indice_geo, GEO_INDICE_PATH
+from tipos_compactos import compactar_tipos, memoria_mb, relatorio_memoria, salvar_csv_com_tipos, remover_tipos
+from combinacao_dados import (
+    combinar_tabelas, combinar_em_lotes, preparar_dimensoes, reconstruir_incremental, remover_particoes,
+    DATASET_COMPLETO_CSV, DATASET_COMPLETO_PARTICOES, FORMATO_DATA
+)
+
+parser = argparse.ArgumentParser(description="Combina as 9 tabelas da Olist em um único dataset.")
+modo = parser.add_mutually_exclusive_group()
+modo.add_argument(
+    '--incremental', action='store_true',
+    help="Grava o dataset particionado por mês da compra e recombina apenas as partições "
+         "cujos pedidos mudaram em alguma tabela de origem."
+)
+modo.add_argument(
+    '--em-lotes', action='store_true',
+    help="Combina 'order_items' em lotes contra tabelas de consulta, com memória limitada "
+         "por --memoria-max-mb. O CSV gerado é idêntico ao do modo completo."
+)
+parser.add_argument(
+    '--memoria-max-mb', type=int, default=1024,
+    help="Teto de memória (em MB) usado para dimensionar os lotes no modo --em-lotes."
+)
+parser.add_argument(
+    '--compacto', action='store_true',
+    help="Reduz os tipos do dataset final (float32, inteiros estreitos, 'category') e grava "
+         "os tipos ao lado do CSV para as etapas seguintes."
+)
+args = parser.parse_args()
+
+if args.compacto and (args.incremental or args.em_lotes):
+    print("Aviso: --compacto só se aplica ao modo completo; nos outros modos, use "
+          "'engenharia_features.py --compacto' para compactar o dataset ao carregá-lo.")
 
 # --- Passo 0: Definir o caminho e carregar todos os arquivos ---
 
@@ -8,75 +42,97 @@ data_path = 'database'
 
 print("Iniciando o carregamento dos arquivos...")
 
+# As tabelas são lidas com o esquema de 'fontes_dados.py' (datas, categorias e inteiros
+# estreitos já na leitura) e, a partir da segunda execução, da cópia em Parquet em
+# 'data_processed/cache', que só é refeita quando o CSV de origem muda.
+# A geolocalização não entra na cadeia de merges; ela só alimenta o índice geográfico (Passo 0.1).
+# No modo em lotes, 'order_items' não é carregada inteira: ela é lida lote a lote no Passo 2.
 try:
-    customers = pd.read_csv(os.path.join(data_path, 'olist_customers_dataset.csv'))
-    geolocation = pd.read_csv(os.path.join(data_path, 'olist_geolocation_dataset.csv'))
-    order_items = pd.read_csv(os.path.join(data_path, 'olist_order_items_dataset.csv'))
-    payments = pd.read_csv(os.path.join(data_path, 'olist_order_payments_dataset.csv'))
-    reviews = pd.read_csv(os.path.join(data_path, 'olist_order_reviews_dataset.csv'))
-    orders = pd.read_csv(os.path.join(data_path, 'olist_orders_dataset.csv'))
-    products = pd.read_csv(os.path.join(data_path, 'olist_products_dataset.csv'))
-    sellers = pd.read_csv(os.path.join(data_path, 'olist_sellers_dataset.csv'))
-    translation = pd.read_csv(os.path.join(data_path, 'product_category_name_translation.csv'))
+    customers = carregar_tabela('customers', data_path=data_path)
+    order_items = None if args.em_lotes else carregar_tabela('order_items', data_path=data_path)
+    payments = carregar_tabela('payments', data_path=data_path)
+    reviews = carregar_tabela('reviews', data_path=data_path)
+    orders = carregar_tabela('orders', data_path=data_path)
+    products = carregar_tabela('products', data_path=data_path)
+    sellers = carregar_tabela('sellers', data_path=data_path)
+    translation = carregar_tabela('translation', data_path=data_path)
     print("Todos os arquivos foram carregados com sucesso!")
 except FileNotFoundError as e:
     print(f"Erro: Arquivo não encontrado. Verifique se a pasta '{data_path}' existe e contém todos os CSVs. Detalhes: {e}")
     exit()
 
 
-# --- Passo 1: A Cadeia Principal de Merges ---
+# --- Passo 0.1: Índice Geográfico por Prefixo de CEP ---
+# As ~1M linhas de geolocalização viram um centróide por prefixo de CEP (e por estado),
+# gravados em arrays compactos. O índice só é refeito quando o CSV de origem muda, e é
+# usado por 'engenharia_features.py' para calcular a distância entre cliente e vendedor.
 
-# Começamos com a tabela 'order_items', que contém os itens de cada pedido.
-# Usaremos 'left' merge para garantir que manteremos todos os itens da tabela original.
-
-print("\nIniciando a combinação das tabelas (merge)...")
-
-# 1.1 Adicionar informações dos Pedidos (orders) aos Itens
-# Chave: order_id
-data = pd.merge(order_items, orders, on='order_id', how='left')
-
-# 1.2 Adicionar informações dos Produtos (products)
-# Chave: product_id
-data = pd.merge(data, products, on='product_id', how='left')
-
-# 1.3 Adicionar informações dos Vendedores (sellers)
-# Chave: seller_id
-data = pd.merge(data, sellers, on='seller_id', how='left')
+try:
+    if atualizar_indice_geo(data_path=data_path):
+        print(f"Índice geográfico gerado em: {GEO_INDICE_PATH}")
+except FileNotFoundError as e:
+    print(f"Erro: Arquivo de geolocalização não encontrado. Detalhes: {e}")
+    exit()
 
-# 1.4 Adicionar informações dos Clientes (customers)
-# Chave: customer_id
-data = pd.merge(data, customers, on='customer_id', how='left')
 
-# 1.5 Adicionar informações das Avaliações (reviews)
-# Um pedido pode ter múltiplas avaliações, então vamos pegar apenas a mais recente por pedido
-reviews = reviews.sort_values('review_answer_timestamp').drop_duplicates('order_id', keep='last')
-data = pd.merge(data, reviews, on='order_id', how='left')
+# --- Passo 1: Modo Incremental ---
+# Em vez de refazer toda a cadeia de merges, compara a impressão digital de cada pedido
+# com a da última execução e reescreve só as partições mensais afetadas.
+
+if args.incremental:
+    print("\nModo incremental: verificando pedidos novos ou alterados...")
+    tabelas = {
+        'order_items': order_items, 'orders': orders, 'products': products, 'sellers': sellers,
+        'customers': customers, 'reviews': reviews, 'payments': payments, 'translation': translation
+    }
+    reescritas = reconstruir_incremental(tabelas, DATASET_COMPLETO_PARTICOES)
+    # O CSV único ficaria desatualizado; as etapas seguintes passam a ler as partições.
+    if os.path.exists(DATASET_COMPLETO_CSV):
+        os.remove(DATASET_COMPLETO_CSV)
+    remover_tipos(DATASET_COMPLETO_CSV)
+    print(f"{len(reescritas)} partição(ões) mensal(is) reescrita(s): {reescritas}")
+    print(f"\nDataset particionado atualizado em: {DATASET_COMPLETO_PARTICOES}")
+    exit()
 
 
-# --- Passo 2: Lidando com Tabelas Especiais (Pagamentos e Tradução) ---
+# --- Passo 2: Modo em Lotes ---
+# Produtos, vendedores, clientes, pedidos, tradução, avaliações deduplicadas e pagamentos
+# agregados viram tabelas de consulta indexadas; 'order_items' é combinada e gravada em lotes,
+# sem materializar os DataFrames intermediários de cada merge.
+
+if args.em_lotes:
+    print(f"\nModo em lotes: combinando com teto de {args.memoria_max_mb} MB...")
+    dimensoes = preparar_dimensoes(orders, products, sellers, customers, reviews, payments, translation)
+    os.makedirs(os.path.dirname(DATASET_COMPLETO_CSV), exist_ok=True)
+    linhas, colunas, linhas_por_lote = combinar_em_lotes(
+        dimensoes, DATASET_COMPLETO_CSV, memoria_max_mb=args.memoria_max_mb, data_path=data_path
+    )
+    remover_tipos(DATASET_COMPLETO_CSV)
+    remover_particoes(DATASET_COMPLETO_PARTICOES)
+    print(f"O DataFrame final tem {linhas} linhas e {len(colunas)} colunas (lotes de {linhas_por_lote} linhas).")
+    print(f"\nDataFrame completo salvo com sucesso em: {DATASET_COMPLETO_CSV}")
+    exit()
 
-# 2.1 Processar e adicionar informações de Pagamentos (payments)
-# Um pedido pode ter múltiplos pagamentos (ex: boleto + voucher).
-# Vamos agregar os dados de pagamento por pedido antes de fazer o merge.
-payments_agg = payments.groupby('order_id').agg({
-    'payment_sequential': 'max',
-    'payment_type': 'first', # Pega o primeiro tipo de pagamento
-    'payment_installments': 'max',
-    'payment_value': 'sum'
-}).reset_index()
 
-# Agora fazemos o merge com os dados de pagamento agregados
-data = pd.merge(data, payments_agg, on='order_id', how='left')
+# --- Passo 3: A Cadeia Principal de Merges ---
+# Começamos com a tabela 'order_items', que contém os itens de cada pedido, e adicionamos
+# pedidos, produtos, vendedores, clientes, avaliações (a mais recente por pedido),
+# pagamentos (agregados por pedido) e a tradução das categorias.
+# A cadeia completa está em 'combinacao_dados.combinar_tabelas'.
 
+print("\nIniciando a combinação das tabelas (merge)...")
 
-# 2.2 Adicionar a Tradução das Categorias de Produtos
-# Chave: product_category_name
-data = pd.merge(data, translation, on='product_category_name', how='left')
+data = combinar_tabelas(order_items, orders, products, sellers, customers, reviews, payments, translation)
 
 
-# --- Passo 3: Inspeção e Salvamento do Dataset Final ---
+# --- Passo 4: Inspeção e Salvamento do Dataset Final ---
 
 print("\nMerge concluído!")
+
+if args.compacto:
+    mb_antes = memoria_mb(data)
+    data = compactar_tipos(data)
+    relatorio_memoria("preparar_dados (dataset completo)", mb_antes, data)
 print(f"O DataFrame final tem {data.shape[0]} linhas e {data.shape[1]} colunas.")
 
 print("\nExemplo de colunas no DataFrame final:")
@@ -86,11 +142,16 @@ print("\nAmostra dos dados finais:")
 print(data.head())
 
 # Salvar o DataFrame completo em um único arquivo CSV para uso futuro
-output_path = 'data_processed'
+output_path = os.path.dirname(DATASET_COMPLETO_CSV)
 if not os.path.exists(output_path):
     os.makedirs(output_path)
 
-final_csv_path = os.path.join(output_path, 'olist_dataset_completo.csv')
-data.to_csv(final_csv_path, index=False)
+final_csv_path = DATASET_COMPLETO_CSV
+# O formato de data fixo mantém o texto do CSV igual ao das fontes, mesmo em colunas
+# cujas datas caem todas à meia-noite (ex: 'review_creation_date').
+# No modo compacto, os tipos são gravados ao lado do CSV ('olist_dataset_completo.tipos.json').
+salvar_csv_com_tipos(data, final_csv_path, args.compacto, date_format=FORMATO_DATA)
+# Partições de um modo incremental anterior ficariam desatualizadas.
+remover_particoes(DATASET_COMPLETO_PARTICOES)
 
 print(f"\nDataFrame completo salvo com sucesso em: {final_csv_path}")
\ No newline at end of file
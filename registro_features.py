@@ -0,0 +1,195 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from geo_indice import carregar_indice_geo, distancia_cliente_vendedor, GEO_INDICE_PATH
+from instrumentacao import etapa
+
+# --- Registro de Features ---
+# Cada feature declara as colunas de entrada (do dataset ou de outras features), o dtype
+# do resultado, uma versão do código e uma implementação vetorizada que recebe um
+# dicionário {coluna: Series} e devolve uma Series/array alinhada ao DataFrame.
+# A versão deve ser incrementada sempre que a implementação mudar; ela faz parte da
+# chave da feature na loja de features ('loja_features.py').
+
+FEATURES = {}
+
+# Colunas convertidas para datetime uma única vez, quando alguma feature as usa.
+COLUNAS_DATA = {
+    'order_purchase_timestamp', 'order_approved_at', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date', 'shipping_limit_date',
+}
+
+# Features criadas por 'engenharia_features.py' para o dataset de modelagem.
+FEATURES_ENGENHARIA = [
+    'tempo_entrega_dias', 'tempo_estimado_dias', 'atraso_na_entrega_dias',
+    'compra_dia_da_semana', 'compra_mes', 'percentual_frete', 'distancia_cliente_vendedor_km',
+]
+
+
+def registrar_feature(nome, entradas, dtype, versao=1, recursos_externos=None):
+    """
+    Decorador que registra uma feature no catálogo 'FEATURES'.
+    'recursos_externos' é uma função opcional que devolve uma assinatura (texto) dos
+    arquivos além das colunas de entrada dos quais a feature depende.
+    """
+    def decorador(funcao):
+        if nome in FEATURES:
+            raise ValueError(f"A feature '{nome}' já está registrada.")
+        FEATURES[nome] = {
+            'entradas': list(entradas), 'dtype': dtype, 'versao': versao,
+            'funcao': funcao, 'recursos_externos': recursos_externos,
+        }
+        return funcao
+    return decorador
+
+
+# 2.2 Features a partir de Datas
+
+@registrar_feature('tempo_entrega_dias', ['order_delivered_customer_date', 'order_purchase_timestamp'], 'int16')
+def _tempo_entrega_dias(c):
+    return (c['order_delivered_customer_date'] - c['order_purchase_timestamp']).dt.days
+
+
+@registrar_feature('tempo_estimado_dias', ['order_estimated_delivery_date', 'order_purchase_timestamp'], 'int16')
+def _tempo_estimado_dias(c):
+    return (c['order_estimated_delivery_date'] - c['order_purchase_timestamp']).dt.days
+
+
+@registrar_feature('atraso_na_entrega_dias', ['tempo_entrega_dias', 'tempo_estimado_dias'], 'int16')
+def _atraso_na_entrega_dias(c):
+    # Se não houve atraso, o valor é 0. Como no 'max(0, x)' original, atraso desconhecido (NaN) também vira 0.
+    atraso = c['tempo_entrega_dias'] - c['tempo_estimado_dias']
+    return atraso.where(atraso > 0, 0)
+
+
+@registrar_feature('compra_dia_da_semana', ['order_purchase_timestamp'], 'int8')
+def _compra_dia_da_semana(c):
+    return c['order_purchase_timestamp'].dt.dayofweek # Segunda=0, Domingo=6
+
+
+@registrar_feature('compra_mes', ['order_purchase_timestamp'], 'int8')
+def _compra_mes(c):
+    return c['order_purchase_timestamp'].dt.month
+
+
+# 2.4 Features a partir de Informações de Frete e Vendedor
+
+@registrar_feature('percentual_frete', ['freight_value', 'valor_venda_total'], 'float64')
+def _percentual_frete(c):
+    return c['freight_value'] / c['valor_venda_total']
+
+
+@registrar_feature('percentual_frete_estimado', ['price', 'freight_value'], 'float64')
+def _percentual_frete_estimado(c):
+    # Na previsão o valor total da venda é justamente o que se quer prever, então o
+    # percentual do frete é estimado sobre preço + frete (0 quando não há preço).
+    price = c['price'].astype('float64')
+    freight = c['freight_value'].astype('float64')
+    return (freight / (price + freight)).where(price > 0, 0.0)
+
+
+# 2.5 Distância entre Cliente e Vendedor
+
+@functools.lru_cache(maxsize=1)
+def _indice_geo():
+    return carregar_indice_geo()
+
+
+def _assinatura_indice_geo():
+    stat = os.stat(GEO_INDICE_PATH)
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+
+@registrar_feature(
+    'distancia_cliente_vendedor_km',
+    ['customer_zip_code_prefix', 'customer_state', 'seller_zip_code_prefix', 'seller_state'],
+    'float64',
+    recursos_externos=_assinatura_indice_geo
+)
+def _distancia_cliente_vendedor_km(c):
+    return distancia_cliente_vendedor(c, _indice_geo())
+
+
+# --- Motor de Cálculo ---
+
+@functools.lru_cache(maxsize=None)
+def compilar_features(nomes):
+    """
+    Resolve as dependências de um conjunto de features (tupla de nomes) e devolve o plano:
+    a ordem de cálculo e as colunas brutas que precisam ser lidas. O plano fica em cache.
+    """
+    ordem = []
+    brutas = []
+    visitando = set()
+
+    def visitar(nome):
+        if nome in ordem:
+            return
+        if nome in visitando:
+            raise ValueError(f"Dependência circular envolvendo a feature '{nome}'.")
+        visitando.add(nome)
+        for entrada in FEATURES[nome]['entradas']:
+            if entrada in FEATURES:
+                visitar(entrada)
+            elif entrada not in brutas:
+                brutas.append(entrada)
+        visitando.discard(nome)
+        ordem.append(nome)
+
+    for nome in nomes:
+        if nome not in FEATURES:
+            raise KeyError(f"Feature desconhecida: '{nome}'. Registradas: {sorted(FEATURES)}")
+        visitar(nome)
+    return {'nomes': tuple(nomes), 'ordem': tuple(ordem), 'entradas': tuple(brutas)}
+
+
+def _converter(valores, dtype, indice):
+    """
+    Aplica o dtype declarado. Uma feature inteira cujo cálculo produziu floats (por
+    datas faltantes nas entradas, por exemplo) fica em float64, como faria o pandas.
+    """
+    serie = pd.Series(valores, index=indice)
+    if np.issubdtype(np.dtype(dtype), np.integer) and (
+        pd.api.types.is_float_dtype(serie.dtype) or serie.isna().any()
+    ):
+        return serie.astype('float64')
+    return serie.astype(dtype)
+
+
+def preparar_entrada(df, col):
+    """Lê uma coluna de entrada de 'df', convertendo datas para datetime quando preciso."""
+    serie = df[col]
+    if col in COLUNAS_DATA and not pd.api.types.is_datetime64_any_dtype(serie):
+        serie = pd.to_datetime(serie, errors='coerce')
+    return serie
+
+
+def aplicar_feature(nome, colunas, indice):
+    """Calcula uma feature a partir do dicionário de colunas já disponíveis."""
+    feature = FEATURES[nome]
+    return _converter(feature['funcao'](colunas), feature['dtype'], indice)
+
+
+def verificar_entradas(df, plano):
+    faltando = [c for c in plano['entradas'] if c not in df.columns]
+    if faltando:
+        raise KeyError(f"Colunas de entrada ausentes para as features {list(plano['nomes'])}: {faltando}")
+
+
+def calcular_features(df, nomes):
+    """
+    Calcula apenas as features pedidas (e suas dependências) em uma única passada sobre
+    as colunas necessárias de 'df'. Retorna um DataFrame com uma coluna por feature pedida.
+    """
+    plano = compilar_features(tuple(nomes))
+    verificar_entradas(df, plano)
+
+    colunas = {col: preparar_entrada(df, col) for col in plano['entradas']}
+    for nome in plano['ordem']:
+        with etapa(f'feature:{nome}', categoria='features', linhas=len(df)):
+            colunas[nome] = aplicar_feature(nome, colunas, df.index)
+
+    return pd.DataFrame({nome: colunas[nome] for nome in plano['nomes']}, index=df.index)
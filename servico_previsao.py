@@ -0,0 +1,190 @@
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from geo_indice import carregar_indice_geo, distancia_cliente_vendedor
+from inferencia_numpy import ModeloCompilado, MODELO_COMPILADO_PATH
+from registro_features import calcular_features
+
+# --- Montagem da Entrada de Previsão ---
+# O modelo recebe as 23 colunas abaixo, mas quem pede uma previsão (o formulário do dashboard,
+# um arquivo de pedidos) informa só algumas. As que faltam são preenchidas com um valor padrão
+# por coluna: a moda nas categóricas e a mediana nas numéricas do dataset de treino. O
+# 'percentual_frete' é sempre recalculado pelo registro de features (versão estimada sobre
+# preço + frete), de forma vetorizada. A 'distancia_cliente_vendedor_km' é calculada como no
+# treino ('geo_indice.py'), pelos prefixos de CEP de cliente e vendedor ou, sem eles, pelos
+# estados; só as linhas sem nenhuma informação de localização ficam com a mediana. Dashboard,
+# pontuação em lote e serviço usam as mesmas funções, então uma mesma linha dá a mesma
+# previsão em todos eles.
+#
+# Os padrões e os vocabulários das categóricas vão para o perfil de serviço, um JSON pequeno
+# gravado pelo 'main.py' ao lado do modelo, junto com uma cópia do índice geográfico compacto
+# (um centróide por prefixo de CEP e por estado). Quem prevê parte só deles, sem ler o dataset
+# de treino, então a subida e a memória não crescem com os dados.
+
+FEATURES_MODELO = [
+    'price', 'freight_value', 'product_name_lenght', 'product_description_lenght',
+    'product_photos_qty', 'product_weight_g', 'product_length_cm', 'product_height_cm',
+    'product_width_cm', 'review_score', 'payment_sequential', 'payment_installments',
+    'tempo_entrega_dias', 'tempo_estimado_dias', 'atraso_na_entrega_dias',
+    'compra_dia_da_semana', 'compra_mes', 'percentual_frete', 'distancia_cliente_vendedor_km',
+    'seller_state', 'customer_state', 'payment_type', 'product_category_name_english'
+]
+
+COLUNA_PREVISAO = 'valor_venda_previsto'
+PIPELINE_PATH = os.path.join('data', 'modelo_vendas.pkl')
+PERFIL_SERVICO_PATH = os.path.join('data', 'perfil_servico.json')
+INDICE_GEO_SERVICO_PATH = os.path.join('data', 'geo_indice.npz')
+# Entradas de onde a distância entre cliente e vendedor é calculada.
+COLUNAS_LOCALIZACAO = ['customer_zip_code_prefix', 'customer_state', 'seller_zip_code_prefix', 'seller_state']
+VERSAO_PERFIL = 1
+
+
+def carregar_modelo(pasta_compilado=MODELO_COMPILADO_PATH, pipeline_path=PIPELINE_PATH):
+    """Modelo compilado quando existe; senão, o pipeline do scikit-learn."""
+    try:
+        return ModeloCompilado(pasta_compilado)
+    except (FileNotFoundError, ValueError):
+        return joblib.load(pipeline_path)
+
+
+def calcular_padroes(df, colunas=FEATURES_MODELO):
+    """Valor padrão de cada coluna: moda nas categóricas e mediana nas numéricas."""
+    padroes = {}
+    for coluna in colunas:
+        if not pd.api.types.is_numeric_dtype(df[coluna]):
+            padroes[coluna] = str(df[coluna].mode()[0])
+        else:
+            padroes[coluna] = float(df[coluna].median())
+    return padroes
+
+
+def criar_perfil_servico(df, colunas=FEATURES_MODELO):
+    """
+    Perfil de serviço: padrões de todas as colunas, o vocabulário ordenado das categóricas e a
+    faixa típica (percentis 1 e 99) das numéricas, usada como intervalo padrão nas simulações.
+    """
+    vocabularios = {
+        coluna: sorted(str(valor) for valor in df[coluna].dropna().unique())
+        for coluna in colunas if not pd.api.types.is_numeric_dtype(df[coluna])
+    }
+    faixas = {
+        coluna: [float(df[coluna].quantile(0.01)), float(df[coluna].quantile(0.99))]
+        for coluna in colunas if pd.api.types.is_numeric_dtype(df[coluna])
+    }
+    return {'versao': VERSAO_PERFIL, 'colunas': list(colunas), 'linhas': int(len(df)),
+            'padroes': calcular_padroes(df, colunas), 'vocabularios': vocabularios, 'faixas': faixas}
+
+
+def salvar_perfil_servico(perfil, caminho=PERFIL_SERVICO_PATH):
+    """Grava o perfil em um arquivo temporário e o troca pelo definitivo."""
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as f:
+        json.dump(perfil, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def carregar_perfil_servico(caminho=PERFIL_SERVICO_PATH):
+    """Lê o perfil de serviço gravado pelo 'main.py'."""
+    with open(caminho, 'r') as f:
+        perfil = json.load(f)
+    if perfil.get('versao') != VERSAO_PERFIL:
+        raise ValueError(f"O perfil de serviço em '{caminho}' é de outra versão. Rode o 'main.py' novamente.")
+    return perfil
+
+
+def carregar_indice_servico(caminho=INDICE_GEO_SERVICO_PATH):
+    """Índice geográfico gravado ao lado do perfil de serviço (None se não existir)."""
+    try:
+        return carregar_indice_geo(caminho)
+    except FileNotFoundError:
+        return None
+
+
+def _calcular_distancia(df, entrada, indice_geo):
+    """
+    Recalcula a 'distancia_cliente_vendedor_km' das linhas de 'df' com alguma entrada de
+    localização e sem a distância informada. Os estados ausentes já vêm com o padrão em
+    'entrada'; as linhas que não puderem ser localizadas ficam com o valor atual (a mediana).
+    """
+    presentes = [col for col in COLUNAS_LOCALIZACAO if col in df.columns]
+    if indice_geo is None or not presentes:
+        return
+    calcular = df[presentes].notna().any(axis=1).to_numpy()
+    if 'distancia_cliente_vendedor_km' in df.columns:
+        calcular &= df['distancia_cliente_vendedor_km'].isna().to_numpy()
+    if not calcular.any():
+        return
+    locais = pd.DataFrame({
+        col: df[col] if col.endswith('_zip_code_prefix') and col in df.columns else entrada.get(col, np.nan)
+        for col in COLUNAS_LOCALIZACAO
+    }, index=df.index)
+    distancia = distancia_cliente_vendedor(locais, indice_geo)
+    calcular &= ~np.isnan(distancia)
+    entrada['distancia_cliente_vendedor_km'] = np.where(
+        calcular, distancia, entrada['distancia_cliente_vendedor_km'].to_numpy(dtype='float64'))
+
+
+def montar_entrada(df, padroes, colunas=FEATURES_MODELO, indice_geo=None):
+    """
+    DataFrame pronto para o 'predict': as colunas ausentes em 'df' (e os valores faltantes
+    nas presentes) recebem o padrão da coluna, o 'percentual_frete' é recalculado e, com o
+    'indice_geo', a distância entre cliente e vendedor também.
+    """
+    # As colunas são reunidas antes e o DataFrame é criado de uma vez: inserir coluna por
+    # coluna custa mais que a previsão quando o lote tem poucas linhas.
+    valores_entrada = {}
+    for coluna in colunas:
+        if coluna in df.columns:
+            valores = df[coluna]
+            if isinstance(valores.dtype, pd.CategoricalDtype):
+                valores = valores.astype(object)
+            valores_entrada[coluna] = valores.fillna(padroes[coluna]) if valores.isna().any() else valores
+        else:
+            valores_entrada[coluna] = padroes[coluna]
+    entrada = pd.DataFrame(valores_entrada, index=df.index, columns=colunas)
+    entrada['percentual_frete'] = calcular_features(
+        entrada, ['percentual_frete_estimado'])['percentual_frete_estimado']
+    if 'distancia_cliente_vendedor_km' in colunas:
+        _calcular_distancia(df, entrada, indice_geo)
+    return entrada
+
+
+def prever(modelo, df, padroes, indice_geo=None):
+    """Previsão (na escala original, em R$) para cada linha de 'df'."""
+    return np.asarray(modelo.predict(montar_entrada(df, padroes, indice_geo=indice_geo)))
+
+
+def prever_em_lotes(modelo, df, padroes, linhas_por_lote=50_000, indice_geo=None):
+    """
+    Como 'prever', mas em lotes de tamanho fixo, para limitar a memória das matrizes
+    intermediárias. Devolve (previsões, linhas por segundo).
+    """
+    inicio = time.perf_counter()
+    partes = [prever(modelo, df.iloc[i:i + linhas_por_lote], padroes, indice_geo)
+              for i in range(0, len(df), linhas_por_lote)]
+    segundos = time.perf_counter() - inicio
+    previsoes = np.concatenate(partes) if partes else np.empty(0)
+    return previsoes, len(df) / segundos if segundos > 0 else float('inf')
+
+
+# --- Simulação de Cenários ---
+
+def grade_cenarios(base, eixos):
+    """
+    Um DataFrame com uma linha por combinação dos valores de 'eixos' ({coluna: valores}, o
+    produto cartesiano); as outras colunas recebem o valor de 'base' (o pedido simulado).
+    """
+    grade = pd.MultiIndex.from_product(list(eixos.values()), names=list(eixos)).to_frame(index=False)
+    return grade.assign(**{coluna: valor for coluna, valor in base.items() if coluna not in eixos})
+
+
+def varrer_cenarios(modelo, base, eixos, padroes, indice_geo=None):
+    """Previsão para cada combinação de 'eixos' em torno de 'base', em uma única chamada de 'predict'."""
+    grade = grade_cenarios(base, eixos)
+    grade[COLUNA_PREVISAO] = prever(modelo, grade, padroes, indice_geo)
+    return grade[list(eixos) + [COLUNA_PREVISAO]]
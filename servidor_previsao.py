@@ -0,0 +1,385 @@
+import argparse
+import bisect
+import http.client
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from cache_previsoes import CachePrevisoes, MAX_ITENS, TTL_S
+from instrumentacao import etapa
+from servico_previsao import carregar_modelo, carregar_perfil_servico, carregar_indice_servico, prever, COLUNA_PREVISAO
+from versoes_modelo import ArtefatosRecarregaveis, pasta_versao_atual
+
+# --- Serviço HTTP de Previsão ---
+# Servidor HTTP só com a biblioteca padrão em volta do modelo treinado, carregado uma vez por
+# worker (o compilado, só NumPy, quando existe; senão 'data/modelo_vendas.pkl').
+#
+#   POST /prever    {"price": 120.0, "customer_state": "SP", ...}  -> {"valor_venda_previsto": 187.3}
+#                   [{...}, {...}]                                  -> {"valor_venda_previsto": [..., ...]}
+#   GET  /metricas  latência p50/p95/p99, vazão e tamanho dos lotes
+#   GET  /saude     {"status": "ok"}
+#
+# Um 'predict' de uma linha gasta quase todo o tempo em custo fixo (montar o DataFrame,
+# percorrer as árvores uma vez por chamada). O agrupador junta os pedidos que chegam ao mesmo
+# tempo: o primeiro pedido abre uma janela de '--espera-ms', os que chegam nela entram no mesmo
+# lote (até '--max-linhas') e um único 'predict' vetorizado responde a todos. Com '--workers N'
+# (Linux), N processos abrem a mesma porta com SO_REUSEPORT e o kernel divide as conexões.
+# Cada worker tem um cache LRU de previsões ('cache_previsoes.py') na frente do modelo e
+# troca de modelo em segundo plano quando uma nova versão é publicada ('versoes_modelo.py'),
+# descartando o cache.
+
+ESPERA_MS = 2.0
+MAX_LINHAS_LOTE = 256
+PORTA = 8000
+
+# Limites dos baldes do histograma: ~11% de largura entre 0,05 ms e 10 s.
+LIMITES_HISTOGRAMA_MS = np.geomspace(0.05, 10_000, 120).tolist()
+
+
+class HistogramaLatencia:
+    """Histograma de latências em baldes fixos (em ms); percentis pelo limite superior do balde."""
+
+    def __init__(self, limites=LIMITES_HISTOGRAMA_MS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma_ms = 0.0
+        self.maximo_ms = 0.0
+        self._trava = threading.Lock()
+
+    def registrar(self, ms):
+        with self._trava:
+            self.contagens[bisect.bisect_left(self.limites, ms)] += 1
+            self.total += 1
+            self.soma_ms += ms
+            self.maximo_ms = max(self.maximo_ms, ms)
+
+    def percentil(self, q):
+        with self._trava:
+            if self.total == 0:
+                return None
+            alvo = q / 100 * self.total
+            acumulado = 0
+            for i, contagem in enumerate(self.contagens):
+                acumulado += contagem
+                if acumulado >= alvo:
+                    return self.limites[i] if i < len(self.limites) else self.maximo_ms
+            return self.maximo_ms
+
+    def resumo(self):
+        return {
+            'contagem': self.total,
+            'media_ms': self.soma_ms / self.total if self.total else None,
+            'p50_ms': self.percentil(50),
+            'p95_ms': self.percentil(95),
+            'p99_ms': self.percentil(99),
+            'max_ms': self.maximo_ms if self.total else None,
+        }
+
+
+class MetricasServico:
+    """Contadores do worker: requisições, linhas, lotes, erros e os histogramas de latência."""
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.latencia = HistogramaLatencia()
+        self.previsao_lote = HistogramaLatencia()
+        self.requisicoes = 0
+        self.linhas = 0
+        self.lotes = 0
+        self.erros = 0
+        self._trava = threading.Lock()
+
+    def registrar_requisicao(self, ms, erro=False):
+        self.latencia.registrar(ms)
+        with self._trava:
+            self.requisicoes += 1
+            self.erros += erro
+
+    def registrar_lote(self, linhas, ms):
+        self.previsao_lote.registrar(ms)
+        with self._trava:
+            self.lotes += 1
+            self.linhas += linhas
+
+    def resumo(self):
+        segundos = time.time() - self.inicio
+        return {
+            'pid': os.getpid(),
+            'segundos_ativo': segundos,
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'requisicoes_por_s': self.requisicoes / segundos if segundos > 0 else None,
+            'linhas_previstas': self.linhas,
+            'lotes': self.lotes,
+            'linhas_por_lote': self.linhas / self.lotes if self.lotes else None,
+            'latencia': self.latencia.resumo(),
+            'previsao_lote': self.previsao_lote.resumo(),
+        }
+
+
+class AgrupadorPrevisoes:
+    """
+    Junta os pedidos de várias requisições em lotes: uma thread espera o primeiro pedido,
+    recolhe os que chegam em até 'espera_ms' (até 'max_linhas' linhas) e faz um único 'predict'.
+    O modelo vem de 'artefatos.atual', trocado em segundo plano quando uma nova versão é publicada.
+    """
+
+    def __init__(self, artefatos, espera_ms=ESPERA_MS, max_linhas=MAX_LINHAS_LOTE, cache=None, metricas=None):
+        self.artefatos = artefatos
+        self.espera = espera_ms / 1000
+        self.max_linhas = max_linhas
+        self.cache = cache
+        self.metricas = metricas or MetricasServico()
+        self._fila = queue.Queue()
+        threading.Thread(target=self._laco, name='agrupador', daemon=True).start()
+
+    def prever(self, pedidos):
+        """Lista de pedidos (dicionários) -> lista de previsões, na mesma ordem."""
+        futuro = Future()
+        self._fila.put((pedidos, futuro))
+        return futuro.result()
+
+    def _laco(self):
+        while True:
+            grupo = [self._fila.get()]
+            linhas = len(grupo[0][0])
+            prazo = time.perf_counter() + self.espera
+            while linhas < self.max_linhas:
+                restante = prazo - time.perf_counter()
+                try:
+                    item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                grupo.append(item)
+                linhas += len(item[0])
+            self._executar(grupo)
+
+    def _executar(self, grupo):
+        inicio = time.perf_counter()
+        atual = self.artefatos.atual  # uma versão inteira por lote, mesmo que troque no meio
+        try:
+            pedidos = [pedido for pedidos, _ in grupo for pedido in pedidos]
+            with etapa('servico:lote', categoria='servico', linhas=len(pedidos)):
+                if self.cache is not None:
+                    previsoes = self.cache.prever(atual['modelo'], pedidos, atual['padroes'], atual['assinatura'],
+                                                  atual['indice_geo']).tolist()
+                else:
+                    previsoes = prever(atual['modelo'], pd.DataFrame(pedidos), atual['padroes'],
+                                       atual['indice_geo']).tolist()
+        except Exception as e:
+            if len(grupo) > 1:
+                # Um pedido inválido não derruba os outros do lote: cada requisição é refeita sozinha.
+                for item in grupo:
+                    self._executar([item])
+            else:
+                grupo[0][1].set_exception(e)
+            return
+        self.metricas.registrar_lote(len(previsoes), 1000 * (time.perf_counter() - inicio))
+        posicao = 0
+        for pedidos, futuro in grupo:
+            futuro.set_result(previsoes[posicao:posicao + len(pedidos)])
+            posicao += len(pedidos)
+
+
+class ManipuladorPrevisao(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # conexões persistentes: sem um handshake TCP por previsão
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        if self.path == '/saude':
+            self._responder(200, {'status': 'ok'})
+        elif self.path == '/metricas':
+            agrupador = self.server.agrupador
+            metricas = agrupador.metricas.resumo()
+            metricas['versao_modelo'] = agrupador.artefatos.atual['versao']
+            metricas['assinatura_modelo'] = agrupador.artefatos.atual['assinatura']
+            metricas['erro_recarga'] = agrupador.artefatos.erro
+            metricas['cache'] = agrupador.cache.estatisticas() if agrupador.cache is not None else None
+            self._responder(200, metricas)
+        else:
+            self._responder(404, {'erro': f"Caminho '{self.path}' não existe."})
+
+    def do_POST(self):
+        inicio = time.perf_counter()
+        if self.path != '/prever':
+            self._responder(404, {'erro': f"Caminho '{self.path}' não existe."})
+            return
+        try:
+            corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            unico = isinstance(corpo, dict)
+            pedidos = [corpo] if unico else corpo
+            if not isinstance(pedidos, list) or not pedidos or not all(isinstance(p, dict) for p in pedidos):
+                raise ValueError("O corpo deve ser um pedido (objeto JSON) ou uma lista de pedidos.")
+            previsoes = self.server.agrupador.prever(pedidos)
+        except Exception as e:
+            self._responder(400, {'erro': str(e)})
+            self.server.agrupador.metricas.registrar_requisicao(1000 * (time.perf_counter() - inicio), erro=True)
+            return
+        self._responder(200, {COLUNA_PREVISAO: previsoes[0] if unico else previsoes})
+        self.server.agrupador.metricas.registrar_requisicao(1000 * (time.perf_counter() - inicio))
+
+
+class ServidorPrevisao(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, endereco, agrupador, reutilizar_porta=False):
+        self.agrupador = agrupador
+        self.reutilizar_porta = reutilizar_porta
+        super().__init__(endereco, ManipuladorPrevisao)
+
+    def server_bind(self):
+        if self.reutilizar_porta:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _carregar_para_servico(pasta):
+    return {
+        'modelo': carregar_modelo(os.path.join(pasta, 'modelo_compilado'), os.path.join(pasta, 'modelo_vendas.pkl')),
+        'padroes': carregar_perfil_servico(os.path.join(pasta, 'perfil_servico.json'))['padroes'],
+        'indice_geo': carregar_indice_servico(os.path.join(pasta, 'geo_indice.npz')),
+    }
+
+
+def _avisar_troca(atual):
+    print(f"Worker {os.getpid()}: nova versão do modelo em uso ({atual['versao'] or atual['pasta']}).")
+
+
+def servir(host, porta, espera_ms=ESPERA_MS, max_linhas=MAX_LINHAS_LOTE, reutilizar_porta=False,
+           cache_itens=MAX_ITENS, cache_ttl_s=TTL_S):
+    """Carrega o modelo e o perfil (uma vez por versão) e atende requisições até ser interrompido."""
+    artefatos = ArtefatosRecarregaveis(_carregar_para_servico, ao_trocar=_avisar_troca)
+    cache = CachePrevisoes(cache_itens, cache_ttl_s) if cache_itens > 0 else None
+    agrupador = AgrupadorPrevisoes(artefatos, espera_ms, max_linhas, cache)
+    servidor = ServidorPrevisao((host, porta), agrupador, reutilizar_porta)
+    print(f"Worker {os.getpid()} pronto em http://{host}:{porta} "
+          f"({type(artefatos.atual['modelo']).__name__}, versão {artefatos.atual['versao']}).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def testar_carga(url, pedidos, clientes=8, requisicoes=2000):
+    """
+    Gerador de carga: 'clientes' threads, cada uma com uma conexão persistente, enviam
+    'requisicoes' pedidos de uma linha no total. Devolve as latências vistas pelo cliente e a vazão.
+    """
+    endereco = urlsplit(url)
+    corpos = [json.dumps(p).encode('utf-8') for p in pedidos]
+    latencias = HistogramaLatencia()
+    por_cliente = [requisicoes // clientes + (i < requisicoes % clientes) for i in range(clientes)]
+    erros = []
+
+    def cliente(indice, total):
+        conexao = http.client.HTTPConnection(endereco.hostname, endereco.port or 80)
+        for i in range(total):
+            corpo = corpos[(indice + i * clientes) % len(corpos)]
+            inicio = time.perf_counter()
+            conexao.request('POST', '/prever', corpo, {'Content-Type': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+            latencias.registrar(1000 * (time.perf_counter() - inicio))
+            if resposta.status != 200:
+                erros.append(resposta.status)
+        conexao.close()
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=cliente, args=(i, n)) for i, n in enumerate(por_cliente)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - inicio
+    return {'requisicoes': requisicoes, 'erros': len(erros), 'segundos': segundos,
+            'requisicoes_por_s': requisicoes / segundos, 'latencia': latencias.resumo()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serviço HTTP de previsão do valor da venda, com agrupamento de requisições.")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço de escuta.")
+    parser.add_argument('--porta', type=int, default=PORTA, help="Porta de escuta.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processos servindo a mesma porta com SO_REUSEPORT (Linux); cada um carrega o modelo.")
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_MS,
+                        help="Janela de espera para juntar requisições em um lote (0 = sem espera).")
+    parser.add_argument('--max-linhas', type=int, default=MAX_LINHAS_LOTE, help="Linhas máximas por lote de previsão.")
+    parser.add_argument('--cache-itens', type=int, default=MAX_ITENS,
+                        help="Previsões guardadas no cache LRU de cada worker (0 = sem cache).")
+    parser.add_argument('--cache-ttl-s', type=float, default=TTL_S, help="Tempo de vida de cada previsão no cache.")
+    parser.add_argument('--carga', metavar='URL', default=None,
+                        help="Em vez de servir, envia carga a um serviço já rodando (ex.: http://127.0.0.1:8000).")
+    parser.add_argument('--pedidos', default=None, help="Com --carga: CSV com os pedidos a enviar (uma linha por requisição).")
+    parser.add_argument('--clientes', type=int, default=8, help="Com --carga: conexões simultâneas.")
+    parser.add_argument('--requisicoes', type=int, default=2000, help="Com --carga: total de requisições.")
+    args = parser.parse_args()
+
+    if args.carga:
+        if args.pedidos:
+            try:
+                pedidos = pd.read_csv(args.pedidos, nrows=10_000).to_dict('records')
+            except FileNotFoundError:
+                print(f"Erro: o arquivo de pedidos '{args.pedidos}' não foi encontrado.")
+                exit()
+        else:
+            pedidos = [{'price': 120.0, 'freight_value': 20.0, 'product_weight_g': 1500,
+                        'product_category_name_english': 'bed_bath_table', 'customer_state': 'SP',
+                        'payment_installments': 3}]
+        print(f"Enviando {args.requisicoes:,} requisições com {args.clientes} clientes para {args.carga}...")
+        print(json.dumps(testar_carga(args.carga, pedidos, args.clientes, args.requisicoes), indent=4))
+        exit()
+
+    perfil_path = os.path.join(pasta_versao_atual(), 'perfil_servico.json')
+    if not os.path.exists(perfil_path):
+        print(f"Erro: o perfil de serviço '{perfil_path}' não foi encontrado. Execute o 'main.py' primeiro.")
+        exit()
+
+    workers = args.workers
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print("Aviso: SO_REUSEPORT não está disponível neste sistema; usando um único worker.")
+        workers = 1
+
+    if workers == 1:
+        servir(args.host, args.porta, args.espera_ms, args.max_linhas, False, args.cache_itens, args.cache_ttl_s)
+    else:
+        processos = [
+            multiprocessing.Process(target=servir, args=(args.host, args.porta, args.espera_ms, args.max_linhas,
+                                                         True, args.cache_itens, args.cache_ttl_s))
+            for _ in range(workers)
+        ]
+        for p in processos:
+            p.start()
+        # SIGTERM no processo principal também encerra os workers.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            for p in processos:
+                p.join()
+        except KeyboardInterrupt:
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            for p in processos:
+                p.terminate()
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, RegressorMixin
+
+from busca_hiperparametros import BuscaSucessiva
+
+AJUSTES = []
+
+
+class RegressorRegistrado(RegressorMixin, BaseEstimator):
+    """Prevê a média do treino mais 'desvio' e registra as linhas (coluna 0 = id) de cada ajuste."""
+
+    def __init__(self, desvio=0.0):
+        self.desvio = desvio
+
+    def fit(self, X, y):
+        AJUSTES.append((self.desvio, tuple(np.asarray(X)[:, 0].astype(int))))
+        self.media_ = float(np.mean(y))
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.media_ + self.desvio)
+
+
+GRID = {'desvio': [0.0, 0.5, -1.0, 2.0, -3.0, 4.0, 8.0, -9.0, 16.0]}
+
+
+@pytest.fixture
+def dados():
+    AJUSTES.clear()
+    rng = np.random.RandomState(0)
+    X = np.column_stack([np.arange(270), rng.rand(270)])
+    return X, rng.rand(270)
+
+
+def _busca(**kwargs):
+    return BuscaSucessiva(RegressorRegistrado(), GRID, cv=3, fator=3, **kwargs)
+
+
+def _ajustes_nos_folds():
+    """Os ajustes registrados, sem o refit final (que usa todas as 270 linhas)."""
+    return [ajuste for ajuste in AJUSTES if len(ajuste[1]) < 270]
+
+
+def test_rodadas_usam_prefixos_aninhados(dados):
+    X, y = dados
+    busca = _busca().fit(X, y)
+    rodadas = sorted(set(busca.cv_results_['n_linhas']))
+    assert len(rodadas) == 3
+
+    por_tamanho = {}
+    for _, linhas in _ajustes_nos_folds():
+        por_tamanho.setdefault(len(linhas), set()).add(linhas)
+    assert sorted(por_tamanho) == rodadas
+    # Cada conjunto de treino de uma rodada é o começo de um conjunto da rodada seguinte (a
+    # última usa o fold inteiro na ordem original, então ali só vale a inclusão).
+    for menor, maior in zip(rodadas[:-2], rodadas[1:-1]):
+        for linhas in por_tamanho[menor]:
+            assert any(outras[:menor] == linhas for outras in por_tamanho[maior])
+    for linhas in por_tamanho[rodadas[-2]]:
+        assert any(set(linhas) <= set(outras) for outras in por_tamanho[rodadas[-1]])
+    assert busca.best_params_ == {'desvio': 0.0}
+
+
+def test_checkpoint_retoma_sem_repetir_ajustes(dados, tmp_path):
+    X, y = dados
+    checkpoint = str(tmp_path / 'busca.jsonl')
+    parcial = _busca(max_ajustes=12, checkpoint=checkpoint).fit(X, y)
+    feitos = _ajustes_nos_folds()
+    assert parcial.n_ajustes_ == len(feitos) <= 12
+
+    AJUSTES.clear()
+    completa = _busca(checkpoint=checkpoint).fit(X, y)
+    # Nenhum ajuste (configuração, linhas) da primeira execução é refeito na segunda.
+    assert not set(feitos) & set(_ajustes_nos_folds())
+    assert completa.n_ajustes_ == len(_ajustes_nos_folds())
+
+    AJUSTES.clear()
+    _busca().fit(X, y)
+    assert len(feitos) + completa.n_ajustes_ == len(_ajustes_nos_folds())
+    assert completa.best_params_ == {'desvio': 0.0}
+
+
+@pytest.mark.parametrize('max_ajustes', [1, 5, 27, 30, 40])
+def test_max_ajustes_respeitado(dados, max_ajustes):
+    X, y = dados
+    if max_ajustes < 3:
+        # Nem uma configuração cabe inteira (3 folds) no orçamento.
+        with pytest.raises(RuntimeError):
+            _busca(max_ajustes=max_ajustes).fit(X, y)
+        return
+    busca = _busca(max_ajustes=max_ajustes).fit(X, y)
+    assert busca.n_ajustes_ == len(_ajustes_nos_folds()) <= max_ajustes
+    assert busca.n_ajustes_ > max_ajustes - 3
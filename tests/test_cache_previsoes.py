@@ -0,0 +1,42 @@
+import cache_previsoes
+from cache_previsoes import CachePrevisoes
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_ttl_expira_previsoes(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_previsoes.time, 'monotonic', relogio)
+    cache = CachePrevisoes(max_itens=10, ttl_s=60)
+    cache.guardar(['a'], [1.5], 'v1')
+
+    relogio.agora += 59
+    assert cache.obter(['a'], 'v1') == [1.5]
+    relogio.agora += 2
+    assert cache.obter(['a'], 'v1') == [None]
+    estatisticas = cache.estatisticas()
+    assert estatisticas['expirados'] == 1
+    assert estatisticas['itens'] == 0
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CachePrevisoes(max_itens=2, ttl_s=60)
+    cache.guardar(['a', 'b'], [1.0, 2.0], 'v1')
+    # Consultar 'a' o torna o mais recente: quem sai ao entrar 'c' é 'b'.
+    assert cache.obter(['a'], 'v1') == [1.0]
+    cache.guardar(['c'], [3.0], 'v1')
+    assert cache.obter(['a', 'b', 'c'], 'v1') == [1.0, None, 3.0]
+    assert cache.estatisticas()['removidos_lru'] == 1
+
+
+def test_troca_de_assinatura_descarta_o_cache():
+    cache = CachePrevisoes(max_itens=10, ttl_s=60)
+    cache.guardar(['a'], [1.0], 'v1')
+    assert cache.obter(['a'], 'v2') == [None]
+    assert cache.estatisticas()['invalidacoes'] == 1
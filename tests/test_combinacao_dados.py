@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from combinacao_dados import _caminho_particao, calcular_impressoes, calcular_particoes, reconstruir_incremental
+from fontes_dados import carregar_tabela
+from gerar_dados_sinteticos import gerar_dados
+
+TABELAS = ('order_items', 'orders', 'products', 'sellers', 'customers', 'reviews', 'payments', 'translation')
+
+
+@pytest.fixture
+def tabelas(tmp_path):
+    origem = str(tmp_path / 'database')
+    gerar_dados(400, origem, semente=7, verbose=False)
+    return {nome: carregar_tabela(nome, data_path=origem, cache_path=str(tmp_path / 'cache')) for nome in TABELAS}
+
+
+def _conteudo(saida):
+    """Bytes de cada partição gravada (sem os arquivos de estado, que começam com '_')."""
+    conteudo = {}
+    for nome in sorted(os.listdir(saida)):
+        if nome.endswith('.csv') and not nome.startswith('_'):
+            with open(os.path.join(saida, nome), 'rb') as f:
+                conteudo[nome] = f.read()
+    return conteudo
+
+
+def test_uma_linha_alterada_reescreve_uma_particao(tabelas, tmp_path):
+    saida = str(tmp_path / 'particoes')
+    primeiras = reconstruir_incremental(tabelas, saida)
+    assert len(primeiras) > 1
+    antes = _conteudo(saida)
+    impressoes_antes = calcular_impressoes(tabelas)
+
+    # Sem mudanças nas origens, nada é reescrito.
+    assert reconstruir_incremental(tabelas, saida) == []
+
+    # Uma avaliação de um pedido com itens muda de nota.
+    reviews = tabelas['reviews'].copy()
+    linha = reviews.index[reviews['order_id'].isin(tabelas['order_items']['order_id'])][0]
+    pedido = reviews.at[linha, 'order_id']
+    reviews.at[linha, 'review_score'] = 1 if reviews.at[linha, 'review_score'] != 1 else 5
+    tabelas = {**tabelas, 'reviews': reviews}
+
+    impressoes = calcular_impressoes(tabelas)
+    mudaram = impressoes.index[impressoes != impressoes_antes.reindex(impressoes.index)]
+    assert list(mudaram) == [pedido]
+
+    particao = calcular_particoes(tabelas['orders'], [pedido]).iloc[0]
+    assert reconstruir_incremental(tabelas, saida) == [particao]
+    depois = _conteudo(saida)
+    assert antes.keys() == depois.keys()
+    alteradas = [nome for nome in antes if antes[nome] != depois[nome]]
+    assert alteradas == [os.path.basename(_caminho_particao(saida, particao))]
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.pipeline import Pipeline
+
+from inferencia_numpy import ModeloCompilado, exportar_modelo_compilado
+from pipeline_modelo import criar_modelo, criar_preprocessador
+
+NUMERICAS = ['price', 'freight_value', 'product_weight_g']
+CATEGORICAS = ['customer_state', 'payment_type']
+
+# Categorias desconhecidas na previsão são esperadas aqui (o one-hot avisa que as zera).
+pytestmark = pytest.mark.filterwarnings('ignore:Found unknown categories:UserWarning')
+
+
+def _dados(n, rng):
+    return pd.DataFrame({
+        'price': rng.gamma(2.0, 60.0, n),
+        'freight_value': rng.gamma(2.0, 10.0, n),
+        'product_weight_g': rng.randint(50, 5000, n).astype(float),
+        'customer_state': rng.choice(['SP', 'RJ', 'MG', 'BA', 'RS'], n),
+        'payment_type': rng.choice(['credit_card', 'boleto', 'voucher'], n),
+    })
+
+
+@pytest.fixture(scope='module')
+def treino():
+    rng = np.random.RandomState(0)
+    X = _dados(600, rng)
+    y = X['price'] * (1 + (X['customer_state'] == 'SP')) + X['freight_value'] + rng.gamma(1.0, 5.0, 600)
+    # Na previsão também entram categorias que o treino não viu e valores faltantes.
+    novos = _dados(200, rng)
+    novos.loc[:9, 'customer_state'] = 'AC'
+    novos.loc[10:19, 'payment_type'] = np.nan
+    novos.loc[20:29, 'product_weight_g'] = np.nan
+    return X, y, novos
+
+
+@pytest.mark.parametrize('motor, codificacao', [
+    ('random_forest', 'onehot_denso'),
+    ('random_forest', 'ordinal'),
+    ('hist_gradient_boosting', 'ordinal'),
+    ('hist_gradient_boosting', 'onehot_denso'),
+])
+def test_modelo_compilado_igual_ao_pipeline(treino, tmp_path, motor, codificacao):
+    X, y, novos = treino
+    modelo = criar_modelo(motor, codificacao, NUMERICAS, CATEGORICAS)
+    modelo.set_params(**({'n_estimators': 20, 'min_samples_leaf': 3} if motor == 'random_forest' else {'max_iter': 30}))
+    pipeline = TransformedTargetRegressor(
+        regressor=Pipeline(steps=[
+            ('preprocessor', criar_preprocessador(codificacao, NUMERICAS, CATEGORICAS)),
+            ('model', modelo),
+        ]),
+        func=np.log1p,
+        inverse_func=np.expm1,
+    ).fit(X, y)
+
+    exportar_modelo_compilado(pipeline, str(tmp_path / 'compilado'))
+    compilado = ModeloCompilado(str(tmp_path / 'compilado'))
+
+    np.testing.assert_allclose(compilado.predict(novos), pipeline.predict(novos), rtol=0, atol=1e-9)
+    # Referência mais a soma das contribuições = previsão no espaço do alvo transformado (log1p).
+    base, contribuicoes = compilado.contribuicoes(novos)
+    assert contribuicoes.shape == (len(novos), len(compilado.colunas_entrada))
+    np.testing.assert_allclose(base + contribuicoes.sum(axis=1), pipeline.regressor_.predict(novos),
+                               rtol=0, atol=1e-9)
@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+
+from servico_previsao import FEATURES_MODELO
+from servidor_previsao import AgrupadorPrevisoes
+
+CATEGORICAS = {'seller_state', 'customer_state', 'payment_type', 'product_category_name_english'}
+PADROES = {coluna: 'SP' if coluna in CATEGORICAS else 1.0 for coluna in FEATURES_MODELO}
+
+
+class ModeloEco:
+    """Prevê o próprio 'price' de cada linha e registra o tamanho de cada lote."""
+
+    def __init__(self):
+        self.lotes = []
+
+    def predict(self, entrada):
+        self.lotes.append(len(entrada))
+        return np.asarray(entrada['price'], dtype='float64')
+
+
+class ArtefatosFixos:
+    def __init__(self, modelo):
+        self.atual = {'modelo': modelo, 'padroes': PADROES, 'indice_geo': None, 'assinatura': 'teste'}
+
+
+def test_pedidos_simultaneos_dividem_um_lote():
+    modelo = ModeloEco()
+    # Janela longa: as duas requisições certamente caem no mesmo lote.
+    agrupador = AgrupadorPrevisoes(ArtefatosFixos(modelo), espera_ms=500, max_linhas=16)
+    largada = threading.Barrier(2)
+    respostas = {}
+
+    def cliente(nome, precos):
+        largada.wait()
+        respostas[nome] = agrupador.prever([{'price': preco} for preco in precos])
+
+    threads = [threading.Thread(target=cliente, args=('a', [10.0])),
+               threading.Thread(target=cliente, args=('b', [20.0, 30.0]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert modelo.lotes == [3]
+    assert respostas == {'a': [10.0], 'b': [20.0, 30.0]}
+    assert agrupador.metricas.lotes == 1
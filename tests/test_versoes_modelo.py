@@ -0,0 +1,88 @@
+import os
+import shutil
+
+import pytest
+
+from versoes_modelo import (_despejar_versoes, criar_pasta_versao, listar_versoes, publicar_versao,
+                            reverter_versao, versao_atual, PONTEIRO_PATH, VERSOES_PATH)
+
+
+@pytest.fixture(autouse=True)
+def pasta_de_trabalho(tmp_path, monkeypatch):
+    # Os caminhos padrão são relativos ('data/versoes', cópias em 'data/').
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(VERSOES_PATH)
+
+
+def _preparar(nome, conteudo, extras=()):
+    """Pasta de preparação com um 'modelo_vendas.pkl' de conteúdo conhecido (e arquivos extras)."""
+    pasta = os.path.join(VERSOES_PATH, f'.preparando-{nome}')
+    os.makedirs(pasta)
+    for arquivo in ('modelo_vendas.pkl', *extras):
+        with open(os.path.join(pasta, arquivo), 'w') as f:
+            f.write(conteudo)
+    return pasta
+
+
+def _ler(caminho):
+    with open(caminho, 'r') as f:
+        return f.read()
+
+
+def test_publicar_aponta_e_atualiza_copias():
+    pasta = _preparar('20260101-000000', 'v1', extras=['perfil_servico.json'])
+    versao = publicar_versao(pasta)
+
+    assert versao == '20260101-000000'
+    assert not os.path.exists(pasta)
+    assert versao_atual(PONTEIRO_PATH) == versao
+    assert _ler(os.path.join(VERSOES_PATH, versao, 'modelo_vendas.pkl')) == 'v1'
+    assert _ler(os.path.join('data', 'modelo_vendas.pkl')) == 'v1'
+    assert _ler(os.path.join('data', 'perfil_servico.json')) == 'v1'
+
+
+def test_reverter_volta_ponteiro_e_copias():
+    publicar_versao(_preparar('20260101-000000', 'v1'))
+    publicar_versao(_preparar('20260102-000000', 'v2', extras=['importancia_permutacao.json']))
+    assert _ler(os.path.join('data', 'modelo_vendas.pkl')) == 'v2'
+
+    assert reverter_versao() == '20260101-000000'
+    assert versao_atual(PONTEIRO_PATH) == '20260101-000000'
+    assert _ler(os.path.join('data', 'modelo_vendas.pkl')) == 'v1'
+    # O que a versão revertida não tem sai de 'data/'.
+    assert not os.path.exists(os.path.join('data', 'importancia_permutacao.json'))
+    with pytest.raises(ValueError):
+        reverter_versao()
+
+
+def test_despejo_remove_as_mais_antigas_e_preserva_a_atual():
+    nomes = [f'2026010{dia}-000000' for dia in range(1, 5)]
+    for nome in nomes:
+        publicar_versao(_preparar(nome, nome), max_versoes=2)
+    assert listar_versoes() == nomes[-2:]
+
+    # Depois de reverter, a versão atual fica mesmo fora das 'max_versoes' mais novas.
+    reverter_versao(nomes[2])
+    _despejar_versoes(1)
+    assert listar_versoes() == nomes[2:]
+
+
+def test_limpeza_ao_sair_nao_apaga_versao_publicada():
+    pasta = criar_pasta_versao()
+    with open(os.path.join(pasta, 'modelo_vendas.pkl'), 'w') as f:
+        f.write('publicado')
+    versao = publicar_versao(pasta)
+
+    # O mesmo que o 'main.py' registra com atexit para a pasta de preparação.
+    shutil.rmtree(pasta, ignore_errors=True)
+    assert listar_versoes() == [versao]
+    assert _ler(os.path.join(VERSOES_PATH, versao, 'modelo_vendas.pkl')) == 'publicado'
+    assert versao_atual(PONTEIRO_PATH) == versao
+
+
+def test_limpeza_ao_sair_apaga_preparacao_nao_publicada():
+    publicada = publicar_versao(_preparar('20260101-000000', 'v1'))
+    pasta = criar_pasta_versao()
+    shutil.rmtree(pasta, ignore_errors=True)
+    assert not os.path.exists(pasta)
+    assert listar_versoes() == [publicada]
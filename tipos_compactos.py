@@ -0,0 +1,111 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa
+
+# --- Modo Compacto de Tipos ---
+# Numéricos são reduzidos ao menor tipo seguro (float32; int8/int16/int32 conforme os valores)
+# e textos de baixa cardinalidade viram 'category'. O RandomForest já converte tudo para
+# float32 internamente, então o float32 não muda o que o modelo enxerga.
+
+# Colunas de texto mantidas como 'category' do carregamento até o treinamento.
+CATEGORICAS_CONHECIDAS = {
+    'seller_state', 'customer_state', 'payment_type', 'product_category_name_english',
+    'product_category_name', 'seller_city', 'customer_city', 'order_status',
+}
+
+# Outras colunas de texto viram 'category' quando têm no máximo esta fração de valores distintos.
+FRACAO_MAX_CATEGORIA = 0.5
+
+# Colunas que nunca são reduzidas: a variável alvo (com seu nome original no dataset
+# completo), usada nas métricas em float64.
+NAO_COMPACTAR = {'valor_venda_total', 'payment_value'}
+
+
+def memoria_mb(df):
+    """Memória ocupada pelo DataFrame (incluindo o conteúdo dos textos), em MB."""
+    return df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+
+
+def compactar_tipos(df, excluir=NAO_COMPACTAR):
+    """Retorna uma cópia de 'df' com os tipos reduzidos ao menor tipo seguro."""
+    tipos = {}
+    for col in df.columns:
+        if col in excluir:
+            continue
+        serie = df[col]
+        dtype = serie.dtype
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+            continue
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_integer_dtype(dtype):
+            tipos[col] = pd.to_numeric(serie, downcast='integer').dtype
+        elif pd.api.types.is_float_dtype(dtype):
+            tipos[col] = np.dtype('float32')
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            distintos = serie.nunique(dropna=True)
+            if col in CATEGORICAS_CONHECIDAS or distintos <= FRACAO_MAX_CATEGORIA * max(len(serie), 1):
+                tipos[col] = 'category'
+    return df.astype(tipos)
+
+
+def relatorio_memoria(etapa, mb_antes, df_depois):
+    """Imprime o uso de memória antes/depois da compactação de uma etapa."""
+    mb_depois = memoria_mb(df_depois)
+    reducao = 100 * (1 - mb_depois / mb_antes) if mb_antes else 0.0
+    print(f"[memória] {etapa}: {mb_antes:.1f} MB -> {mb_depois:.1f} MB (-{reducao:.0f}%)")
+    por_tipo = df_depois.dtypes.astype(str).value_counts().to_dict()
+    print(f"[memória] {etapa}: colunas por tipo {por_tipo}")
+
+
+def _caminho_tipos(caminho_csv):
+    return os.path.splitext(caminho_csv)[0] + '.tipos.json'
+
+
+def salvar_csv_com_tipos(df, caminho_csv, compacto, **kwargs):
+    """
+    Salva o CSV e, no modo compacto, um '<arquivo>.tipos.json' ao lado com o dtype de
+    cada coluna, para que as etapas seguintes leiam o CSV já com os tipos compactos.
+    Fora do modo compacto, um arquivo de tipos antigo é removido.
+    """
+    with etapa(f'salvar:{os.path.basename(caminho_csv)}', categoria='io', linhas=len(df)):
+        df.to_csv(caminho_csv, index=False, **kwargs)
+    caminho_tipos = _caminho_tipos(caminho_csv)
+    if compacto:
+        with open(caminho_tipos, 'w') as f:
+            json.dump({col: str(dtype) for col, dtype in df.dtypes.items()}, f, indent=4)
+    else:
+        remover_tipos(caminho_csv)
+
+
+def remover_tipos(caminho_csv):
+    """Remove o arquivo de tipos de um CSV que foi regravado sem o modo compacto."""
+    caminho_tipos = _caminho_tipos(caminho_csv)
+    if os.path.exists(caminho_tipos):
+        os.remove(caminho_tipos)
+
+
+def ler_csv_com_tipos(caminho_csv, usecols=None):
+    """Lê um CSV aplicando o '<arquivo>.tipos.json' ao lado, quando ele existir."""
+    with etapa(f'carregar:{os.path.basename(caminho_csv)}', categoria='io') as e:
+        df = _ler_csv_com_tipos(caminho_csv, usecols)
+        e.linhas = len(df)
+    return df
+
+
+def _ler_csv_com_tipos(caminho_csv, usecols):
+    caminho_tipos = _caminho_tipos(caminho_csv)
+    if not os.path.exists(caminho_tipos):
+        return pd.read_csv(caminho_csv, usecols=usecols)
+
+    with open(caminho_tipos, 'r') as f:
+        tipos = json.load(f)
+    if usecols is not None:
+        tipos = {col: dtype for col, dtype in tipos.items() if col in usecols}
+    datas = [col for col, dtype in tipos.items() if dtype.startswith('datetime64')]
+    outros = {col: dtype for col, dtype in tipos.items() if col not in datas}
+    return pd.read_csv(caminho_csv, usecols=usecols, dtype=outros, parse_dates=datas, date_format='ISO8601')
@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import joblib
+
+from explicacoes_modelo import carregar_importancia
+from inferencia_numpy import ModeloCompilado
+from servico_previsao import carregar_perfil_servico, carregar_indice_servico
+
+# --- Versões dos Artefatos do Modelo ---
+# Cada treino do 'main.py' grava os artefatos em uma pasta de preparação e a publica como uma
+# versão imutável em 'data/versoes/<data-hora>/'. Depois, o ponteiro 'data/versoes/ATUAL' (um
+# arquivo com o nome da versão) é trocado de uma vez com os.replace. Quem serve o modelo lê o
+# ponteiro e carrega a pasta inteira, então nunca vê um pickle pela metade nem uma mistura de
+# versões. As cópias em 'data/' (modelo_vendas.pkl etc.) continuam existindo para os scripts
+# que as leem, atualizadas arquivo a arquivo também com os.replace.
+#
+# 'ArtefatosRecarregaveis' observa o ponteiro em uma thread: quando ele muda, a versão nova é
+# carregada em segundo plano e só então trocada pela antiga, sem travar as previsões em curso.
+# 'python versoes_modelo.py --reverter' volta o ponteiro para a versão anterior.
+
+DATA_PATH = 'data'
+VERSOES_PATH = os.path.join(DATA_PATH, 'versoes')
+PONTEIRO_PATH = os.path.join(VERSOES_PATH, 'ATUAL')
+ARQUIVOS_VERSAO = ['modelo_vendas.pkl', 'model_metrics.json', 'encoders.pkl', 'perfil_servico.json',
+                   'modelo_vendas_comprimido.pkl', 'modelo_compilado', 'importancia_permutacao.json',
+                   'geo_indice.npz']
+# Artefatos cuja data de modificação identifica o modelo quando ainda não há versões publicadas.
+ARTEFATOS_MODELO = [os.path.join(DATA_PATH, 'modelo_vendas.pkl'),
+                    os.path.join(DATA_PATH, 'modelo_compilado', 'meta.json'),
+                    os.path.join(DATA_PATH, 'perfil_servico.json')]
+MAX_VERSOES = 5
+# Uma pasta de preparação só existe entre o fim do treino e a publicação (minutos); mais velha
+# que isso, é de um 'main.py' que morreu no meio (ex.: falta de memória) e pode ser apagada.
+IDADE_MAX_PREPARACAO_S = 6 * 3600
+INTERVALO_OBSERVACAO_S = 1.0
+
+
+def versao_atual(ponteiro=PONTEIRO_PATH):
+    """Nome da versão apontada por 'ATUAL' (None se nenhuma versão foi publicada)."""
+    try:
+        with open(ponteiro, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def listar_versoes(versoes_path=VERSOES_PATH):
+    """Versões publicadas, da mais antiga para a mais recente."""
+    if not os.path.isdir(versoes_path):
+        return []
+    return sorted(nome for nome in os.listdir(versoes_path)
+                  if not nome.startswith('.') and os.path.isdir(os.path.join(versoes_path, nome)))
+
+
+def pasta_versao_atual(versoes_path=VERSOES_PATH):
+    """Pasta da versão atual; sem versões publicadas, a própria 'data/' (artefatos antigos)."""
+    versao = versao_atual(os.path.join(versoes_path, 'ATUAL'))
+    return os.path.join(versoes_path, versao) if versao else DATA_PATH
+
+
+def assinatura_artefatos(caminhos=ARTEFATOS_MODELO):
+    """
+    Identifica o modelo em uso: o nome da versão atual ou, sem versões, o tamanho e a data de
+    modificação dos artefatos em 'data/'. Muda sempre que um novo modelo é publicado.
+    """
+    versao = versao_atual()
+    if versao is not None:
+        return f'versao:{versao}'
+    partes = []
+    for caminho in caminhos:
+        try:
+            info = os.stat(caminho)
+            partes.append(f'{caminho}|{info.st_size}|{info.st_mtime_ns}')
+        except FileNotFoundError:
+            partes.append(f'{caminho}|ausente')
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()[:16]
+
+
+# --- Publicação ---
+
+def remover_preparacoes_abandonadas(versoes_path=VERSOES_PATH, idade_max_s=IDADE_MAX_PREPARACAO_S):
+    """Apaga as pastas '.preparando-*' sem alteração há mais de 'idade_max_s'. Devolve quantas foram apagadas."""
+    if not os.path.isdir(versoes_path):
+        return 0
+    limite = time.time() - idade_max_s
+    removidas = 0
+    for nome in os.listdir(versoes_path):
+        pasta = os.path.join(versoes_path, nome)
+        if nome.startswith('.preparando-') and os.path.isdir(pasta) and os.path.getmtime(pasta) < limite:
+            shutil.rmtree(pasta, ignore_errors=True)
+            removidas += 1
+    return removidas
+
+
+def criar_pasta_versao(versoes_path=VERSOES_PATH):
+    """
+    Cria a pasta de preparação de uma nova versão; o 'main.py' grava os artefatos nela.
+    Antes, apaga as pastas de preparação abandonadas por treinos interrompidos.
+    """
+    remover_preparacoes_abandonadas(versoes_path)
+    nome = datetime.now().strftime('%Y%m%d-%H%M%S')
+    sufixo = 1
+    while os.path.exists(os.path.join(versoes_path, nome)):
+        sufixo += 1
+        nome = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{sufixo}"
+    pasta = os.path.join(versoes_path, f'.preparando-{nome}')
+    os.makedirs(pasta)
+    return pasta
+
+
+def _apontar(versao, versoes_path=VERSOES_PATH):
+    ponteiro = os.path.join(versoes_path, 'ATUAL')
+    with open(ponteiro + '.tmp', 'w') as f:
+        f.write(versao + '\n')
+    os.replace(ponteiro + '.tmp', ponteiro)
+
+
+def _copiar_atomico(origem, destino):
+    """Copia um arquivo ou pasta para 'destino' via um temporário trocado com os.replace."""
+    temporario = destino + '.tmp'
+    if os.path.isdir(origem):
+        antiga = destino + '.antiga'
+        shutil.rmtree(temporario, ignore_errors=True)
+        shutil.copytree(origem, temporario)
+        shutil.rmtree(antiga, ignore_errors=True)
+        if os.path.exists(destino):
+            os.replace(destino, antiga)
+        os.replace(temporario, destino)
+        shutil.rmtree(antiga, ignore_errors=True)
+    else:
+        shutil.copy2(origem, temporario)
+        os.replace(temporario, destino)
+
+
+def atualizar_copias_legadas(pasta_versao, data_path=DATA_PATH):
+    """Deixa os artefatos de 'data/' iguais aos da versão (e remove os que ela não tem)."""
+    for arquivo in ARQUIVOS_VERSAO:
+        origem = os.path.join(pasta_versao, arquivo)
+        destino = os.path.join(data_path, arquivo)
+        if os.path.exists(origem):
+            _copiar_atomico(origem, destino)
+        elif os.path.isdir(destino):
+            shutil.rmtree(destino)
+        elif os.path.exists(destino):
+            os.remove(destino)
+
+
+def _despejar_versoes(max_versoes, versoes_path=VERSOES_PATH):
+    """Mantém as 'max_versoes' mais recentes e a atual (que pode ser mais antiga, após reverter)."""
+    versoes = listar_versoes(versoes_path)
+    manter = set(versoes[-max_versoes:]) | {versao_atual(os.path.join(versoes_path, 'ATUAL'))}
+    for versao in versoes:
+        if versao not in manter:
+            shutil.rmtree(os.path.join(versoes_path, versao), ignore_errors=True)
+
+
+def publicar_versao(pasta_preparacao, max_versoes=MAX_VERSOES, versoes_path=VERSOES_PATH):
+    """Torna a pasta de preparação uma versão imutável, aponta 'ATUAL' para ela e atualiza 'data/'."""
+    versao = os.path.basename(pasta_preparacao).replace('.preparando-', '', 1)
+    pasta = os.path.join(versoes_path, versao)
+    os.replace(pasta_preparacao, pasta)
+    _apontar(versao, versoes_path)
+    atualizar_copias_legadas(pasta)
+    _despejar_versoes(max_versoes, versoes_path)
+    return versao
+
+
+def reverter_versao(versao=None, versoes_path=VERSOES_PATH):
+    """Aponta 'ATUAL' para 'versao' (padrão: a anterior à atual) e atualiza as cópias em 'data/'."""
+    versoes = listar_versoes(versoes_path)
+    if versao is None:
+        atual = versao_atual(os.path.join(versoes_path, 'ATUAL'))
+        anteriores = [v for v in versoes if atual is None or v < atual]
+        if not anteriores:
+            raise ValueError("Não há versão anterior à atual para reverter.")
+        versao = anteriores[-1]
+    elif versao not in versoes:
+        raise ValueError(f"A versão '{versao}' não existe. Versões disponíveis: {versoes}")
+    _apontar(versao, versoes_path)
+    atualizar_copias_legadas(os.path.join(versoes_path, versao))
+    return versao
+
+
+# --- Carregamento e Troca em Segundo Plano ---
+
+def carregar_artefatos(pasta):
+    """
+    Pipeline, modelo de previsão (o compilado, se existir), métricas, nomes das features, perfil,
+    índice geográfico e importância por permutação de uma versão.
+    """
+    pipeline = joblib.load(os.path.join(pasta, 'modelo_vendas.pkl'))
+    try:
+        modelo = ModeloCompilado(os.path.join(pasta, 'modelo_compilado'))
+    except (FileNotFoundError, ValueError):
+        modelo = pipeline
+    perfil = carregar_perfil_servico(os.path.join(pasta, 'perfil_servico.json'))
+    try:
+        with open(os.path.join(pasta, 'model_metrics.json'), 'r') as f:
+            metricas = json.load(f)
+    except FileNotFoundError:
+        metricas = None
+    try:
+        nomes_features = joblib.load(os.path.join(pasta, 'encoders.pkl'))
+    except FileNotFoundError:
+        nomes_features = None
+    try:
+        importancia = carregar_importancia(os.path.join(pasta, 'importancia_permutacao.json'))
+    except FileNotFoundError:
+        importancia = None
+    return {'pipeline': pipeline, 'modelo': modelo, 'perfil': perfil, 'metricas': metricas,
+            'nomes_features': nomes_features, 'importancia': importancia,
+            'indice_geo': carregar_indice_servico(os.path.join(pasta, 'geo_indice.npz'))}
+
+
+class ArtefatosRecarregaveis:
+    """
+    Guarda em 'atual' os artefatos da versão em uso (o dicionário de 'carregar(pasta)' mais
+    'versao', 'pasta' e 'assinatura'). Uma thread observa o ponteiro e, quando ele muda, carrega a
+    nova versão e troca a referência; quem lê 'atual' recebe sempre uma versão inteira.
+    'ao_trocar(artefatos)', se dado, é chamado depois de cada troca.
+    """
+
+    def __init__(self, carregar=carregar_artefatos, intervalo_s=INTERVALO_OBSERVACAO_S, ao_trocar=None):
+        self.carregar = carregar
+        self.intervalo_s = intervalo_s
+        self.ao_trocar = ao_trocar
+        self.erro = None
+        self._trava = threading.Lock()
+        self.atual = self._carregar()
+        threading.Thread(target=self._observar, name='observador-versoes', daemon=True).start()
+
+    def _carregar(self):
+        assinatura = assinatura_artefatos()
+        pasta = pasta_versao_atual()
+        artefatos = self.carregar(pasta)
+        artefatos.update(versao=versao_atual(), pasta=pasta, assinatura=assinatura)
+        return artefatos
+
+    def verificar(self):
+        """Troca para a versão atual se ela mudou. Devolve True quando houve troca."""
+        with self._trava:
+            if assinatura_artefatos() == self.atual['assinatura']:
+                return False
+            try:
+                self.atual = self._carregar()
+            except Exception as e:  # ex.: versão removida no meio da leitura; fica a anterior
+                self.erro = f"{type(e).__name__}: {e}"
+                return False
+            self.erro = None
+        if self.ao_trocar is not None:
+            self.ao_trocar(self.atual)
+        return True
+
+    def _observar(self):
+        while True:
+            time.sleep(self.intervalo_s)
+            self.verificar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lista as versões publicadas do modelo ou reverte para uma anterior.")
+    parser.add_argument('--reverter', nargs='?', const='', metavar='VERSAO', default=None,
+                        help="Aponta para VERSAO (padrão: a versão anterior à atual).")
+    args = parser.parse_args()
+
+    if args.reverter is not None:
+        try:
+            versao = reverter_versao(args.reverter or None)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            exit()
+        print(f"Versão atual: {versao} (cópias em '{DATA_PATH}/' atualizadas).")
+    else:
+        atual = versao_atual()
+        versoes = listar_versoes()
+        if not versoes:
+            print(f"Nenhuma versão publicada em '{VERSOES_PATH}'. Execute o 'main.py'.")
+        for versao in versoes:
+            print(f"{'*' if versao == atual else ' '} {versao}")